@@ -0,0 +1,45 @@
+"""
+Benchmark: shifted-grid ensemble detection vs. the plain grid and vs. one refit per shifted grid.
+
+Usage:
+    python benchmarks/bench_shifted_grids.py [num_points] [num_users]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ghost.algorithms.grid import grid_based_batch, HALF_CELL_SHIFTS
+
+
+def make_points(n, num_users, seed=0):
+    rng = np.random.default_rng(seed)
+    users = rng.integers(0, num_users, n)
+    return pd.DataFrame({
+        'user_id': users.astype(str),
+        'lat': 38.9 + users * 0.01 + rng.normal(0, 5e-4, n),
+        'lon': -104.8 + users * 0.01 + rng.normal(0, 5e-4, n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 60 * 86400, n), unit='s'),
+    })
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    num_users = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    df = make_points(n, num_users)
+    plain = best_of(lambda: grid_based_batch(df))
+    shifted = best_of(lambda: grid_based_batch(df, shifted_grids=True))
+    print(f"{n} points, {num_users} users")
+    print(f"plain grid:      {plain:.2f} s")
+    print(f"shifted grids:   {shifted:.2f} s ({shifted / plain:.2f}x plain, {len(HALF_CELL_SHIFTS)} grids)")
+    print(f"k full refits:   ~{len(HALF_CELL_SHIFTS) * plain:.2f} s ({len(HALF_CELL_SHIFTS)}x plain)")
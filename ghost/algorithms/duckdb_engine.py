@@ -0,0 +1,180 @@
+import os
+import pathlib
+import tempfile
+
+import pandas as pd
+
+from ghost.algorithms.grid import GridHomeDetector
+from ghost.planner import parse_memory
+from ghost.preprocessing.projection import project_coordinates
+
+# Optional dependency for engine='duckdb'
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# GHOST.algorithms.duckdb_engine: Grid aggregation pushed into an in-process DuckDB query
+
+
+def _quote(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _ident(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _source_relation(con, source, epsg_in: int, epsg_out: int) -> str:
+    """
+    SQL relation for the input: a CSV/Parquet path or glob (scanned by DuckDB itself, never loaded
+    into Python) or a pandas DataFrame (registered as a view, projected in Python if needed).
+    """
+    if isinstance(source, pd.DataFrame):
+        df = pd.DataFrame(source.drop(columns='geometry', errors='ignore'))
+        if 'prj_lat' not in df.columns or 'prj_lon' not in df.columns:
+            df['prj_lat'], df['prj_lon'] = project_coordinates(df['lat'], df['lon'], epsg_in=epsg_in, epsg_out=epsg_out)
+        con.register('ghost_points', df)
+        return 'ghost_points'
+    path = str(source)
+    suffix = pathlib.Path(path).suffix.lower()
+    if suffix in ('.parquet', '.pq'):
+        return f"read_parquet({_quote(path)})"
+    if suffix in ('.csv', '.txt'):
+        return f"read_csv_auto({_quote(path)})"
+    raise ValueError(f"Unsupported input for the duckdb engine: {path}. Expected a CSV or Parquet file.")
+
+
+def _projection_sql(con, columns, epsg_in: int, epsg_out: int):
+    """
+    SQL expressions for projected (y, x): pre-projected 'prj_lat'/'prj_lon' columns when present,
+    otherwise ST_Transform from the DuckDB spatial extension. The extension is never installed here
+    (that would be a download at detection time); it must already be installed.
+    """
+    if 'prj_lat' in columns and 'prj_lon' in columns:
+        return 'prj_lat', 'prj_lon'
+    try:
+        con.execute("LOAD spatial")
+    except duckdb.Error as e:
+        raise ImportError(
+            "The duckdb engine needs pre-projected 'prj_lat'/'prj_lon' columns in input files, or the DuckDB "
+            "spatial extension installed beforehand (python -c \"import duckdb; duckdb.sql('INSTALL spatial')\"). "
+            f"Loading it failed: {e}") from e
+    point = (f"ST_Transform(ST_Point(lon, lat), {_quote(f'EPSG:{epsg_in}')}, {_quote(f'EPSG:{epsg_out}')}, "
+             "always_xy := true)")
+    return f"ST_Y({point})", f"ST_X({point})"
+
+
+def _window_sql(name: str, condition: str, stay_time_mode: str, max_gap: float, is_records: bool) -> str:
+    """
+    CTE with per-(user, cell) stay-time, unique nights and point count for one time window,
+    ranked within each user by stay-time, nights, points and grid order (the GridHomeDetector tie-break).
+    """
+    num_points = 'sum(point_count)' if is_records else 'count(*)'
+    if stay_time_mode == 'dwell':
+        source = f"""(
+            SELECT *,
+                CASE WHEN iy = lag(iy) OVER w AND ix = lag(ix) OVER w
+                     THEN least((epoch_ns(ts) - epoch_ns(lag(end_ts) OVER w)) / 1e9, {float(max_gap)})
+                     ELSE 0 END + (epoch_ns(end_ts) - epoch_ns(ts)) / 1e9 AS dwell
+            FROM points WHERE {condition}
+            WINDOW w AS (PARTITION BY uid ORDER BY ts)
+        )"""
+        stay_time = 'sum(dwell)'
+    else:
+        source = f"(SELECT * FROM points WHERE {condition})"
+        stay_time = '(epoch_ns(max(end_ts)) - epoch_ns(min(ts))) / 1e9'
+    return f"""{name}_cells AS (
+        SELECT uid, iy, ix, {stay_time} AS stay_time, count(DISTINCT CAST(ts AS DATE)) AS num_nights,
+               {num_points} AS num_points
+        FROM {source}
+        GROUP BY uid, iy, ix
+    ),
+    {name}_ranked AS (
+        SELECT *, row_number() OVER (
+            PARTITION BY uid ORDER BY stay_time DESC, num_nights DESC, num_points DESC, iy, ix
+        ) AS cell_rank
+        FROM {name}_cells
+    )"""
+
+
+def duckdb_batch(source, grid_size=20, night_start=22, night_end=6, user_id_col='user_id', epsg_in=4326,
+                 epsg_out=32617, top_k=1, stay_time_mode='span', max_gap=3600, memory_limit=None,
+                 temp_directory=None) -> pd.DataFrame:
+    """
+    GHOST batch detection as one in-process DuckDB query over the input files: hour/weekday
+    windows, integer grid keys, per-(user, cell) aggregation and ranking with the same tie-break
+    as GridHomeDetector. DuckDB spills to temp_directory when the data does not fit in memory_limit,
+    so inputs larger than RAM need no chunking. Only each user's top cells are returned to Python.
+    Args:
+        source: CSV or Parquet path (globs such as 'data/*.parquet' work) or a pandas DataFrame, with
+            ['timestamp', 'lat', 'lon'] or pre-projected ['timestamp', 'prj_lat', 'prj_lon'].
+            An unprojected DataFrame is projected in Python; unprojected files need the DuckDB spatial
+            extension, installed beforehand (ImportError otherwise).
+        grid_size, night_start, night_end, user_id_col, epsg_in, epsg_out, top_k, stay_time_mode, max_gap:
+            As in grid_based_batch.
+        memory_limit (optional): DuckDB memory limit, in bytes or as a size such as '4GB' (binary units, as max_memory).
+        temp_directory (str, optional): Spill directory (default: a 'ghost_duckdb' folder in the system temp dir).
+    Returns:
+        pd.DataFrame: One row per user, same layout as grid_based_batch.
+    Example:
+        >>> from ghost.algorithms.duckdb_engine import duckdb_batch
+        >>> results = duckdb_batch('points/*.parquet', grid_size=20, memory_limit='4GB')
+    """
+    if duckdb is None:
+        raise ImportError("duckdb is required for engine='duckdb'.")
+    detector = GridHomeDetector(grid_size=grid_size, night_start=night_start, night_end=night_end, epsg_in=epsg_in,
+                                epsg_out=epsg_out, top_k=top_k, stay_time_mode=stay_time_mode, max_gap=max_gap)
+    # Extensions are never downloaded implicitly (see _projection_sql)
+    con = duckdb.connect(config={'autoinstall_known_extensions': False})
+    try:
+        temp_directory = temp_directory or os.path.join(tempfile.gettempdir(), 'ghost_duckdb')
+        con.execute(f"SET temp_directory = {_quote(temp_directory)}")
+        if memory_limit:
+            con.execute(f"SET memory_limit = {_quote(f'{parse_memory(memory_limit) // 2 ** 20}MiB')}")
+        relation = _source_relation(con, source, epsg_in, epsg_out)
+        columns = [row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {relation}").fetchall()]
+        is_records = 'end_timestamp' in columns
+        prj_y, prj_x = _projection_sql(con, columns, epsg_in, epsg_out)
+        uid = _ident(user_id_col) if user_id_col in columns else '1'
+        end_ts = 'CAST(end_timestamp AS TIMESTAMP)' if is_records else 'ts'
+        grid = float(grid_size)
+        night = f"(ts_hour >= {int(night_start)} OR ts_hour < {int(night_end)})"
+        weekend = "(ts_dow IN (5, 6) AND ts_hour >= 8 AND ts_hour < 20)"
+        query = f"""
+        WITH raw AS (
+            SELECT {uid} AS uid, TRY_CAST(timestamp AS TIMESTAMP) AS ts,
+                   {'end_timestamp, point_count, ' if is_records else ''}{prj_y} AS y, {prj_x} AS x
+            FROM {relation}
+            WHERE {uid} IS NOT NULL
+        ),
+        users AS (SELECT DISTINCT uid FROM raw),
+        points AS (
+            SELECT uid, ts, {end_ts} AS end_ts, hour(ts) AS ts_hour, isodow(ts) - 1 AS ts_dow,
+                   CAST(round_even(y / {grid}, 0) AS BIGINT) AS iy,
+                   CAST(round_even(x / {grid}, 0) AS BIGINT) AS ix
+                   {', point_count' if is_records else ''}
+            FROM raw
+            WHERE ts IS NOT NULL AND isfinite(y) AND isfinite(x)
+        ),
+        {_window_sql('night', night, stay_time_mode, max_gap, is_records)},
+        {_window_sql('weekend', weekend, stay_time_mode, max_gap, is_records)}
+        SELECT 'night' AS part, uid, iy, ix, stay_time, num_nights, num_points
+        FROM night_ranked WHERE cell_rank <= {int(top_k)}
+        UNION ALL
+        SELECT 'weekend' AS part, uid, iy, ix, stay_time, num_nights, num_points
+        FROM weekend_ranked WHERE cell_rank <= {int(top_k)} AND uid NOT IN (SELECT uid FROM night_cells)
+        UNION ALL
+        SELECT 'user' AS part, uid, NULL, NULL, NULL, NULL, NULL FROM users
+        """
+        rows = con.execute(query).df()
+    finally:
+        con.close()
+    users = pd.Index(rows.loc[rows['part'] == 'user', 'uid']).sort_values()
+    cells = rows[rows['part'] != 'user'].rename(columns={'uid': user_id_col})
+    cells = cells.assign(LAT_Grid=cells['iy'].astype(float) * grid, LON_Grid=cells['ix'].astype(float) * grid)
+    columns = [user_id_col, 'LAT_Grid', 'LON_Grid', 'stay_time', 'num_nights', 'num_points']
+    night_cells = cells.loc[cells['part'] == 'night', columns]
+    weekend_cells = cells.loc[cells['part'] == 'weekend', columns]
+    results = detector._results_from_cells(users.rename(user_id_col), night_cells, weekend_cells, user_id_col)
+    return results
@@ -1,10 +1,14 @@
 import pandas as pd
-from typing import Tuple, Dict, Any
-from ghost.preprocessing.projection import project_coordinates
+from typing import Tuple, Dict, Any, Optional
+from ghost.preprocessing.projection import get_transformer, project_coordinates
 from ghost.preprocessing.time import extract_time_features
+from ghost.preprocessing.staypoints import STAY_RECORD_COLUMNS
+from ghost.algorithms.kernels import (
+    NAT, aggregate_sorted, as_nanoseconds, dwell_seconds, time_fields, top_cells
+)
+from ghost.io.results import ResultsWriter
 from ghost.utils import validate_input_dataframe
 import numpy as np
-from pyproj import Transformer
 
 # GHOST.algorithms.grid: Core GHOST algorithm implementation
 class GridHomeDetector:
@@ -15,6 +19,9 @@ class GridHomeDetector:
     - Using nighttime points (default: 22:00–06:00) to find the grid cell with the longest stay-time.
     - If no nighttime points are available, falling back to weekend daytime points (Saturday/Sunday, 08:00–20:00).
     - Stay-time (duration spent in a cell) is used as the primary metric, with unique nights and point count as tie-breakers.
+      It is either the span between the first and last point in the cell, or the dwell time summed over consecutive points.
+    - Optionally reporting the top-k candidate cells and a confidence margin, found by partial selection.
+    - Optionally evaluating half-cell shifted grids in the same pass to remove cell-boundary effects.
 
     Example:
         >>> import pandas as pd
@@ -29,7 +36,7 @@ class GridHomeDetector:
         >>> home_lat, home_lon, stats = detector.fit(df)
         >>> print(home_lat, home_lon, stats)
     """
-    def __init__(self, grid_size: float = 20, night_start: int = 22, night_end: int = 6, epsg_in: int = 4326, epsg_out: int = 32617):
+    def __init__(self, grid_size: float = 20, night_start: int = 22, night_end: int = 6, epsg_in: int = 4326, epsg_out: int = 32617, top_k: int = 1, shifted_grids: bool = False, stay_time_mode: str = 'span', max_gap: float = 3600, keep_cells: bool = False):
         """
         Initialize the grid-based home detector.
         Args:
@@ -38,18 +45,41 @@ class GridHomeDetector:
             night_end (int): Night end hour (24h clock).
             epsg_in (int): Input EPSG code (default: 4326, WGS84).
             epsg_out (int): Output EPSG code for projection (default: 32617, UTM zone 17N).
+            top_k (int): Number of candidate cells to report. If > 1, stats include a 'confidence' score
+                (stay-time margin of the winner over the runner-up) and 'top{r}_*' fields for ranks 2..top_k.
+            shifted_grids (bool): If True, also evaluate grids shifted by half a cell in x, y and both
+                (HALF_CELL_SHIFTS) in the same pass, and keep the strongest cell across all grids. This stops
+                a home on a cell boundary from having its stay-time split between neighbouring cells.
+                Stats then include 'grid_shift' (index into HALF_CELL_SHIFTS). Candidate cells from
+                different shifted grids may overlap.
+            stay_time_mode (str): 'span' (last minus first timestamp in the cell) or 'dwell' (sum of the gaps
+                between consecutive points of the night/weekend window that stay in the same cell).
+            max_gap (float): Cap (seconds) on each gap counted in 'dwell' mode.
+            keep_cells (bool): If True, fit() and fit_batch() keep the per-(user, cell) aggregates they compute
+                in self.cell_table (see _cell_table), instead of discarding them after picking the winners.
         """
+        if stay_time_mode not in STAY_TIME_MODES:
+            raise ValueError(f"stay_time_mode must be one of {STAY_TIME_MODES}.")
+        self.stay_time_mode = stay_time_mode
+        self.max_gap = max_gap
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1.")
+        self.top_k = top_k
+        self.shifted_grids = shifted_grids
         self.grid_size = grid_size
         self.night_start = night_start
         self.night_end = night_end
         self.epsg_in = epsg_in
         self.epsg_out = epsg_out
+        self.keep_cells = keep_cells
+        self.cell_table = None
 
     def fit(self, df: pd.DataFrame) -> Tuple[float, float, Dict[str, Any]]:
         """
         Infer home location from GPS data using the GHOST algorithm (grid-based clustering with weekend fallback and stay-time calculation).
         Args:
-            df (pd.DataFrame): DataFrame with columns ['timestamp', 'lat', 'lon'] (optionally 'ele').
+            df (pd.DataFrame): DataFrame with columns ['timestamp', 'lat', 'lon'] (optionally 'ele'), or stay
+                records from ghost.preprocessing.staypoints.compress_stay_points.
         Returns:
             Tuple[float, float, Dict[str, Any]]: (home_lat, home_lon, stats_dict)
                 - home_lat, home_lon: geographic coordinates (WGS84)
@@ -59,127 +89,708 @@ class GridHomeDetector:
         if df.empty or not {'lat', 'lon', 'timestamp'}.issubset(df.columns):
             return np.nan, np.nan, {'num_nights': 0, 'num_points': 0, 'stay_time': 0, 'reason': 'empty or missing columns'}
 
-        # Project coordinates
-        prj_lat, prj_lon = project_coordinates(df['lat'], df['lon'], epsg_in=self.epsg_in, epsg_out=self.epsg_out)
-        df = df.copy()
-        df['prj_lat'] = prj_lat
-        df['prj_lon'] = prj_lon
-
-        # Extract time features
-        df = extract_time_features(df, timestamp_col='timestamp')
+        # Project coordinates, extract time features and assign to grid
+        df = self._prepare(df)
         if 'hour' not in df or 'dayofweek' not in df:
             return np.nan, np.nan, {'num_nights': 0, 'num_points': 0, 'stay_time': 0, 'reason': 'time extraction failed'}
-
-        # Assign to grid
-        df['LAT_Grid'] = np.round(df['prj_lat'] / self.grid_size) * self.grid_size
-        df['LON_Grid'] = np.round(df['prj_lon'] / self.grid_size) * self.grid_size
+        if self.shifted_grids:
+            df = self._expand_shifts(df, [])
 
         # 1. Nighttime points
-        night_mask = (df['hour'] >= self.night_start) | (df['hour'] < self.night_end)
-        night_df = df[night_mask].copy()
-        night_df['date'] = pd.to_datetime(night_df['timestamp']).dt.date
+        night_df = df[self._night_mask(df['hour'])]
         if not night_df.empty:
-            home_lat, home_lon, stats = self._find_home_by_staytime(night_df)
+            home_lat, home_lon, stats = self._find_home_by_staytime(night_df, window='night')
             stats['inferred_from'] = 'night'
             return home_lat, home_lon, stats
 
         # 2. Weekend fallback (e.g., 8am–8pm, Sat/Sun)
-        weekend_mask = (df['dayofweek'].isin([5, 6])) & (df['hour'] >= 8) & (df['hour'] < 20)
-        weekend_df = df[weekend_mask].copy()
-        weekend_df['date'] = pd.to_datetime(weekend_df['timestamp']).dt.date
+        weekend_df = df[self._weekend_mask(df['hour'], df['dayofweek'])]
         if not weekend_df.empty:
-            home_lat, home_lon, stats = self._find_home_by_staytime(weekend_df)
+            home_lat, home_lon, stats = self._find_home_by_staytime(weekend_df, window='weekend')
             stats['inferred_from'] = 'weekend'
             return home_lat, home_lon, stats
 
         # 3. No data
         return np.nan, np.nan, {'num_nights': 0, 'num_points': 0, 'stay_time': 0, 'reason': 'no nighttime or weekend points'}
 
-    def _find_home_by_staytime(self, df: pd.DataFrame):
+    def _find_home_by_staytime(self, df: pd.DataFrame, window: str = 'night'):
         """
         Find the home grid cell by calculating stay-time for each cell (GHOST logic).
         Args:
             df (pd.DataFrame): DataFrame filtered to relevant points (night or weekend), with grid columns.
+            window (str): Window label of the points, recorded in the cell table when keep_cells is set.
         Returns:
             Tuple[float, float, Dict[str, Any]]: (home_lat, home_lon, stats_dict)
         """
-        # Group by grid cell
-        group = df.groupby(['LAT_Grid', 'LON_Grid'])
-        stats = []
-        for (lat_grid, lon_grid), cell_df in group:
-            cell_df = cell_df.sort_values('timestamp')
-            # Calculate stay-time (in seconds)
-            if len(cell_df) > 1:
-                stay_time = (cell_df['timestamp'].iloc[-1] - cell_df['timestamp'].iloc[0]).total_seconds()
-            else:
-                stay_time = 0.0
-            num_nights = cell_df['date'].nunique()
-            num_points = len(cell_df)
-            stats.append({
-                'LAT_Grid': lat_grid,
-                'LON_Grid': lon_grid,
-                'stay_time': stay_time,
-                'num_nights': num_nights,
-                'num_points': num_points
-            })
-        stats_df = pd.DataFrame(stats)
-        # Sort by stay_time, then num_nights, then num_points
-        stats_df = stats_df.sort_values(by=['stay_time', 'num_nights', 'num_points'], ascending=False)
-        best = stats_df.iloc[0]
-        prj_home_lat, prj_home_lon = best['LAT_Grid'], best['LON_Grid']
-        transformer = Transformer.from_crs(f"epsg:{self.epsg_out}", f"epsg:{self.epsg_in}", always_xy=True)
-        home_lon, home_lat = transformer.transform(prj_home_lon, prj_home_lat)
-        return home_lat, home_lon, {
+        cells = self._aggregate(df, self._cell_keys())
+        if self.keep_cells:
+            self.cell_table = self._cell_table({window: cells})
+        top = _select_top_cells(cells, [], k=self.top_k, cell_size=self._overlap_size())
+        if top.empty:
+            return np.nan, np.nan, {'num_nights': 0, 'num_points': 0, 'stay_time': 0, 'reason': 'no valid coordinates'}
+        home_lat, home_lon = self._to_lat_lon(top['LAT_Grid'].to_numpy(), top['LON_Grid'].to_numpy())
+        best = top.iloc[0]
+        stats = {
             'num_nights': int(best['num_nights']),
             'num_points': int(best['num_points']),
             'stay_time': float(best['stay_time']),
-            'prj_lat': float(prj_home_lat),
-            'prj_lon': float(prj_home_lon)
+            'prj_lat': float(best['LAT_Grid']),
+            'prj_lon': float(best['LON_Grid'])
         }
+        if self.shifted_grids:
+            stats['grid_shift'] = int(best['grid_shift'])
+        if self.top_k > 1:
+            second = top['stay_time'].iloc[1] if len(top) > 1 else np.nan
+            stats['confidence'] = float(_confidence(np.array([best['stay_time']]), np.array([second]))[0])
+            for r in range(2, self.top_k + 1):
+                has_rank = r <= len(top)
+                row = top.iloc[r - 1] if has_rank else None
+                stats[f'top{r}_lat'] = float(home_lat[r - 1]) if has_rank else np.nan
+                stats[f'top{r}_lon'] = float(home_lon[r - 1]) if has_rank else np.nan
+                for col in RANK_COLUMNS:
+                    stats[f'top{r}_{col}'] = float(row[col]) if has_rank else np.nan
+        return float(home_lat[0]), float(home_lon[0]), stats
+
+    def _to_lat_lon(self, prj_lat, prj_lon):
+        """
+        Convert projected cell centers back to geographic coordinates (vectorized).
+        """
+        transformer = get_transformer(self.epsg_out, self.epsg_in)
+        lon, lat = transformer.transform(np.asarray(prj_lon, dtype=float), np.asarray(prj_lat, dtype=float))
+        return np.atleast_1d(lat), np.atleast_1d(lon)
+
+    def fit_batch(self, df: pd.DataFrame, user_id_col: str = 'user_id', period=None) -> pd.DataFrame:
+        """
+        Infer home locations for all users at once. Points are projected and aggregated per
+        (user, cell) in a single vectorized pass instead of one fit() per user.
+        Args:
+            df (pd.DataFrame): DataFrame with ['timestamp', 'lat', 'lon'] and a user ID column.
+            user_id_col (str): The name of the user identifier column.
+            period (optional): Detect one home per user and time period: a pandas period alias
+                ('W', 'M', 'Q', 'Y', ...) or a sorted sequence of bin edges (timestamps; bins are
+                [edge_i, edge_i+1), points outside all bins are ignored). The period becomes part of the
+                aggregation key, so all periods are computed in the same pass.
+        Returns:
+            pd.DataFrame: One row per user with inferred home location and stats (same fields as fit()).
+                With period, one row per (user, period) with data, with a 'period' column after the user ID
+                (pd.Period for aliases, pd.Interval for bin edges).
+        Example:
+            >>> monthly = GridHomeDetector().fit_batch(df, period='M')
+            >>> monthly[monthly['user_id'] == 'u1'][['period', 'lat', 'lon', 'inferred_from']]
+        """
+        users = pd.Index(df[user_id_col].dropna().unique()).sort_values()
+        try:
+            validate_input_dataframe(df)
+        except Exception as e:
+            return pd.DataFrame({user_id_col: users, 'lat': None, 'lon': None, 'error': str(e)})
+        if period is not None:
+            return self._fit_periods(df, user_id_col, period)
+        df = self._prepare(df)
+        # Carry users as integer codes (cheap to sort and match, and through the stacked copies of
+        # shifted grids); cells are mapped back to IDs below
+        codes, user_ids = pd.factorize(df[user_id_col], sort=True)
+        df = df[codes >= 0].assign(**{user_id_col: codes[codes >= 0]})
+        if self.shifted_grids:
+            df = self._expand_shifts(df, [user_id_col])
+        keys = [user_id_col] + self._cell_keys()
+        night_cells = self._aggregate(df[self._night_mask(df['hour'])], keys)
+        # Weekend fallback only for users without any nighttime points
+        weekend_mask = self._weekend_mask(df['hour'], df['dayofweek']) & ~df[user_id_col].isin(night_cells[user_id_col])
+        weekend_cells = self._aggregate(df[weekend_mask], keys)
+        night_cells[user_id_col] = user_ids.take(night_cells[user_id_col].to_numpy())
+        weekend_cells[user_id_col] = user_ids.take(weekend_cells[user_id_col].to_numpy())
+        if self.keep_cells:
+            self.cell_table = self._cell_table({'night': night_cells, 'weekend': weekend_cells}, user_id_col, users)
+        return self._results_from_cells(users, night_cells, weekend_cells, user_id_col)
+
+    def _cell_table(self, cells_by_window: Dict[str, pd.DataFrame], user_id_col: Optional[str] = None,
+                    users=None) -> pd.DataFrame:
+        """
+        Compact table of the cell aggregates computed during detection: one row per (user, window, cell)
+        with the user as a categorical over the sorted user IDs (its codes are the user codes), the window
+        label, integer cell keys ('cell_y', 'cell_x': cell center / grid_size, before the half-cell
+        shift), 'grid_shift' with shifted grids, and 'stay_time', 'num_nights', 'num_points'.
+        Weekend cells are only aggregated (and so only present) for users without nighttime points.
+        """
+        parts = []
+        for window, cells in cells_by_window.items():
+            parts.append(cells.assign(window=window))
+        cells = pd.concat(parts, ignore_index=True)
+        shifts = np.asarray(HALF_CELL_SHIFTS, dtype=float)
+        shift = cells['grid_shift'].to_numpy(dtype=np.int64) if self.shifted_grids else np.zeros(len(cells), dtype=np.int64)
+        table = pd.DataFrame(index=pd.RangeIndex(len(cells)))
+        if user_id_col is not None:
+            table[user_id_col] = pd.Categorical(cells[user_id_col], categories=users)
+        table['window'] = pd.Categorical(cells['window'], categories=list(cells_by_window))
+        table['cell_y'] = np.round(cells['LAT_Grid'].to_numpy(dtype=float) / self.grid_size - shifts[shift, 0]).astype(np.int32)
+        table['cell_x'] = np.round(cells['LON_Grid'].to_numpy(dtype=float) / self.grid_size - shifts[shift, 1]).astype(np.int32)
+        if self.shifted_grids:
+            table['grid_shift'] = shift.astype(np.int8)
+        table['stay_time'] = cells['stay_time'].to_numpy(dtype=float)
+        table['num_nights'] = cells['num_nights'].to_numpy(dtype=np.int32)
+        table['num_points'] = cells['num_points'].to_numpy(dtype=np.int64)
+        return table
+
+    def _fit_periods(self, df: pd.DataFrame, user_id_col: str, period) -> pd.DataFrame:
+        """
+        fit_batch over (user, period) groups: each pair is coded as one pseudo-user, so the usual
+        single pass aggregates every period at once; the codes are mapped back afterwards.
+        """
+        period_codes, periods = pd.factorize(_period_labels(df['timestamp'], period), sort=True)
+        user_codes, user_ids = pd.factorize(df[user_id_col], sort=True)
+        valid = (period_codes >= 0) & (user_codes >= 0)
+        pairs = user_codes[valid].astype(np.int64) * max(len(periods), 1) + period_codes[valid]
+        pair_codes, pair_values = pd.factorize(pairs, sort=True)
+        results = self.fit_batch(df[valid].assign(**{PERIOD_GROUP_COLUMN: pair_codes}), user_id_col=PERIOD_GROUP_COLUMN)
+        pair_values = np.asarray(pair_values)
+        results = results.drop(columns=PERIOD_GROUP_COLUMN)
+        results.insert(0, user_id_col, user_ids.take(pair_values // max(len(periods), 1)))
+        results.insert(1, PERIOD_COLUMN, periods.take(pair_values % max(len(periods), 1)))
+        if self.keep_cells:
+            pair = pair_values[self.cell_table.pop(PERIOD_GROUP_COLUMN).cat.codes.to_numpy()]
+            self.cell_table.insert(0, user_id_col, pd.Categorical.from_codes(pair // max(len(periods), 1), categories=user_ids))
+            self.cell_table.insert(1, PERIOD_COLUMN, periods.take(pair % max(len(periods), 1)))
+        return results
+
+    def fit_anchors(self, df: pd.DataFrame, user_id_col: str = 'user_id', windows: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Detect one anchor location per user and named time window (e.g. home, work, weekend) from shared
+        cell aggregates: points are projected and gridded once, and the cells of all windows are
+        aggregated in a single grouped pass with the window label as part of the key.
+        Args:
+            df (pd.DataFrame): DataFrame with ['timestamp', 'lat', 'lon'] and a user ID column.
+            user_id_col (str): The name of the user identifier column.
+            windows (dict, optional): Label -> (start_hour, end_hour) or (start_hour, end_hour, days).
+                Hours are [start, end) and wrap past midnight when start > end; days are days of the week
+                (0=Monday, default: all). Default: anchor_windows() (night home, weekday 09-17 work,
+                weekend 08-20 daytime). Windows are independent: there is no weekend fallback for 'home'.
+        Returns:
+            pd.DataFrame: One row per user with '{label}_lat', '{label}_lon', '{label}_num_nights',
+                '{label}_num_points', '{label}_stay_time', '{label}_prj_lat' and '{label}_prj_lon' for each
+                label (plus '{label}_grid_shift' / '{label}_confidence' with shifted_grids / top_k > 1).
+                Labels without points for a user get NaN locations and zero counts.
+        Example:
+            >>> anchors = GridHomeDetector().fit_anchors(df, windows={**anchor_windows(), 'gym': (18, 20, [0, 2, 4])})
+            >>> anchors[['user_id', 'home_lat', 'home_lon', 'work_lat', 'work_lon', 'gym_lat', 'gym_lon']]
+        """
+        windows = anchor_windows(self.night_start, self.night_end) if windows is None else dict(windows)
+        users = pd.Index(df[user_id_col].dropna().unique()).sort_values()
+        validate_input_dataframe(df)
+        df = self._prepare(df[df[user_id_col].notnull()])
+        codes, user_ids = pd.factorize(df[user_id_col], sort=True)
+        df = df.assign(**{user_id_col: codes})
+        if self.shifted_grids:
+            df = self._expand_shifts(df, [user_id_col])
+        labels = list(windows)
+        selected = [np.flatnonzero(_window_mask(df['hour'], df['dayofweek'], *windows[label])) for label in labels]
+        stacked = df.iloc[np.concatenate(selected)].assign(
+            anchor=np.repeat(np.arange(len(labels)), [len(idx) for idx in selected]))
+        cells = self._aggregate(stacked, ['anchor', user_id_col] + self._cell_keys())
+        top = _select_top_cells(cells, ['anchor', user_id_col], k=self.top_k, cell_size=self._overlap_size())
+        top[user_id_col] = user_ids.take(top[user_id_col].to_numpy())
+        results = pd.DataFrame({user_id_col: users})
+        for code, label in enumerate(labels):
+            ranked = top[top['anchor'] == code]
+            best = ranked[ranked['rank'] == 1].set_index(user_id_col).reindex(users)
+            lat, lon = self._to_lat_lon(best['LAT_Grid'].to_numpy(), best['LON_Grid'].to_numpy())
+            results[f'{label}_lat'] = lat
+            results[f'{label}_lon'] = lon
+            results[f'{label}_num_nights'] = best['num_nights'].fillna(0).astype(int).to_numpy()
+            results[f'{label}_num_points'] = best['num_points'].fillna(0).astype(int).to_numpy()
+            results[f'{label}_stay_time'] = best['stay_time'].fillna(0).astype(float).to_numpy()
+            results[f'{label}_prj_lat'] = best['LAT_Grid'].to_numpy()
+            results[f'{label}_prj_lon'] = best['LON_Grid'].to_numpy()
+            if self.shifted_grids:
+                results[f'{label}_grid_shift'] = best['grid_shift'].to_numpy()
+            if self.top_k > 1:
+                second = ranked[ranked['rank'] == 2].set_index(user_id_col)['stay_time'].reindex(users)
+                confidence = _confidence(results[f'{label}_stay_time'].to_numpy(), second.to_numpy())
+                results[f'{label}_confidence'] = np.where(best['LAT_Grid'].notnull(), confidence, np.nan)
+        return results
+
+    def fit_arrays(self, timestamps, x, y, user_codes=None, projected: bool = False,
+                   backend: Optional[str] = None) -> np.ndarray:
+        """
+        Infer home locations from plain NumPy arrays, without building any DataFrame. Same logic and
+        results as fit_batch, for array-based pipelines, tight loops and worker processes.
+        Args:
+            timestamps: int64 nanoseconds since 1970-01-01 in local wall-clock time (i.e. a
+                datetime64[ns] array without time zone, viewed as int64), or a datetime64 array.
+            x, y: Longitude and latitude in epsg_in, or projected coordinates (meters, epsg_out) if projected=True.
+            user_codes: Integer user codes 0..n_users-1 (e.g. from pd.factorize); negative codes are skipped.
+                None treats all points as one user.
+            projected (bool): Whether x/y are already projected.
+            backend (str, optional): Kernel backend, 'numba' (compiled; default when numba is installed)
+                or 'numpy'. Both give identical results.
+        Returns:
+            np.ndarray: Structured array with one record per user code and the fields of fit_batch
+                ('user', 'lat', 'lon', 'num_nights', 'num_points', 'stay_time', 'prj_lat', 'prj_lon',
+                'inferred_from', plus 'grid_shift' and the top-k fields when enabled). 'inferred_from' is ''
+                and 'grid_shift' is -1 for users without nighttime or weekend points.
+        Example:
+            >>> codes, user_ids = pd.factorize(df['user_id'])
+            >>> ts = df['timestamp'].to_numpy()  # datetime64 of any unit, or int64 nanoseconds
+            >>> homes = GridHomeDetector().fit_arrays(ts, df['lon'].to_numpy(), df['lat'].to_numpy(), codes)
+            >>> homes['lat'], user_ids[homes['user']]
+        """
+        ts = as_nanoseconds(timestamps)
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        users = np.zeros(len(ts), dtype=np.int64) if user_codes is None else np.asarray(user_codes, dtype=np.int64)
+        if user_codes is None:
+            num_users = 1
+        else:
+            num_users = max(int(users.max()) + 1, 0) if len(users) else 0
+        out = self._array_results(num_users)
+        valid = (ts != NAT) & np.isfinite(x) & np.isfinite(y) & (users >= 0)
+        if not projected:
+            x, y = get_transformer(self.epsg_in, self.epsg_out).transform(x, y)
+        day, hour, dayofweek = time_fields(ts)
+        night = valid & self._night_mask(hour)
+        has_night = self._fill_window(out, night, ts, x, y, users, day, 'night', backend)
+        weekend = valid & self._weekend_mask(hour, dayofweek)
+        # Negative codes (missing users) are never valid, so only valid rows look up their user
+        weekend[weekend] = ~has_night[users[weekend]]
+        self._fill_window(out, weekend, ts, x, y, users, day, 'weekend', backend)
+        return out
+
+    def _array_results(self, num_users: int) -> np.ndarray:
+        fields = [('user', np.int64), ('lat', float), ('lon', float), ('num_nights', np.int64),
+                  ('num_points', np.int64), ('stay_time', float), ('prj_lat', float), ('prj_lon', float),
+                  ('inferred_from', 'U7')]
+        if self.shifted_grids:
+            fields.append(('grid_shift', np.int64))
+        if self.top_k > 1:
+            fields.append(('confidence', float))
+            for r in range(2, self.top_k + 1):
+                fields += [(f'top{r}_lat', float), (f'top{r}_lon', float)]
+                fields += [(f'top{r}_{col}', float) for col in RANK_COLUMNS]
+        out = np.zeros(num_users, dtype=fields)
+        out['user'] = np.arange(num_users)
+        for name in out.dtype.names:
+            if out.dtype[name] == float:
+                out[name] = np.nan
+        out['stay_time'] = 0.0
+        if self.shifted_grids:
+            out['grid_shift'] = -1
+        return out
+
+    def _fill_window(self, out, mask, ts, x, y, users, day, window: str, backend: Optional[str] = None) -> np.ndarray:
+        """
+        Aggregate the masked points per (user, [shift,] cell), pick each user's top cells and write them
+        into the structured results. Returns a boolean array flagging users that got a cell.
+        """
+        found = np.zeros(len(out), dtype=bool)
+        idx = np.flatnonzero(mask)
+        if len(idx) == 0:
+            return found
+        shifts = np.asarray(HALF_CELL_SHIFTS if self.shifted_grids else [(0.0, 0.0)], dtype=float)
+        num_shifts = len(shifts)
+        n = len(idx)
+        shift_y = np.repeat(shifts[:, 0], n)
+        shift_x = np.repeat(shifts[:, 1], n)
+        pts_y = np.tile(y[idx], num_shifts)
+        pts_x = np.tile(x[idx], num_shifts)
+        pts_ts = np.tile(ts[idx], num_shifts)
+        stream = np.tile(users[idx], num_shifts) * num_shifts + np.repeat(np.arange(num_shifts), n)
+        iy = np.round(pts_y / self.grid_size - shift_y).astype(np.int64)
+        ix = np.round(pts_x / self.grid_size - shift_x).astype(np.int64)
+        order, sorted_cell, c_stream, c_iy, c_ix, first, last, num_points, num_nights = aggregate_sorted(
+            stream, iy, ix, pts_ts, np.tile(day[idx], num_shifts), backend=backend)
+        if self.stay_time_mode == 'dwell':
+            cell_of_point = np.empty_like(sorted_cell)
+            cell_of_point[order] = sorted_cell
+            stay_time = dwell_seconds(stream, pts_ts, cell_of_point, len(c_stream), self.max_gap)
+        else:
+            stay_time = (last - first) / 1e9
+        c_user = c_stream // num_shifts
+        c_shift = c_stream % num_shifts
+        c_lat = (c_iy + shifts[c_shift, 0]) * self.grid_size
+        c_lon = (c_ix + shifts[c_shift, 1]) * self.grid_size
+        ranked, rank = top_cells(c_user, stay_time, num_nights, num_points, k=self.top_k, backend=backend,
+                                 lat=c_lat, lon=c_lon, cell_size=self._overlap_size())
+        lat, lon = self._to_lat_lon(c_lat[ranked], c_lon[ranked])
+        best = rank == 1
+        u = c_user[ranked[best]]
+        cells = ranked[best]
+        found[u] = True
+        out['lat'][u] = lat[best]
+        out['lon'][u] = lon[best]
+        out['num_nights'][u] = num_nights[cells]
+        out['num_points'][u] = num_points[cells]
+        out['stay_time'][u] = stay_time[cells]
+        out['prj_lat'][u] = c_lat[cells]
+        out['prj_lon'][u] = c_lon[cells]
+        out['inferred_from'][u] = window
+        if self.shifted_grids:
+            out['grid_shift'][u] = c_shift[cells]
+        if self.top_k > 1:
+            second = np.full(len(out), np.nan)
+            for r in range(2, self.top_k + 1):
+                at_rank = rank == r
+                ru = c_user[ranked[at_rank]]
+                rcells = ranked[at_rank]
+                out[f'top{r}_lat'][ru] = lat[at_rank]
+                out[f'top{r}_lon'][ru] = lon[at_rank]
+                out[f'top{r}_stay_time'][ru] = stay_time[rcells]
+                out[f'top{r}_num_nights'][ru] = num_nights[rcells]
+                out[f'top{r}_num_points'][ru] = num_points[rcells]
+                if r == 2:
+                    second[ru] = stay_time[rcells]
+            out['confidence'][u] = _confidence(out['stay_time'][u], second[u])
+        return found
+
+    def _overlap_size(self) -> Optional[float]:
+        # Cells of the shifted grids overlap each other; top-k candidates must not be copies of the winner
+        return self.grid_size if self.shifted_grids and self.top_k > 1 else None
+
+    def _aggregate(self, df: pd.DataFrame, keys) -> pd.DataFrame:
+        return _aggregate_cells(df, keys, stay_time_mode=self.stay_time_mode, max_gap=self.max_gap)
+
+    def _night_mask(self, hour: pd.Series) -> pd.Series:
+        return (hour >= self.night_start) | (hour < self.night_end)
+
+    def _weekend_mask(self, hour: pd.Series, dayofweek: pd.Series) -> pd.Series:
+        # Weekend fallback window: Saturday/Sunday, 8am–8pm
+        return np.isin(dayofweek, [5, 6]) & (hour >= 8) & (hour < 20)
+
+    def _results_from_cells(self, users, night_cells: pd.DataFrame, weekend_cells: pd.DataFrame, user_id_col: str) -> pd.DataFrame:
+        """
+        Pick each user's top cells (nighttime first, weekend fallback) and build the one-row-per-user results.
+        Args:
+            users: All user IDs to report (users without cells get NaN rows).
+            night_cells, weekend_cells: Per-(user, cell) aggregates from _aggregate_cells.
+            user_id_col (str): The name of the user identifier column.
+        Returns:
+            pd.DataFrame: Results in the same layout as grid_based_batch.
+        """
+        parts = []
+        night_top = _select_top_cells(night_cells, [user_id_col], k=self.top_k, cell_size=self._overlap_size())
+        parts.append(night_top.assign(inferred_from='night'))
+        weekend_cells = weekend_cells[~weekend_cells[user_id_col].isin(night_top[user_id_col])]
+        parts.append(_select_top_cells(weekend_cells, [user_id_col], k=self.top_k, cell_size=self._overlap_size())
+                     .assign(inferred_from='weekend'))
+        top = pd.concat(parts, ignore_index=True)
+        lat, lon = self._to_lat_lon(top['LAT_Grid'].to_numpy(), top['LON_Grid'].to_numpy())
+        top['lat'] = lat
+        top['lon'] = lon
+        best = top[top['rank'] == 1].set_index(user_id_col)
+        results = pd.DataFrame({user_id_col: users})
+        results = results.join(best[['lat', 'lon']], on=user_id_col)
+        results['num_nights'] = best['num_nights'].reindex(users).fillna(0).astype(int).to_numpy()
+        results['num_points'] = best['num_points'].reindex(users).fillna(0).astype(int).to_numpy()
+        results['stay_time'] = best['stay_time'].reindex(users).fillna(0).astype(float).to_numpy()
+        results['prj_lat'] = best['LAT_Grid'].reindex(users).to_numpy()
+        results['prj_lon'] = best['LON_Grid'].reindex(users).to_numpy()
+        results['inferred_from'] = best['inferred_from'].reindex(users).to_numpy()
+        if 'grid_shift' in best.columns:
+            results['grid_shift'] = best['grid_shift'].reindex(users).to_numpy()
+        if self.top_k > 1:
+            second = top[top['rank'] == 2].set_index(user_id_col)['stay_time'].reindex(users)
+            results['confidence'] = _confidence(results['stay_time'].to_numpy(), second.to_numpy())
+            results.loc[results['inferred_from'].isnull(), 'confidence'] = np.nan
+            for r in range(2, self.top_k + 1):
+                ranked = top[top['rank'] == r].set_index(user_id_col).reindex(users)
+                results[f'top{r}_lat'] = ranked['lat'].to_numpy()
+                results[f'top{r}_lon'] = ranked['lon'].to_numpy()
+                for col in RANK_COLUMNS:
+                    results[f'top{r}_{col}'] = ranked[col].astype(float).to_numpy()
+        no_data = results['inferred_from'].isnull()
+        if no_data.any():
+            results['reason'] = np.where(no_data, 'no nighttime or weekend points', None)
+        return results
+
+    def _prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Project coordinates, extract time features, and assign grid cells and dates.
+        """
+        return self._assign_grid(self._featurize(df))
+
+    def _featurize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Project coordinates and extract time features (hour, dayofweek, date); independent of grid size.
+        """
+        prj_lat, prj_lon = project_coordinates(df['lat'], df['lon'], epsg_in=self.epsg_in, epsg_out=self.epsg_out)
+        df = extract_time_features(df, timestamp_col='timestamp')
+        df['prj_lat'] = prj_lat
+        df['prj_lon'] = prj_lon
+        df['date'] = df['timestamp'].dt.normalize()
+        return df
+
+    def _cell_keys(self):
+        # Shift index first, so ties between grids go to the unshifted grid
+        return ['grid_shift', 'LAT_Grid', 'LON_Grid'] if self.shifted_grids else ['LAT_Grid', 'LON_Grid']
+
+    def _expand_shifts(self, df: pd.DataFrame, extra_columns) -> pd.DataFrame:
+        """
+        Stack the points once per shifted grid (only the columns detection needs), with cell centers
+        computed for all shifts in one vectorized operation.
+        """
+        shifts = np.asarray(HALF_CELL_SHIFTS, dtype=float)
+        n = len(df)
+        columns = list(extra_columns) + ['timestamp', 'hour', 'dayofweek', 'date']
+        columns += [c for c in STAY_RECORD_COLUMNS if c in df.columns]
+        expanded = df[columns].take(np.tile(np.arange(n), len(shifts))).reset_index(drop=True)
+        shift_y = np.repeat(shifts[:, 0], n)
+        shift_x = np.repeat(shifts[:, 1], n)
+        prj_lat = np.tile(df['prj_lat'].to_numpy(dtype=float), len(shifts))
+        prj_lon = np.tile(df['prj_lon'].to_numpy(dtype=float), len(shifts))
+        expanded['LAT_Grid'] = (np.round(prj_lat / self.grid_size - shift_y) + shift_y) * self.grid_size
+        expanded['LON_Grid'] = (np.round(prj_lon / self.grid_size - shift_x) + shift_x) * self.grid_size
+        expanded['grid_shift'] = np.repeat(np.arange(len(shifts)), n)
+        return expanded
+
+    def _assign_grid(self, df: pd.DataFrame) -> pd.DataFrame:
+        df['LAT_Grid'] = np.round(df['prj_lat'] / self.grid_size) * self.grid_size
+        df['LON_Grid'] = np.round(df['prj_lon'] / self.grid_size) * self.grid_size
+        return df
+
+# (y, x) offsets, as fractions of grid_size, of the grids evaluated when shifted_grids=True
+HALF_CELL_SHIFTS = [(0.0, 0.0), (0.5, 0.0), (0.0, 0.5), (0.5, 0.5)]
+
+STAY_TIME_MODES = ('span', 'dwell')
+
+ENGINES = ('pandas', 'polars', 'duckdb')
+
+# Output column of time-sliced detection (period=...), and the internal (user, period) code column
+PERIOD_COLUMN = 'period'
+PERIOD_GROUP_COLUMN = '_user_period'
+
+# Cells are ranked by stay-time, then unique nights, then point count
+RANK_COLUMNS = ['stay_time', 'num_nights', 'num_points']
+
+
+def _aggregate_cells(df: pd.DataFrame, keys, stay_time_mode: str = 'span', max_gap: float = 3600,
+                     backend: Optional[str] = None) -> pd.DataFrame:
+    """
+    Per-cell stay-time, unique nights and point count, computed by the same sorted-array kernels as
+    fit_arrays (kernels.aggregate_sorted): the keys are coded as integers, the points are sorted once and
+    every statistic is one pass over the sorted points. Cells come out in key order (as with
+    df.groupby(keys, sort=True)); points with a missing key or timestamp are skipped.
+    Stay-time is the last minus the first timestamp in the cell (0 for a single point), or with
+    stay_time_mode='dwell' the capped gaps between consecutive points in the cell (see kernels.dwell_seconds).
+    Stay records (from ghost.preprocessing.staypoints) carry their own end time and point count.
+    """
+    keys = list(keys)
+    grid_keys = [k for k in keys if k in ('LAT_Grid', 'LON_Grid')]
+    # A stream is one user (and shifted grid, anchor, period, ...): the non-spatial part of the key
+    stream = _key_codes(df, [k for k in keys if k not in grid_keys])
+    iy = _key_codes(df, grid_keys[:1])
+    ix = _key_codes(df, grid_keys[1:])
+    ts = _nanoseconds(df['timestamp'])
+    idx = np.flatnonzero((stream >= 0) & (iy >= 0) & (ix >= 0) & (ts != NAT))
+    if len(idx) == 0:
+        return pd.DataFrame({**{k: df[k].iloc[:0] for k in keys}, 'stay_time': [], 'num_nights': [], 'num_points': []})
+    ts = ts[idx]
+    order, sorted_cell, _, _, _, first, last, num_points, num_nights = aggregate_sorted(
+        stream[idx], iy[idx], ix[idx], ts, _nanoseconds(df['date'])[idx], backend=backend)
+    starts = np.flatnonzero(np.r_[True, sorted_cell[1:] != sorted_cell[:-1]])
+    cells = df[keys].iloc[idx[order[starts]]].reset_index(drop=True)
+    end_ts = None
+    if 'end_timestamp' in df.columns:
+        end_ts = _nanoseconds(df['end_timestamp'])[idx]
+        last = np.maximum.reduceat(end_ts[order], starts)
+        num_points = np.add.reduceat(df['point_count'].to_numpy(dtype=np.int64)[idx][order], starts)
+    if stay_time_mode == 'dwell':
+        cell_of_point = np.empty_like(sorted_cell)
+        cell_of_point[order] = sorted_cell
+        cells['stay_time'] = dwell_seconds(stream[idx], ts, cell_of_point, len(starts), max_gap, end_ts=end_ts)
+    else:
+        cells['stay_time'] = (last - first) / 1e9
+    cells['num_nights'] = num_nights
+    cells['num_points'] = num_points
+    return cells
+
+
+def _key_codes(df: pd.DataFrame, columns) -> np.ndarray:
+    # Integer codes of the (joint) column values in sorted key order; -1 where a value is missing
+    if not columns:
+        return np.zeros(len(df), dtype=np.int64)
+    if len(columns) == 1:
+        return pd.factorize(df[columns[0]], sort=True)[0].astype(np.int64)
+    return df.groupby(columns, sort=True).ngroup().to_numpy(dtype=np.int64)
+
+
+def _nanoseconds(timestamps: pd.Series) -> np.ndarray:
+    # int64 nanoseconds (UTC for time zone aware timestamps), NaT as kernels.NAT
+    return pd.DatetimeIndex(timestamps).as_unit('ns').asi8
+
+
+def _point_aggregations(df: pd.DataFrame) -> dict:
+    """
+    Named aggregations for first/last timestamp and point count. Stay records (from
+    ghost.preprocessing.staypoints) carry their own end time and point count.
+    """
+    if 'end_timestamp' in df.columns:
+        return {'first': ('timestamp', 'min'), 'last': ('end_timestamp', 'max'), 'num_points': ('point_count', 'sum')}
+    return {'first': ('timestamp', 'min'), 'last': ('timestamp', 'max'), 'num_points': ('timestamp', 'size')}
+
 
-def grid_based_batch(gdf, grid_size=20, night_start=22, night_end=6, user_id_col='user_id', epsg_in=4326, epsg_out=32617):
+def _aggregate_partials(parts: pd.DataFrame, keys) -> pd.DataFrame:
+    """
+    Combine partial cell aggregates (columns 'first', 'last', 'num_points' and 'date', e.g. one row per
+    cell, date and hour) into the same per-cell stats as _aggregate_cells.
+    """
+    if parts.empty:
+        return pd.DataFrame({**{k: parts[k] for k in keys}, 'stay_time': [], 'num_nights': [], 'num_points': []})
+    cells = parts.groupby(keys, sort=True).agg(
+        first=('first', 'min'),
+        last=('last', 'max'),
+        num_nights=('date', 'nunique'),
+        num_points=('num_points', 'sum'),
+    ).reset_index()
+    cells['stay_time'] = (cells['last'] - cells['first']).dt.total_seconds()
+    return cells[list(keys) + RANK_COLUMNS]
+
+
+def anchor_windows(night_start: int = 22, night_end: int = 6) -> Dict[str, tuple]:
+    """
+    Default named windows for GridHomeDetector.fit_anchors: 'home' (the night window), 'work'
+    (Monday-Friday 09:00-17:00) and 'weekend' (Saturday/Sunday 08:00-20:00, the weekend fallback window).
+    """
+    return {
+        'home': (night_start, night_end),
+        'work': (9, 17, (0, 1, 2, 3, 4)),
+        'weekend': (8, 20, (5, 6)),
+    }
+
+
+def _window_mask(hour, dayofweek, start: int, end: int, days=None) -> np.ndarray:
+    # [start, end) hours, wrapping past midnight when start > end, on the given days of the week
+    hour = np.asarray(hour)
+    mask = (hour >= start) & (hour < end) if start <= end else (hour >= start) | (hour < end)
+    if days is not None:
+        mask &= np.isin(np.asarray(dayofweek), list(days))
+    return mask
+
+
+def _period_labels(timestamps: pd.Series, period):
+    """
+    Label each timestamp with its period: pd.Period for a pandas period alias, pd.Interval for bin edges
+    (NaN outside the bins or for missing timestamps).
+    """
+    ts = pd.to_datetime(timestamps, errors='coerce')
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_localize(None)
+    if isinstance(period, str):
+        return ts.dt.to_period(period)
+    edges = pd.DatetimeIndex(pd.to_datetime(list(period)))
+    if len(edges) < 2 or not edges.is_monotonic_increasing:
+        raise ValueError("period bins must be at least two increasing timestamps.")
+    bins = pd.IntervalIndex.from_breaks(edges, closed='left')
+    codes = np.searchsorted(edges.to_numpy(), ts.to_numpy(), side='right') - 1
+    inside = ts.notnull().to_numpy() & (codes >= 0) & (codes < len(bins))
+    labels = pd.Series(bins.take(codes.clip(0, len(bins) - 1)), index=ts.index)
+    return labels.where(inside)
+
+
+def _select_top_cells(cells: pd.DataFrame, by, k: int = 1, cell_size: Optional[float] = None,
+                      backend: Optional[str] = None) -> pd.DataFrame:
+    """
+    Select the k best cells per group (ranked by RANK_COLUMNS, ties broken by grid order), with the
+    kernels.top_cells selection used by fit_arrays.
+    With cell_size (shifted grids), cells overlapping a better selected cell of the group are skipped,
+    so the runners-up are distinct places rather than shifted copies of the winner.
+    Returns:
+        pd.DataFrame: Selected cells with a 'rank' column (1 = best).
+    """
+    by = list(by)
+    group = _key_codes(cells, by)
+    keep = np.flatnonzero(group >= 0)
+    if len(keep) == 0:
+        return cells.iloc[:0].assign(rank=pd.Series(dtype=int))
+    # Groups must be contiguous; cells from _aggregate_cells already are, so this sort is usually a no-op
+    keep = keep[np.argsort(group[keep], kind='stable')]
+    lat = lon = None
+    if cell_size is not None:
+        lat = cells['LAT_Grid'].to_numpy(dtype=float)[keep]
+        lon = cells['LON_Grid'].to_numpy(dtype=float)[keep]
+    ranked, rank = top_cells(group[keep], cells['stay_time'].to_numpy(dtype=float)[keep],
+                             cells['num_nights'].to_numpy(dtype=np.int64)[keep],
+                             cells['num_points'].to_numpy(dtype=np.int64)[keep], k=k, backend=backend,
+                             lat=lat, lon=lon, cell_size=cell_size)
+    return cells.iloc[keep[ranked]].assign(rank=rank)
+
+
+def _confidence(best_stay, second_stay):
+    """
+    Stay-time margin of the winning cell over the runner-up, as a fraction of the winner's stay-time.
+    1.0 if there is no runner-up, 0.0 if the winner has no stay-time.
+    """
+    best_stay = np.asarray(best_stay, dtype=float)
+    second_stay = np.nan_to_num(np.asarray(second_stay, dtype=float), nan=0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = np.where(best_stay > 0, (best_stay - second_stay) / best_stay, 0.0)
+    return margin
+
+
+def grid_based_batch(gdf, grid_size=20, night_start=22, night_end=6, user_id_col='user_id', epsg_in=4326, epsg_out=32617, top_k=1, shifted_grids=False, stay_time_mode='span', max_gap=3600, engine='pandas', period=None, cells_path=None, memory_limit=None, temp_directory=None):
     """
     Applies the grid-based home detection algorithm to a batch of users.
     Args:
-        gdf (GeoDataFrame): Preprocessed and projected GeoDataFrame with a user ID column.
+        gdf (GeoDataFrame): Preprocessed and projected GeoDataFrame with a user ID column. With engine='polars'
+            or 'duckdb' also a CSV/Parquet path (or a polars frame for 'polars').
         grid_size (int): The grid size in meters.
         night_start (int): Night start hour.
         night_end (int): Night end hour.
         user_id_col (str): The name of the user identifier column.
         epsg_in (int): Input EPSG code.
         epsg_out (int): Output EPSG code.
+        top_k (int): Number of candidate cells to report per user (adds 'confidence' and 'top{r}_*' columns if > 1).
+        shifted_grids (bool): Also evaluate half-cell shifted grids and keep the strongest cell (see GridHomeDetector).
+        stay_time_mode (str): 'span' or 'dwell' (see GridHomeDetector).
+        max_gap (float): Cap (seconds) on each gap counted in 'dwell' mode.
+        engine (str): 'pandas' (default), 'polars' (polars query, see ghost.algorithms.polars_engine)
+            or 'duckdb' (one in-process DuckDB query over the files, see ghost.algorithms.duckdb_engine).
+            The polars and duckdb engines need the respective package and do not support shifted grids
+            or period and cells_path.
+        period (optional): One home per user and period in the same pass: a pandas period alias
+            ('W', 'M', 'Q', ...) or a sequence of bin edges (see GridHomeDetector.fit_batch).
+        cells_path (str, optional): Also write the per-(user, cell) aggregates computed during detection to this
+            file (Parquet for .parquet/.pq, else CSV), as the compact table of GridHomeDetector._cell_table.
+        memory_limit (optional): Memory budget of the duckdb engine (bytes or a size such as '4GB'); it spills
+            to temp_directory beyond it.
+        temp_directory (str, optional): Spill directory of the duckdb engine (default: the system temp dir).
     Returns:
-        DataFrame: One row per user with inferred home location and stats.
-    """
-    from ghost.utils import validate_input_dataframe
-    results = []
-    for user_id, user_df in gdf.groupby(user_id_col):
-        # Convert to DataFrame for compatibility
-        user_df = user_df.copy()
-        # Validate and ensure required columns
-        try:
-            validate_input_dataframe(user_df)
-        except Exception as e:
-            results.append({
-                user_id_col: user_id,
-                'lat': None,
-                'lon': None,
-                'error': str(e)
-            })
-            continue
-        detector = GridHomeDetector(
-            grid_size=grid_size,
-            night_start=night_start,
-            night_end=night_end,
-            epsg_in=epsg_in,
-            epsg_out=epsg_out
-        )
-        home_lat, home_lon, stats = detector.fit(user_df)
-        row = {
-            user_id_col: user_id,
-            'lat': home_lat,
-            'lon': home_lon,
-            **stats
-        }
-        results.append(row)
-    return pd.DataFrame(results) 
\ No newline at end of file
+        DataFrame: One row per user (or per user and period) with inferred home location and stats.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}.")
+    if engine != 'duckdb' and (memory_limit is not None or temp_directory is not None):
+        raise ValueError("memory_limit and temp_directory are only supported by the duckdb engine.")
+    if engine != 'pandas':
+        if shifted_grids:
+            raise ValueError(f"shifted_grids is not supported by the {engine} engine.")
+        if period is not None or cells_path is not None:
+            raise ValueError(f"period and cells_path are not supported by the {engine} engine.")
+        engine_kwargs = {}
+        if engine == 'polars':
+            from ghost.algorithms.polars_engine import polars_batch as engine_batch
+        else:
+            from ghost.algorithms.duckdb_engine import duckdb_batch as engine_batch
+            engine_kwargs = {'memory_limit': memory_limit, 'temp_directory': temp_directory}
+        return engine_batch(gdf, grid_size=grid_size, night_start=night_start, night_end=night_end,
+                            user_id_col=user_id_col, epsg_in=epsg_in, epsg_out=epsg_out, top_k=top_k,
+                            stay_time_mode=stay_time_mode, max_gap=max_gap, **engine_kwargs)
+    detector = GridHomeDetector(
+        grid_size=grid_size,
+        night_start=night_start,
+        night_end=night_end,
+        epsg_in=epsg_in,
+        epsg_out=epsg_out,
+        top_k=top_k,
+        shifted_grids=shifted_grids,
+        stay_time_mode=stay_time_mode,
+        max_gap=max_gap,
+        keep_cells=cells_path is not None
+    )
+    results = detector.fit_batch(gdf, user_id_col=user_id_col, period=period)
+    if cells_path is not None:
+        table = detector.cell_table
+        if table is None:
+            # Invalid input (fit_batch returned error rows): the export is an empty table with the usual columns
+            empty = pd.DataFrame({k: [] for k in [user_id_col, 'LAT_Grid', 'LON_Grid', 'grid_shift'] + RANK_COLUMNS})
+            table = detector._cell_table({'night': empty, 'weekend': empty}, user_id_col, [])
+        with ResultsWriter(cells_path, optional_columns=()) as writer:
+            writer.write(table)
+    return results
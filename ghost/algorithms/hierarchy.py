@@ -0,0 +1,200 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ghost.algorithms.grid import STAY_TIME_MODES, GridHomeDetector, _aggregate_cells, _aggregate_partials, _point_aggregations
+from ghost.utils import validate_input_dataframe
+
+# GHOST.algorithms.hierarchy: Multi-resolution grid built from a single fine binning pass
+PARTIAL_KEYS = ['date', 'hour']
+
+
+class HierarchicalGrid:
+    """
+    Multi-resolution GHOST grid: points are binned once at a fine base resolution and every coarser
+    level (2x, 4x, 8x, ... the base size) is built by rolling up its child cells, without rescanning points.
+
+    Cells are anchored at the projection origin (floor binning), so each coarse cell is exactly the union
+    of its children. Cell centers are therefore offset by half a cell from the rounding grid used by
+    GridHomeDetector at the same size.
+
+    With stay_time_mode='dwell' the binned points are kept, because dwell time depends on which consecutive
+    points share a cell at each level; every level is then aggregated from the points' base cells instead
+    of being rolled up.
+
+    Example:
+        >>> from ghost.algorithms.hierarchy import HierarchicalGrid
+        >>> grid = HierarchicalGrid(base_size=5, levels=5).fit(gdf)
+        >>> results_20m = grid.detect(20)
+        >>> adaptive = grid.detect_adaptive(min_nights=3)
+    """
+    def __init__(self, base_size: float = 5, levels: int = 5, night_start: int = 22, night_end: int = 6,
+                 epsg_in: int = 4326, epsg_out: int = 32617, top_k: int = 1, stay_time_mode: str = 'span',
+                 max_gap: float = 3600):
+        """
+        Args:
+            base_size (float): Finest cell size in meters.
+            levels (int): Number of levels; level l has cells of base_size * 2**l meters.
+            night_start (int): Night start hour (24h clock).
+            night_end (int): Night end hour (24h clock).
+            epsg_in (int): Input EPSG code.
+            epsg_out (int): Output EPSG code for projection.
+            top_k (int): Number of candidate cells to report (see GridHomeDetector).
+            stay_time_mode (str): 'span' or 'dwell' (see GridHomeDetector).
+            max_gap (float): Cap (seconds) on each gap counted in 'dwell' mode.
+        """
+        if levels < 1:
+            raise ValueError("levels must be at least 1.")
+        if stay_time_mode not in STAY_TIME_MODES:
+            raise ValueError(f"Unknown stay_time_mode: {stay_time_mode}. Expected one of {STAY_TIME_MODES}.")
+        self.base_size = base_size
+        self.levels = levels
+        self.night_start = night_start
+        self.night_end = night_end
+        self.epsg_in = epsg_in
+        self.epsg_out = epsg_out
+        self.top_k = top_k
+        self.stay_time_mode = stay_time_mode
+        self.max_gap = max_gap
+        self.user_id_col = None
+        self.users = None
+        self.level_tables = []
+        self.points = None
+
+    @property
+    def sizes(self):
+        """Cell size (meters) of each level, finest first."""
+        return [self.base_size * 2 ** level for level in range(self.levels)]
+
+    def fit(self, df: pd.DataFrame, user_id_col: str = 'user_id'):
+        """
+        Project and bin the points once at the base resolution, then roll up all coarser levels.
+        Args:
+            df (pd.DataFrame): Points with ['timestamp', 'lat', 'lon'] and a user ID column.
+            user_id_col (str): The name of the user identifier column.
+        Returns:
+            self: Enables method chaining.
+        """
+        validate_input_dataframe(df)
+        self.user_id_col = user_id_col
+        self.users = pd.Index(df[user_id_col].dropna().unique()).sort_values()
+        points = self._detector(self.base_size)._featurize(df)
+        points = points[points['prj_lat'].notnull() & points['prj_lon'].notnull()]
+        points = points.assign(
+            iy=np.floor(points['prj_lat'].to_numpy() / self.base_size).astype(np.int64),
+            ix=np.floor(points['prj_lon'].to_numpy() / self.base_size).astype(np.int64),
+        )
+        if self.stay_time_mode == 'dwell':
+            self.points = points
+        keys = [user_id_col, 'iy', 'ix'] + PARTIAL_KEYS
+        table = points.groupby(keys, sort=False).agg(**_point_aggregations(points)).reset_index()
+        self.level_tables = [table]
+        for _ in range(1, self.levels):
+            child = self.level_tables[-1]
+            parent = child.assign(iy=child['iy'] // 2, ix=child['ix'] // 2)
+            parent = parent.groupby(keys, sort=False).agg(
+                first=('first', 'min'),
+                last=('last', 'max'),
+                num_points=('num_points', 'sum'),
+            ).reset_index()
+            self.level_tables.append(parent)
+        return self
+
+    def cells(self, grid_size: float, window: str = 'night') -> pd.DataFrame:
+        """
+        Per-(user, cell) stay-time aggregates at one level, for the 'night' or 'weekend' window.
+        Args:
+            grid_size (float): Cell size; must be one of `sizes`.
+            window (str): 'night' or 'weekend'.
+        Returns:
+            pd.DataFrame: Columns [user, LAT_Grid, LON_Grid, stay_time, num_nights, num_points] (cell centers).
+        """
+        level = self._level(grid_size)
+        table = self.level_tables[level] if self.points is None else self.points
+        detector = self._detector(grid_size)
+        if window == 'night':
+            mask = detector._night_mask(table['hour'])
+        elif window == 'weekend':
+            mask = detector._weekend_mask(table['hour'], table['date'].dt.dayofweek)
+        else:
+            raise ValueError(f"Unknown window: {window}. Expected 'night' or 'weekend'.")
+        if self.points is not None:
+            # Base cells of the points in the window, coarsened to this level; the dwell gaps are
+            # taken per user stream, so the cell columns must be named like GridHomeDetector's
+            points = table[mask]
+            points = points.assign(LAT_Grid=(points['iy'] // 2 ** level + 0.5) * grid_size,
+                                   LON_Grid=(points['ix'] // 2 ** level + 0.5) * grid_size)
+            return _aggregate_cells(points, [self.user_id_col, 'LAT_Grid', 'LON_Grid'],
+                                    stay_time_mode='dwell', max_gap=self.max_gap)
+        cells = _aggregate_partials(table[mask], [self.user_id_col, 'iy', 'ix'])
+        cells['LAT_Grid'] = (cells['iy'] + 0.5) * grid_size
+        cells['LON_Grid'] = (cells['ix'] + 0.5) * grid_size
+        return cells.drop(columns=['iy', 'ix'])
+
+    def detect(self, grid_size: float) -> pd.DataFrame:
+        """
+        Home detection at one level (night cells first, weekend fallback), without touching the points.
+        Args:
+            grid_size (float): Cell size; must be one of `sizes`.
+        Returns:
+            pd.DataFrame: One row per user, same fields as grid_based_batch.
+        """
+        detector = self._detector(grid_size)
+        return detector._results_from_cells(self.users, self.cells(grid_size, 'night'),
+                                            self.cells(grid_size, 'weekend'), self.user_id_col)
+
+    def detect_multiscale(self) -> pd.DataFrame:
+        """
+        Home detection at every level.
+        Returns:
+            pd.DataFrame: One row per (grid_size, user).
+        """
+        parts = [self.detect(size).assign(grid_size=size) for size in self.sizes]
+        return pd.concat(parts, ignore_index=True)
+
+    def detect_adaptive(self, min_stay_time: Optional[float] = None, min_nights: Optional[int] = None,
+                        min_points: Optional[int] = None) -> pd.DataFrame:
+        """
+        Adaptive cell sizing: use the finest level whose winning cell is strong enough, falling back
+        to coarser cells when the fine winner is weak (e.g. GPS noise spreads the home over several cells).
+        Args:
+            min_stay_time (float, optional): Minimum stay-time (seconds) of the winning cell.
+            min_nights (int, optional): Minimum unique nights of the winning cell.
+            min_points (int, optional): Minimum point count of the winning cell.
+        Returns:
+            pd.DataFrame: One row per user with a 'grid_size' column giving the level used.
+                Users with no strong winner at any level get the coarsest level.
+        """
+        user_id_col = self.user_id_col
+        chosen = []
+        pending = self.users
+        for i, size in enumerate(self.sizes):
+            results = self.detect(size).assign(grid_size=size)
+            results = results[results[user_id_col].isin(pending)]
+            strong = results['inferred_from'].notnull()
+            if min_stay_time is not None:
+                strong &= results['stay_time'] >= min_stay_time
+            if min_nights is not None:
+                strong &= results['num_nights'] >= min_nights
+            if min_points is not None:
+                strong &= results['num_points'] >= min_points
+            if i == len(self.sizes) - 1:
+                strong[:] = True
+            chosen.append(results[strong])
+            pending = results.loc[~strong, user_id_col]
+            if pending.empty:
+                break
+        results = pd.concat(chosen, ignore_index=True)
+        return results.set_index(user_id_col).reindex(self.users).rename_axis(user_id_col).reset_index()
+
+    def _level(self, grid_size: float) -> int:
+        for level, size in enumerate(self.sizes):
+            if np.isclose(size, grid_size):
+                return level
+        raise ValueError(f"grid_size {grid_size} is not a level of this grid; available sizes: {self.sizes}")
+
+    def _detector(self, grid_size: float) -> GridHomeDetector:
+        return GridHomeDetector(grid_size=grid_size, night_start=self.night_start, night_end=self.night_end,
+                                epsg_in=self.epsg_in, epsg_out=self.epsg_out, top_k=self.top_k,
+                                stay_time_mode=self.stay_time_mode, max_gap=self.max_gap)
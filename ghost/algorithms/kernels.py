@@ -0,0 +1,305 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Optional compiled backend
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# GHOST.algorithms.kernels: Array kernels behind GridHomeDetector (fit_arrays and the DataFrame paths)
+KERNEL_BACKENDS = ('numpy', 'numba')
+NS_PER_HOUR = 3600 * 10 ** 9
+NS_PER_DAY = 24 * NS_PER_HOUR
+NAT = np.iinfo(np.int64).min
+# 1970-01-01 was a Thursday (dayofweek 3, Monday=0)
+EPOCH_DAYOFWEEK = 3
+
+
+def as_nanoseconds(timestamps) -> np.ndarray:
+    """
+    Timestamps as int64 nanoseconds (wall-clock time, as datetime64[ns] without time zone).
+    Accepts int64 nanoseconds or datetime64 arrays; NaT is kept as the int64 minimum.
+    """
+    ts = np.asarray(timestamps)
+    if np.issubdtype(ts.dtype, np.datetime64):
+        ts = ts.astype('datetime64[ns]').view(np.int64)
+    return np.ascontiguousarray(ts, dtype=np.int64)
+
+
+def time_fields(ts_ns: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Day number (days since 1970-01-01), hour and dayofweek (Monday=0) of int64 nanosecond timestamps.
+    """
+    day = np.floor_divide(ts_ns, NS_PER_DAY)
+    hour = np.floor_divide(ts_ns, NS_PER_HOUR) % 24
+    dayofweek = (day + EPOCH_DAYOFWEEK) % 7
+    return day, hour, dayofweek
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """
+    Kernel backend to use: 'numba' when installed (default), otherwise 'numpy'.
+    """
+    if backend is None:
+        return 'numba' if numba is not None else 'numpy'
+    if backend not in KERNEL_BACKENDS:
+        raise ValueError(f"backend must be one of {KERNEL_BACKENDS}.")
+    if backend == 'numba' and numba is None:
+        raise ImportError("numba is required for the 'numba' kernel backend.")
+    return backend
+
+
+def _jit(func):
+    # Compiled when numba is installed; the plain Python function is kept as `func.py_func` either way
+    if numba is None:
+        func.py_func = func
+        return func
+    return numba.njit(cache=True)(func)
+
+
+def aggregate_sorted(stream: np.ndarray, iy: np.ndarray, ix: np.ndarray, ts: np.ndarray, day: np.ndarray,
+                     backend: Optional[str] = None):
+    """
+    Per-cell first/last timestamp, point count and unique days, with cells keyed by (stream, iy, ix).
+
+    One lexsort by (stream, iy, ix, timestamp); every reduction is then a single pass over the
+    sorted points. Cells come out in key order.
+    Returns:
+        Tuple of arrays: (order, cell_of_sorted_point, stream, iy, ix, first, last, num_points, num_nights).
+    """
+    order = np.lexsort((ts, ix, iy, stream))
+    s, y, x, t, d = stream[order], iy[order], ix[order], ts[order], day[order]
+    reduce = _reduce_sorted_numba if resolve_backend(backend) == 'numba' else _reduce_sorted_numpy
+    cell_of_point, starts, first, last, num_points, num_nights = reduce(s, y, x, t, d)
+    return order, cell_of_point, s[starts], y[starts], x[starts], first, last, num_points, num_nights
+
+
+def _reduce_sorted_numpy(s, y, x, t, d):
+    n = len(t)
+    new_cell = np.ones(n, dtype=bool)
+    new_cell[1:] = (s[1:] != s[:-1]) | (y[1:] != y[:-1]) | (x[1:] != x[:-1])
+    starts = np.flatnonzero(new_cell)
+    ends = np.append(starts[1:], n) - 1
+    # Days are non-decreasing within a cell, so each change of day is a new night
+    new_day = new_cell.copy()
+    new_day[1:] |= d[1:] != d[:-1]
+    cell_of_point = np.cumsum(new_cell) - 1
+    num_nights = np.bincount(cell_of_point, weights=new_day, minlength=len(starts)).astype(np.int64)
+    num_points = np.diff(np.append(starts, n))
+    return cell_of_point, starts, t[starts], t[ends], num_points, num_nights
+
+
+@_jit
+def _reduce_sorted_numba(s, y, x, t, d):
+    n = len(t)
+    num_cells = 0
+    for i in range(n):
+        if i == 0 or s[i] != s[i - 1] or y[i] != y[i - 1] or x[i] != x[i - 1]:
+            num_cells += 1
+    cell_of_point = np.empty(n, dtype=np.int64)
+    starts = np.empty(num_cells, dtype=np.int64)
+    first = np.empty(num_cells, dtype=np.int64)
+    last = np.empty(num_cells, dtype=np.int64)
+    num_points = np.zeros(num_cells, dtype=np.int64)
+    num_nights = np.zeros(num_cells, dtype=np.int64)
+    c = -1
+    for i in range(n):
+        if i == 0 or s[i] != s[i - 1] or y[i] != y[i - 1] or x[i] != x[i - 1]:
+            c += 1
+            starts[c] = i
+            first[c] = t[i]
+            num_nights[c] = 1
+        elif d[i] != d[i - 1]:
+            num_nights[c] += 1
+        num_points[c] += 1
+        last[c] = t[i]
+        cell_of_point[i] = c
+    return cell_of_point, starts, first, last, num_points, num_nights
+
+
+def dwell_seconds(stream: np.ndarray, ts: np.ndarray, cell: np.ndarray, num_cells: int, max_gap: float,
+                  end_ts: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Dwell stay-time per cell: gaps between consecutive points of a stream (in time order) that stay
+    in the same cell, each capped at max_gap seconds. For stay records (end_ts), gaps run from the
+    previous record's end and each record adds its own duration.
+    """
+    order = np.lexsort((ts, stream))
+    s, t, c = stream[order], ts[order], cell[order]
+    end = t if end_ts is None else end_ts[order]
+    same = (c[1:] == c[:-1]) & (s[1:] == s[:-1])
+    gaps = np.where(same, np.minimum((t[1:] - end[:-1]) / 1e9, max_gap), 0.0)
+    dwell = np.bincount(c[1:], weights=gaps, minlength=num_cells)[:num_cells]
+    if end_ts is not None:
+        dwell += np.bincount(c, weights=(end - t) / 1e9, minlength=num_cells)[:num_cells]
+    return dwell
+
+
+def top_cells(user: np.ndarray, stay_time: np.ndarray, num_nights: np.ndarray, num_points: np.ndarray, k: int = 1,
+              backend: Optional[str] = None, lat: Optional[np.ndarray] = None, lon: Optional[np.ndarray] = None,
+              cell_size: Optional[float] = None):
+    """
+    The k best cells of each user by stay-time, unique nights and point count (descending), ties going
+    to the first cell in key order. Cells must be sorted by user. With cell centers (lat, lon) and
+    cell_size, cells overlapping a better selected cell of the same user are skipped (shifted grids).
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (cells, rank): selected cell indices ordered by user then rank,
+            and their rank (1 = best).
+    """
+    separate = cell_size is not None and k > 1
+    if resolve_backend(backend) == 'numba':
+        if not separate:
+            lat = lon = np.zeros(len(user))
+        return _top_cells_numba(np.ascontiguousarray(user, dtype=np.int64), np.ascontiguousarray(stay_time, dtype=float),
+                                np.ascontiguousarray(num_nights, dtype=np.int64),
+                                np.ascontiguousarray(num_points, dtype=np.int64), k,
+                                np.ascontiguousarray(lat, dtype=float), np.ascontiguousarray(lon, dtype=float),
+                                float(cell_size) if separate else 0.0)
+    n = len(user)
+    order = np.lexsort((np.arange(n), -num_points, -num_nights, -stay_time, user))
+    u = user[order]
+    new_user = np.ones(n, dtype=bool)
+    new_user[1:] = u[1:] != u[:-1]
+    if separate and n:
+        return _top_separated(order, new_user, np.asarray(lat, dtype=float)[order],
+                              np.asarray(lon, dtype=float)[order], k, cell_size)
+    group_start = np.maximum.accumulate(np.where(new_user, np.arange(n), 0))
+    rank = np.arange(n) - group_start + 1
+    keep = rank <= k
+    return order[keep], rank[keep]
+
+
+def _top_separated(order, new_user, lat, lon, k, cell_size):
+    # k rounds over the ranked cells: each round takes the best cell left per user, then drops that
+    # user's cells overlapping it (centers less than one cell size apart on both axes)
+    group = np.cumsum(new_user) - 1
+    alive = np.ones(len(order), dtype=bool)
+    cells, ranks = [], []
+    for r in range(1, k + 1):
+        idx = np.flatnonzero(alive)
+        if len(idx) == 0:
+            break
+        first = idx[np.r_[True, group[idx[1:]] != group[idx[:-1]]]]
+        cells.append(first)
+        ranks.append(np.full(len(first), r))
+        pick = np.full(group[-1] + 1, -1)
+        pick[group[first]] = first
+        p = pick[group]
+        has = p >= 0
+        p = np.where(has, p, 0)
+        alive &= ~(has & (np.abs(lat - lat[p]) < cell_size) & (np.abs(lon - lon[p]) < cell_size))
+    pos = np.concatenate(cells)
+    rank = np.concatenate(ranks)
+    by_user = np.lexsort((rank, pos))
+    return order[pos[by_user]], rank[by_user]
+
+
+@_jit
+def _top_cells_numba(user, stay_time, num_nights, num_points, k, lat, lon, cell_size):
+    # k rounds of a tie-broken argmax over each user's contiguous run of cells; with cell_size > 0,
+    # cells overlapping one already taken for the user are skipped
+    n = len(user)
+    cells = np.empty(n, dtype=np.int64)
+    rank = np.empty(n, dtype=np.int64)
+    taken = np.zeros(n, dtype=np.bool_)
+    m = 0
+    start = 0
+    while start < n:
+        end = start
+        while end < n and user[end] == user[start]:
+            end += 1
+        first_taken = m
+        for r in range(1, k + 1):
+            best = -1
+            for i in range(start, end):
+                if taken[i]:
+                    continue
+                if cell_size > 0:
+                    overlaps = False
+                    for j in range(first_taken, m):
+                        if abs(lat[i] - lat[cells[j]]) < cell_size and abs(lon[i] - lon[cells[j]]) < cell_size:
+                            overlaps = True
+                            break
+                    if overlaps:
+                        continue
+                if best < 0 or stay_time[i] > stay_time[best] or (
+                        stay_time[i] == stay_time[best] and (num_nights[i] > num_nights[best] or (
+                            num_nights[i] == num_nights[best] and num_points[i] > num_points[best]))):
+                    best = i
+            if best < 0:
+                break
+            taken[best] = True
+            cells[m] = best
+            rank[m] = r
+            m += 1
+        start = end
+    return cells[:m], rank[:m]
+
+
+def stay_runs(breaks: np.ndarray, x: np.ndarray, y: np.ndarray, distance_threshold: float,
+              backend: Optional[str] = None) -> np.ndarray:
+    """
+    Run id of every point of a time-ordered stream: a new run starts at every forced break and at the
+    first point farther than distance_threshold from its run's first point (see compress_stay_points).
+    The numpy backend resolves all segments between breaks in parallel rounds: each round finds, per
+    segment, the first point too far from the segment's anchor, which anchors a new segment. Once a round
+    settles less than half of the open points (points moving steadily), the rest is walked point by point.
+    Returns:
+        np.ndarray: int64 run ids (0, 1, ...) in point order.
+    """
+    n = len(breaks)
+    x = np.ascontiguousarray(x, dtype=float)
+    y = np.ascontiguousarray(y, dtype=float)
+    limit = float(distance_threshold) ** 2
+    run_start = np.array(breaks, dtype=bool)
+    if n:
+        run_start[0] = True
+    if resolve_backend(backend) == 'numba':
+        return np.cumsum(_stay_starts_numba(run_start, x, y, limit)) - 1
+    # Open points, as contiguous blocks that each begin at a run start
+    idx = np.arange(n)
+    while len(idx):
+        starts = run_start[idx]
+        anchor = idx[np.maximum.accumulate(np.where(starts, np.arange(len(idx)), 0))]
+        far = np.flatnonzero((x[idx] - x[anchor]) ** 2 + (y[idx] - y[anchor]) ** 2 > limit)
+        first = far[np.r_[True, anchor[far[1:]] != anchor[far[:-1]]]] if len(far) else far
+        run_start[idx[first]] = True
+        # Points from each new start on stay open; the rest of their old segment is settled
+        opened = np.zeros(len(idx), dtype=bool)
+        opened[first] = True
+        segment = np.cumsum(starts | opened)
+        remaining = idx[np.isin(segment, segment[first])]
+        if len(remaining) > len(idx) // 2:
+            # Little progress (points moving steadily): finish these segments point by point
+            run_start[remaining] = _walk_stay_starts(run_start[remaining], x[remaining], y[remaining], limit)
+            break
+        idx = remaining
+    return np.cumsum(run_start) - 1
+
+
+def _walk_stay_starts(run_start, x, y, limit):
+    # Plain Python floats are much faster than NumPy scalars in this loop
+    out = run_start.copy()
+    anchor_x = anchor_y = 0.0
+    for i, (start, xi, yi) in enumerate(zip(run_start.tolist(), x.tolist(), y.tolist())):
+        if start or (xi - anchor_x) ** 2 + (yi - anchor_y) ** 2 > limit:
+            out[i] = True
+            anchor_x = xi
+            anchor_y = yi
+    return out
+
+
+@_jit
+def _stay_starts_numba(run_start, x, y, limit):
+    # Sequential walk: a point starts a new run at a break or when too far from the run's first point
+    out = run_start.copy()
+    anchor_x = 0.0
+    anchor_y = 0.0
+    for i in range(len(out)):
+        if out[i] or (x[i] - anchor_x) ** 2 + (y[i] - anchor_y) ** 2 > limit:
+            out[i] = True
+            anchor_x = x[i]
+            anchor_y = y[i]
+    return out
@@ -0,0 +1,156 @@
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+from ghost.algorithms.grid import GridHomeDetector
+from ghost.preprocessing.projection import get_transformer
+
+# Optional dependency for engine='polars'
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+# GHOST.algorithms.polars_engine: Polars query from input files to per-user home cells
+CELL_COLUMNS = ['LAT_Grid', 'LON_Grid']
+
+
+def scan_points(source, user_id_col: str = 'user_id'):
+    """
+    Lazy frame over the input points.
+    Args:
+        source: CSV or Parquet path, pandas DataFrame, or polars DataFrame/LazyFrame with
+            ['timestamp', 'lat', 'lon'] (and optionally user_id_col).
+        user_id_col (str): User ID column; a constant user is added if it is missing (as in read_data).
+    Returns:
+        polars.LazyFrame: Points with a datetime 'timestamp' column.
+    """
+    if pl is None:
+        raise ImportError("polars is required for engine='polars'.")
+    if isinstance(source, pl.LazyFrame):
+        lf = source
+    elif isinstance(source, pl.DataFrame):
+        lf = source.lazy()
+    elif isinstance(source, pd.DataFrame):
+        lf = pl.from_pandas(pd.DataFrame(source.drop(columns='geometry', errors='ignore'))).lazy()
+    else:
+        path = pathlib.Path(source)
+        suffix = path.suffix.lower()
+        if suffix in ('.parquet', '.pq'):
+            lf = pl.scan_parquet(str(path))
+        elif suffix in ('.csv', '.txt'):
+            lf = pl.scan_csv(str(path), try_parse_dates=True)
+        else:
+            raise ValueError(f"Unsupported input for the polars engine: {path}. Expected a CSV or Parquet file.")
+    schema = lf.collect_schema()
+    if user_id_col not in schema:
+        lf = lf.with_columns(pl.lit(1).alias(user_id_col))
+    if schema['timestamp'] == pl.Utf8:
+        lf = lf.with_columns(pl.col('timestamp').str.to_datetime(strict=False))
+    return lf
+
+
+def _with_cells(lf, columns, grid_size: float, epsg_in: int, epsg_out: int):
+    """
+    Collect the given columns and add the grid cells, projected with pyproj in the calling thread
+    (pyproj crashes when called from polars worker threads, e.g. inside map_batches). Uses np.round,
+    so cells are exactly those of the pandas path; points without coordinates get null cells.
+    Returns:
+        polars.LazyFrame: The collected points with 'LAT_Grid' and 'LON_Grid'.
+    """
+    df = _collect_all([lf.select(columns)])[0]
+    lat = df['lat'].cast(pl.Float64).to_numpy()
+    lon = df['lon'].cast(pl.Float64).to_numpy()
+    x, y = get_transformer(epsg_in, epsg_out).transform(lon, lat)
+    x = np.where(np.isfinite(x), x, np.nan)
+    y = np.where(np.isfinite(y), y, np.nan)
+    return df.with_columns(
+        pl.Series('LAT_Grid', np.round(y / grid_size) * grid_size, nan_to_null=True),
+        pl.Series('LON_Grid', np.round(x / grid_size) * grid_size, nan_to_null=True),
+    ).lazy()
+
+
+def _window_top_cells(points, mask, user_id_col: str, top_k: int, stay_time_mode: str, max_gap: float,
+                      is_records: bool):
+    """
+    Per-(user, cell) stay-time, unique nights and point count for one time window, reduced to each
+    user's top_k cells (ranked by stay-time, nights, points; ties to the first cell in grid order).
+    """
+    keys = [user_id_col] + CELL_COLUMNS
+    end = pl.col('end_timestamp') if is_records else pl.col('timestamp')
+    window = points.filter(mask)
+    aggs = [
+        pl.col('timestamp').min().alias('first'),
+        end.max().alias('last'),
+        pl.col('date').n_unique().alias('num_nights'),
+        (pl.col('point_count').sum() if is_records else pl.len()).alias('num_points'),
+    ]
+    if stay_time_mode == 'dwell':
+        # Gap from the previous point (or stay record end) of the same user, if both are in the same cell
+        same_cell = pl.all_horizontal([pl.col(k) == pl.col(k).shift(1) for k in keys])
+        gap = (pl.col('timestamp') - end.shift(1)).dt.total_nanoseconds() / 1e9
+        window = window.sort([user_id_col, 'timestamp'], maintain_order=True).with_columns(
+            pl.when(same_cell).then(gap.clip(upper_bound=max_gap)).otherwise(0.0).alias('gap'),
+            ((end - pl.col('timestamp')).dt.total_nanoseconds() / 1e9).alias('duration'),
+        )
+        aggs.append((pl.col('gap').sum() + pl.col('duration').sum()).alias('stay_time'))
+    cells = window.group_by(keys).agg(aggs)
+    if stay_time_mode != 'dwell':
+        cells = cells.with_columns(((pl.col('last') - pl.col('first')).dt.total_nanoseconds() / 1e9).alias('stay_time'))
+    ranked = cells.sort(
+        [user_id_col, 'stay_time', 'num_nights', 'num_points'] + CELL_COLUMNS,
+        descending=[False, True, True, True, False, False],
+    )
+    return ranked.group_by(user_id_col, maintain_order=True).head(top_k).select(
+        keys + ['stay_time', 'num_nights', 'num_points'])
+
+
+def _collect_all(frames):
+    # Shared scan and projection across the outputs; streaming engine where supported
+    try:
+        return pl.collect_all(frames, engine='streaming')
+    except TypeError:
+        return pl.collect_all(frames)
+
+
+def polars_batch(source, grid_size=20, night_start=22, night_end=6, user_id_col='user_id', epsg_in=4326,
+                 epsg_out=32617, top_k=1, stay_time_mode='span', max_gap=3600) -> pd.DataFrame:
+    """
+    GHOST batch detection with polars: the input is scanned lazily and only the columns detection needs
+    are collected for the projection (done with pyproj in this thread); time features, night/weekend
+    windows, per-(user, cell) aggregation and top-k selection with the weekend fallback then run as one
+    lazy query. Only each user's top cells leave polars; the results frame is built exactly as in grid_based_batch.
+    Args:
+        source: CSV or Parquet path, pandas DataFrame, or polars DataFrame/LazyFrame (see scan_points).
+            Stay records from compress_stay_points are accepted too.
+        grid_size, night_start, night_end, user_id_col, epsg_in, epsg_out, top_k, stay_time_mode, max_gap:
+            As in grid_based_batch.
+    Returns:
+        pd.DataFrame: One row per user, same layout as grid_based_batch.
+    Example:
+        >>> from ghost.algorithms.polars_engine import polars_batch
+        >>> results = polars_batch('points.parquet', grid_size=20)
+    """
+    detector = GridHomeDetector(grid_size=grid_size, night_start=night_start, night_end=night_end, epsg_in=epsg_in,
+                                epsg_out=epsg_out, top_k=top_k, stay_time_mode=stay_time_mode, max_gap=max_gap)
+    lf = scan_points(source, user_id_col=user_id_col)
+    is_records = 'end_timestamp' in lf.collect_schema()
+    # Only the columns detection needs are materialized, for the projection
+    columns = [user_id_col, 'timestamp', 'lat', 'lon'] + (['end_timestamp', 'point_count'] if is_records else [])
+    points = _with_cells(lf.filter(pl.col(user_id_col).is_not_null()), columns, grid_size, epsg_in, epsg_out)
+    points = points.with_columns(
+        pl.col('timestamp').dt.hour().alias('hour'),
+        (pl.col('timestamp').dt.weekday() - 1).alias('dayofweek'),
+        pl.col('timestamp').dt.date().alias('date'),
+    )
+    users = points.select(pl.col(user_id_col).unique())
+    points = points.filter(pl.col('LAT_Grid').is_not_null() & pl.col('timestamp').is_not_null())
+    night = (pl.col('hour') >= night_start) | (pl.col('hour') < night_end)
+    weekend = pl.col('dayofweek').is_in([5, 6]) & (pl.col('hour') >= 8) & (pl.col('hour') < 20)
+    night_top = _window_top_cells(points, night, user_id_col, top_k, stay_time_mode, max_gap, is_records)
+    weekend_top = _window_top_cells(points, weekend, user_id_col, top_k, stay_time_mode, max_gap, is_records)
+    weekend_top = weekend_top.join(night_top.select(user_id_col).unique(), on=user_id_col, how='anti')
+    night_cells, weekend_cells, user_ids = _collect_all([night_top, weekend_top, users])
+    users = pd.Index(user_ids[user_id_col].to_pandas()).sort_values()
+    return detector._results_from_cells(users, night_cells.to_pandas(), weekend_cells.to_pandas(), user_id_col)
@@ -0,0 +1,180 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ghost.algorithms.grid import GridHomeDetector, _point_aggregations
+from ghost.utils import validate_input_dataframe
+
+# GHOST.algorithms.rolling: Sliding-window home detection for relocation tracking
+WINDOWS = ('night', 'weekend')
+TIMELINE_COLUMNS = ['window_start', 'window_end', 'lat', 'lon', 'prj_lat', 'prj_lon', 'stay_time', 'num_nights',
+                    'num_points', 'inferred_from']
+
+
+def rolling_home_timeline(gdf: pd.DataFrame, window_days: int = 60, step_days: int = 1, user_id_col: str = 'user_id',
+                          detector: Optional[GridHomeDetector] = None) -> pd.DataFrame:
+    """
+    Sliding-window home detection: the home is re-evaluated over the last window_days days, advanced by
+    step_days, and a row is emitted whenever a user's home cell (or its source window) changes.
+
+    Points are projected and aggregated once into per-(user, cell, day) partials. Advancing the window
+    adds the new days and expires the old ones in O(entering + expired partials); only the cells of users
+    with entering or expiring partials are re-ranked.
+
+    Args:
+        gdf (pd.DataFrame): Points with ['timestamp', 'lat', 'lon'] and a user ID column.
+        window_days (int): Window length in days (e.g. 60 nights).
+        step_days (int): Days the window advances per step.
+        user_id_col (str): The name of the user identifier column.
+        detector (GridHomeDetector, optional): Detection parameters (grid size, night window, shifted grids);
+            span stay-time only.
+    Returns:
+        pd.DataFrame: Timeline with one row per (user, change): [user_id_col, 'window_start', 'window_end',
+            'lat', 'lon', 'prj_lat', 'prj_lon', 'stay_time', 'num_nights', 'num_points', 'inferred_from'].
+            window_end is the last day in the window and the stats are those of that window; a row with
+            NaN location means the user has no nighttime or weekend points in the window any more.
+    Example:
+        >>> from ghost.algorithms.rolling import rolling_home_timeline
+        >>> timeline = rolling_home_timeline(gdf, window_days=60, step_days=1)
+        >>> moves = timeline[timeline['user_id'] == 'u1']
+    """
+    detector = detector or GridHomeDetector()
+    if detector.stay_time_mode != 'span':
+        raise ValueError("Rolling-window detection supports stay_time_mode='span' only.")
+    if window_days < 1 or step_days < 1:
+        raise ValueError("window_days and step_days must be at least 1.")
+    validate_input_dataframe(gdf)
+    points = detector._prepare(gdf[gdf[user_id_col].notnull()])
+    if detector.shifted_grids:
+        points = detector._expand_shifts(points, [user_id_col])
+    cell_keys = detector._cell_keys()
+    keys = [user_id_col] + cell_keys + ['date']
+    masks = {
+        'night': detector._night_mask(points['hour']),
+        'weekend': detector._weekend_mask(points['hour'], points['dayofweek']),
+    }
+    partials = []
+    for code, window in enumerate(WINDOWS):
+        window_points = points[masks[window]]
+        part = window_points.groupby(keys, sort=True).agg(**_point_aggregations(window_points)).reset_index()
+        partials.append(part.assign(window=code))
+    partials = pd.concat(partials, ignore_index=True)
+    if partials.empty:
+        return pd.DataFrame(columns=[user_id_col] + TIMELINE_COLUMNS)
+    user_codes, user_ids = pd.factorize(partials[user_id_col], sort=True)
+    partials['user'] = user_codes
+    partials['day'] = (partials['date'] - pd.Timestamp('1970-01-01')).dt.days
+    # Rows sorted by (user, window, cell, day): each cell's days are contiguous and in day order, and
+    # cell ids follow grid order within each user and window
+    partials = partials.sort_values(['user', 'window'] + cell_keys + ['day'], kind='stable').reset_index(drop=True)
+    cell = partials.groupby(['user', 'window'] + cell_keys, sort=False).ngroup().to_numpy()
+    cell_start = np.flatnonzero(np.r_[True, cell[1:] != cell[:-1]])
+    cells = partials.iloc[cell_start]
+    cell_user = cells['user'].to_numpy()
+    cell_window = cells['window'].to_numpy()
+    # Cells are contiguous per user: user u owns cells user_cells[u]:user_cells[u + 1]
+    user_cells = np.searchsorted(cell_user, np.arange(len(user_ids) + 1))
+    row_user = partials['user'].to_numpy()
+    first = _nanoseconds(partials['first'])
+    last = _nanoseconds(partials['last'])
+    points_before = np.r_[0, np.cumsum(partials['num_points'].to_numpy())]
+    day = partials['day'].to_numpy()
+    by_day = np.argsort(day, kind='stable')
+    sorted_days = day[by_day]
+    # Active rows of cell c are head[c]:tail[c]; adding a day advances tail, expiring it advances head
+    head = cell_start.copy()
+    tail = cell_start.copy()
+    current = np.full(len(user_ids), -1)
+    timeline = []
+    added = expired = 0
+    first_day, last_day = int(sorted_days[0]), int(sorted_days[-1])
+    for end_day in range(first_day, last_day + step_days, step_days):
+        end_day = min(end_day, last_day)
+        stop = int(np.searchsorted(sorted_days, end_day, side='right'))
+        entering = by_day[added:stop]
+        np.add.at(tail, cell[entering], 1)
+        added = stop
+        stop = int(np.searchsorted(sorted_days, end_day - window_days, side='right'))
+        leaving = by_day[expired:stop]
+        np.add.at(head, cell[leaving], 1)
+        expired = stop
+        touched = np.unique(row_user[np.r_[entering, leaving]])
+        best = _best_cells(touched, user_cells, cell_window, head, tail, first, last, points_before)
+        moved = best != current[touched]
+        if moved.any():
+            changed = touched[moved]
+            current[changed] = best[moved]
+            stay, nights, num_points = _cell_stats(best[moved], head, tail, first, last, points_before)
+            timeline.append(pd.DataFrame({'user': changed, 'day': end_day, 'cell': best[moved], 'stay_ns': stay,
+                                          'num_nights': nights, 'num_points': num_points}))
+        if end_day == last_day:
+            break
+    return _timeline_frame(timeline, partials.iloc[cell_start].reset_index(drop=True), user_ids, detector,
+                           window_days, user_id_col)
+
+
+def _nanoseconds(values: pd.Series) -> np.ndarray:
+    return values.to_numpy().astype('datetime64[ns]').astype(np.int64)
+
+
+def _cell_stats(cells, head, tail, first, last, points_before):
+    # Partials of a cell are in day order, so the span runs from the head's first to the tail's last point
+    cells = np.asarray(cells)
+    active = tail[cells] > head[cells]
+    stay = np.where(active, last[np.maximum(tail[cells] - 1, 0)] - first[np.minimum(head[cells], len(first) - 1)], 0)
+    return stay, tail[cells] - head[cells], points_before[tail[cells]] - points_before[head[cells]]
+
+
+def _best_cells(touched, user_cells, cell_window, head, tail, first, last, points_before) -> np.ndarray:
+    """
+    Best active cell of each touched user (-1 if none), aligned with touched: nighttime cells before
+    weekend cells, then the GHOST ranking (stay-time, nights, points, grid order). Only the touched
+    users' cell ranges are read.
+    """
+    best = np.full(len(touched), -1)
+    starts, ends = user_cells[touched], user_cells[touched + 1]
+    lengths = ends - starts
+    # Concatenated cell ranges of the touched users, with the position of their user in touched
+    owner = np.repeat(np.arange(len(touched)), lengths)
+    candidates = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + starts[owner]
+    active = tail[candidates] > head[candidates]
+    candidates, owner = candidates[active], owner[active]
+    if len(candidates) == 0:
+        return best
+    stay, nights, num_points = _cell_stats(candidates, head, tail, first, last, points_before)
+    order = np.lexsort((candidates, -num_points, -nights, -stay, cell_window[candidates], owner))
+    owner = owner[order]
+    leaders = np.r_[True, owner[1:] != owner[:-1]]
+    best[owner[leaders]] = candidates[order][leaders]
+    return best
+
+
+def _timeline_frame(timeline, cells: pd.DataFrame, user_ids: pd.Index, detector: GridHomeDetector,
+                    window_days: int, user_id_col: str) -> pd.DataFrame:
+    """
+    Build the output rows from the emitted (user, day, cell, stats) changes.
+    """
+    if not timeline:
+        return pd.DataFrame(columns=[user_id_col] + TIMELINE_COLUMNS)
+    changes = pd.concat(timeline, ignore_index=True)
+    has_home = changes['cell'].to_numpy() >= 0
+    cell = changes['cell'].to_numpy().clip(min=0)
+    prj_lat = np.where(has_home, cells['LAT_Grid'].to_numpy(dtype=float)[cell], np.nan)
+    prj_lon = np.where(has_home, cells['LON_Grid'].to_numpy(dtype=float)[cell], np.nan)
+    lat, lon = detector._to_lat_lon(prj_lat, prj_lon)
+    window_end = pd.Timestamp('1970-01-01') + pd.to_timedelta(changes['day'].to_numpy(), unit='D')
+    inferred_from = np.asarray(WINDOWS, dtype=object)[cells['window'].to_numpy()[cell]]
+    return pd.DataFrame({
+        user_id_col: user_ids[changes['user'].to_numpy()],
+        'window_start': window_end - pd.Timedelta(days=window_days - 1),
+        'window_end': window_end,
+        'lat': lat,
+        'lon': lon,
+        'prj_lat': prj_lat,
+        'prj_lon': prj_lon,
+        'stay_time': np.where(has_home, changes['stay_ns'].to_numpy() / 1e9, np.nan),
+        'num_nights': np.where(has_home, changes['num_nights'].to_numpy(), 0),
+        'num_points': np.where(has_home, changes['num_points'].to_numpy(), 0),
+        'inferred_from': np.where(has_home, inferred_from, None),
+    })
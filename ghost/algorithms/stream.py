@@ -0,0 +1,168 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ghost.algorithms.grid import GridHomeDetector, RANK_COLUMNS, _aggregate_partials, _point_aggregations
+
+# GHOST.algorithms.stream: Incremental home detection over chunks of points
+WINDOWS = ('night', 'weekend')
+
+
+class StreamingGridDetector:
+    """
+    Incremental GHOST: keeps running per-(user, cell) aggregates (first/last timestamp, nights, point count)
+    for the night and weekend windows, plus the (user, cell, date) keys seen so far, so each new chunk only
+    merges the cells it touches. After all chunks, results equal grid_based_batch over the concatenated
+    data (span stay-time).
+
+    The state grows with the distinct cells and cell-days of the users seen. It is bounded by
+    max_cells_per_user, and by evict() for users that send no more points (e.g. finished devices).
+
+    Example:
+        >>> from ghost.algorithms.stream import StreamingGridDetector
+        >>> stream = StreamingGridDetector(GridHomeDetector(grid_size=20))
+        >>> for chunk in pd.read_csv('points.csv', chunksize=100_000, parse_dates=['timestamp']):
+        ...     updated = stream.update(chunk)   # homes of the users in this chunk
+        >>> results = stream.results()
+    """
+    def __init__(self, detector: Optional[GridHomeDetector] = None, user_id_col: str = 'user_id',
+                 max_cells_per_user: Optional[int] = None):
+        """
+        Args:
+            detector (GridHomeDetector): Detection parameters (default: GridHomeDetector()).
+                Only stay_time_mode='span' can be updated incrementally.
+            user_id_col (str): The name of the user identifier column.
+            max_cells_per_user (int, optional): Bound on the state: after each update, only the strongest
+                cells of each affected user are kept per window. Pruned cells restart from scratch if the
+                user returns to them, so results may then differ from a full batch run.
+        """
+        self.detector = detector or GridHomeDetector()
+        if self.detector.stay_time_mode != 'span':
+            raise ValueError("Streaming detection supports stay_time_mode='span' only.")
+        if max_cells_per_user is not None and max_cells_per_user < self.detector.top_k:
+            raise ValueError("max_cells_per_user must be at least top_k.")
+        self.user_id_col = user_id_col
+        self.max_cells_per_user = max_cells_per_user
+        self.cell_keys = [user_id_col] + self.detector._cell_keys()
+        # Per window: cell aggregates indexed by cell_keys, and the (cell, date) keys already counted as nights
+        self.cells = {window: None for window in WINDOWS}
+        self.dates = {window: None for window in WINDOWS}
+        self.users = pd.Index([])
+
+    def update(self, chunk) -> pd.DataFrame:
+        """
+        Add a chunk of points and return updated home estimates for the users it contains.
+        Args:
+            chunk: DataFrame (or dict of arrays / structured array) with ['timestamp', 'lat', 'lon'] and the
+                user ID column. Chunks need not be in time order.
+        Returns:
+            pd.DataFrame: One row per affected user, same layout as grid_based_batch.
+        """
+        df = chunk if isinstance(chunk, pd.DataFrame) else pd.DataFrame(chunk)
+        df = df[df[self.user_id_col].notnull()]
+        affected = pd.Index(df[self.user_id_col].unique()).sort_values()
+        if df.empty:
+            return self._results_for(affected)
+        self.users = self.users.union(affected)
+        points = self.detector._prepare(df.assign(lat=df['lat'].astype(float), lon=df['lon'].astype(float)))
+        if self.detector.shifted_grids:
+            points = self.detector._expand_shifts(points, [self.user_id_col])
+        masks = {
+            'night': self.detector._night_mask(points['hour']),
+            'weekend': self.detector._weekend_mask(points['hour'], points['dayofweek']),
+        }
+        keys = self.cell_keys + ['date']
+        for window in WINDOWS:
+            window_points = points[masks[window]]
+            parts = window_points.groupby(keys, sort=False).agg(**_point_aggregations(window_points))
+            self._merge(window, parts)
+            if self.max_cells_per_user is not None:
+                self._prune(window, affected)
+        return self._results_for(affected)
+
+    def results(self) -> pd.DataFrame:
+        """
+        Current home estimates for every user seen so far (and not evicted).
+        """
+        return self._results_for(self.users)
+
+    def evict(self, users) -> pd.DataFrame:
+        """
+        Drop the state of users that will send no more points, returning their final home estimates.
+        An evicted user who sends points again starts from scratch.
+        Args:
+            users: User IDs to evict.
+        Returns:
+            pd.DataFrame: One row per evicted user, same layout as grid_based_batch.
+        """
+        users = pd.Index(users)
+        results = self._results_for(users)
+        for window in WINDOWS:
+            self._drop(window, self.cells[window].index.get_level_values(self.user_id_col).isin(users)
+                       if self.cells[window] is not None else None)
+        self.users = self.users.difference(users)
+        return results
+
+    def _merge(self, window: str, parts: pd.DataFrame):
+        # Fold a chunk's per-(cell, date) aggregates into the cell aggregates: cells already in the state are
+        # updated in place, new ones appended, and a cell gains a night for each date not seen before
+        seen = self.dates[window]
+        new_date = ~parts.index.isin(seen) if seen is not None else np.ones(len(parts), dtype=bool)
+        self.dates[window] = parts.index[new_date] if seen is None else seen.append(parts.index[new_date])
+        new = parts.assign(num_nights=new_date.astype(np.int64)).groupby(level=self.cell_keys, sort=False).agg(
+            first=('first', 'min'),
+            last=('last', 'max'),
+            num_nights=('num_nights', 'sum'),
+            num_points=('num_points', 'sum'),
+        )
+        state = self.cells[window]
+        if state is None:
+            self.cells[window] = new
+            return
+        pos = state.index.get_indexer(new.index)
+        hit = pos >= 0
+        for col, combine in (('first', np.minimum), ('last', np.maximum), ('num_nights', np.add),
+                             ('num_points', np.add)):
+            column = state.columns.get_loc(col)
+            state.iloc[pos[hit], column] = combine(state[col].to_numpy()[pos[hit]], new[col].to_numpy()[hit])
+        if not hit.all():
+            self.cells[window] = pd.concat([state, new[~hit]])
+
+    def _drop(self, window: str, mask):
+        # Remove the masked cells and their seen dates from a window's state
+        if mask is None or not mask.any():
+            return
+        dropped = self.cells[window].index[mask]
+        self.cells[window] = self.cells[window][~mask]
+        dates = self.dates[window]
+        self.dates[window] = dates[~dates.droplevel('date').isin(dropped)]
+
+    def _prune(self, window: str, users: pd.Index):
+        # Keep each affected user's strongest cells (same ranking as detection)
+        state = self.cells[window]
+        if state is None:
+            return
+        cells = self._cells_of(state, users)
+        keep = cells.sort_values([self.user_id_col] + RANK_COLUMNS, ascending=[True] + [False] * len(RANK_COLUMNS),
+                                 kind='stable').groupby(self.user_id_col, sort=False).head(self.max_cells_per_user)
+        kept = pd.MultiIndex.from_frame(keep[self.cell_keys])
+        affected = state.index.get_level_values(self.user_id_col).isin(users)
+        self._drop(window, affected & ~state.index.isin(kept))
+
+    def _cells_of(self, state: pd.DataFrame, users: pd.Index) -> pd.DataFrame:
+        # Per-cell stats of the given users, in the layout (and key order) of _aggregate_partials
+        cells = state[state.index.get_level_values(self.user_id_col).isin(users)].sort_index().reset_index()
+        cells['stay_time'] = (cells['last'] - cells['first']).dt.total_seconds()
+        return cells[self.cell_keys + RANK_COLUMNS]
+
+    def _results_for(self, users: pd.Index) -> pd.DataFrame:
+        cells = {}
+        for window in WINDOWS:
+            state = self.cells[window]
+            if state is None:
+                empty = pd.DataFrame({k: [] for k in self.cell_keys + ['date', 'first', 'last', 'num_points']})
+                cells[window] = _aggregate_partials(empty, self.cell_keys)
+            else:
+                cells[window] = self._cells_of(state, users)
+        return self.detector._results_from_cells(users, cells['night'], cells['weekend'], self.user_id_col)
@@ -0,0 +1,92 @@
+import itertools
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ghost.algorithms.grid import GridHomeDetector, _aggregate_partials, _point_aggregations
+from ghost.utils import validate_input_dataframe
+from ghost.validation.groundtruth import compare_predictions_to_groundtruth
+from ghost.validation.metrics import compute_accuracy_metrics
+
+# GHOST.algorithms.sweep: Parameter sweeps for calibrating the GHOST algorithm
+SWEEP_KEYS = ['grid_size', 'night_start', 'night_end']
+
+
+def _hourly_aggregates(df: pd.DataFrame, user_id_col: str) -> pd.DataFrame:
+    """
+    Aggregate points per (user, cell, date, hour): first/last timestamp and point count.
+    Any hour-based window (night or weekend) is a union of these rows.
+    """
+    hourly = df.groupby([user_id_col, 'LAT_Grid', 'LON_Grid', 'date', 'hour'], sort=False).agg(**_point_aggregations(df)).reset_index()
+    hourly['dayofweek'] = hourly['date'].dt.dayofweek
+    return hourly
+
+
+def parameter_sweep(gdf: pd.DataFrame, grid_sizes: Iterable[float] = (20,), night_starts: Iterable[int] = (22,),
+                    night_ends: Iterable[int] = (6,), user_id_col: str = 'user_id', epsg_in: int = 4326,
+                    epsg_out: int = 32617, groundtruth: Optional[pd.DataFrame] = None,
+                    thresholds=(50, 100, 200)) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    Run GHOST for every combination of grid size and night window in one pass over the data.
+
+    Points are projected and time-featurized once. For each grid size, points are aggregated once per
+    (user, cell, date, hour); every night window is then evaluated from these hourly aggregates
+    instead of the raw points.
+
+    Args:
+        gdf (pd.DataFrame): Points with ['timestamp', 'lat', 'lon'] and a user ID column.
+        grid_sizes: Grid sizes in meters.
+        night_starts: Night start hours.
+        night_ends: Night end hours.
+        user_id_col (str): The name of the user identifier column.
+        epsg_in (int): Input EPSG code.
+        epsg_out (int): Output EPSG code.
+        groundtruth (pd.DataFrame, optional): Ground truth with [user_id_col, 'lat', 'lon'].
+        thresholds: Thresholds (meters) for the accuracy metrics.
+    Returns:
+        Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+            - results: One row per (grid_size, night_start, night_end, user) with the usual result fields.
+            - metrics: One row per parameter combination with compute_accuracy_metrics fields
+              (None if no ground truth was given).
+    Example:
+        >>> results, metrics = parameter_sweep(gdf, grid_sizes=[10, 20, 40], night_starts=[21, 22], night_ends=[6],
+        ...                                    groundtruth=load_groundtruth_csv('groundtruth.csv'))
+    """
+    validate_input_dataframe(gdf)
+    users = pd.Index(gdf[user_id_col].dropna().unique()).sort_values()
+    night_windows = list(itertools.product(night_starts, night_ends))
+    base = GridHomeDetector(epsg_in=epsg_in, epsg_out=epsg_out)._featurize(gdf)
+    keys = [user_id_col, 'LAT_Grid', 'LON_Grid']
+    all_results = []
+    all_metrics = []
+    for grid_size in grid_sizes:
+        base_detector = GridHomeDetector(grid_size=grid_size, epsg_in=epsg_in, epsg_out=epsg_out)
+        hourly = _hourly_aggregates(base_detector._assign_grid(base), user_id_col)
+        weekend_rows = hourly[base_detector._weekend_mask(hourly['hour'], hourly['dayofweek'])]
+        weekend_cells = _aggregate_partials(weekend_rows, keys)
+        for night_start, night_end in night_windows:
+            detector = GridHomeDetector(grid_size=grid_size, night_start=night_start, night_end=night_end,
+                                        epsg_in=epsg_in, epsg_out=epsg_out)
+            night_cells = _aggregate_partials(hourly[detector._night_mask(hourly['hour'])], keys)
+            results = detector._results_from_cells(users, night_cells, weekend_cells, user_id_col)
+            params = {'grid_size': grid_size, 'night_start': night_start, 'night_end': night_end}
+            all_results.append(results.assign(**params))
+            if groundtruth is not None:
+                all_metrics.append({**params, **_sweep_metrics(results, groundtruth, user_id_col, thresholds)})
+    results = pd.concat(all_results, ignore_index=True)
+    results = results[SWEEP_KEYS + [c for c in results.columns if c not in SWEEP_KEYS]]
+    metrics = pd.DataFrame(all_metrics) if groundtruth is not None else None
+    return results, metrics
+
+
+def _sweep_metrics(results: pd.DataFrame, groundtruth: pd.DataFrame, user_id_col: str, thresholds) -> dict:
+    pred = results[[user_id_col, 'lat', 'lon']].dropna()
+    merged = compare_predictions_to_groundtruth(pred, groundtruth, user_id_col=user_id_col)
+    metrics = {'num_users': int(len(merged))}
+    if merged.empty:
+        metrics.update({'mean_error': np.nan, 'median_error': np.nan})
+        metrics.update({f'percent_within_{t}m': np.nan for t in thresholds})
+        return metrics
+    metrics.update(compute_accuracy_metrics(merged['error_m'].to_numpy(), thresholds=list(thresholds)))
+    return metrics
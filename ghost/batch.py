@@ -0,0 +1,196 @@
+# GHOST.batch: Sharded, resumable batch driver for the GHOST algorithm
+
+import json
+import os
+import pathlib
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from ghost.algorithms.grid import grid_based_batch
+from ghost.io.results import ResultsWriter
+from ghost.preprocessing.staypoints import compress_stay_points
+
+# Written once partitioning has finished; without it, shard inputs are rebuilt on restart
+PARTITIONED_MARKER = '_PARTITIONED'
+MANIFEST_FILE = 'manifest.json'
+# Detection parameters passed to grid_based_batch; a work directory only serves one combination
+DETECT_KEYS = ['grid_size', 'night_start', 'night_end', 'epsg_in', 'epsg_out', 'top_k', 'shifted_grids',
+               'stay_time_mode', 'max_gap', 'period']
+
+
+def shard_ids(user_ids, num_shards: int) -> np.ndarray:
+    """
+    Stable hash partition of user IDs into num_shards shards (same shard across runs and processes).
+    Args:
+        user_ids: Array-like of user IDs.
+        num_shards (int): Number of shards.
+    Returns:
+        np.ndarray: Shard index of each user ID.
+    """
+    hashes = pd.util.hash_pandas_object(pd.Series(user_ids).astype(str), index=False).to_numpy()
+    return (hashes % np.uint64(num_shards)).astype(np.int64)
+
+
+def _atomic_pickle(df: pd.DataFrame, path: pathlib.Path):
+    # Write to a temporary file and rename, so a crash never leaves a half-written shard behind
+    tmp = path.with_name(path.name + '.tmp')
+    df.to_pickle(tmp)
+    os.replace(tmp, path)
+
+
+def _shard_dir(work_dir: pathlib.Path, shard: int) -> pathlib.Path:
+    return work_dir / 'inputs' / f'shard-{shard:05d}'
+
+
+def _result_path(work_dir: pathlib.Path, shard: int) -> pathlib.Path:
+    return work_dir / 'results' / f'shard-{shard:05d}.pkl'
+
+
+def _check_manifest(work_dir: pathlib.Path, manifest: Dict[str, Any]):
+    path = work_dir / MANIFEST_FILE
+    if path.exists():
+        with open(path, 'r') as f:
+            existing = json.load(f)
+        if manifest['fingerprint'] is not None and existing.get('fingerprint') != manifest['fingerprint']:
+            # The input or parameters changed since these shards were written; they are stale
+            shutil.rmtree(work_dir)
+        elif existing != manifest:
+            raise ValueError(f"{work_dir} holds shards for different settings ({existing}); "
+                             f"use a new work_dir or remove it.")
+        else:
+            return
+    work_dir.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(manifest, f, sort_keys=True)
+
+
+def _partition(chunks: Iterable[pd.DataFrame], work_dir: pathlib.Path, num_shards: int, user_id_col: str):
+    """
+    Split the input chunks by user hash into per-shard part files (one part per chunk and shard).
+    """
+    if (work_dir / PARTITIONED_MARKER).exists():
+        return
+    # An unfinished partitioning may have written any subset of parts; start over
+    shutil.rmtree(work_dir / 'inputs', ignore_errors=True)
+    shutil.rmtree(work_dir / 'results', ignore_errors=True)
+    for shard in range(num_shards):
+        _shard_dir(work_dir, shard).mkdir(parents=True, exist_ok=True)
+    for part, chunk in enumerate(chunks):
+        chunk = pd.DataFrame(chunk.drop(columns='geometry', errors='ignore'))
+        chunk = chunk[chunk[user_id_col].notnull()]
+        shards = shard_ids(chunk[user_id_col], num_shards)
+        for shard, rows in chunk.groupby(shards, sort=False):
+            _atomic_pickle(rows, _shard_dir(work_dir, int(shard)) / f'part-{part:06d}.pkl')
+    (work_dir / PARTITIONED_MARKER).touch()
+
+
+def _process_shard(shard_dir: str, result_path: str, user_id_col: str, params: Dict[str, Any],
+                   stay_points: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Detect homes for one shard and write its results atomically. Runs in worker processes.
+    """
+    parts = sorted(pathlib.Path(shard_dir).glob('part-*.pkl'))
+    if parts:
+        points = pd.concat([pd.read_pickle(p) for p in parts], ignore_index=True)
+        points['timestamp'] = pd.to_datetime(points['timestamp'], errors='coerce')
+        for col in ('lat', 'lon'):
+            points[col] = points[col].astype(float)
+        if stay_points is not None:
+            # The shard holds every point of its users, so no stay is split between input chunks
+            points = compress_stay_points(points, user_id_col=user_id_col, **stay_points)
+        results = grid_based_batch(points, user_id_col=user_id_col, **params)
+    else:
+        results = pd.DataFrame({user_id_col: []})
+    _atomic_pickle(results, pathlib.Path(result_path))
+    return len(results)
+
+
+def run_sharded(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], work_dir, num_shards: int = 16, n_jobs: int = 1,
+                user_id_col: str = 'user_id', output_path: Optional[str] = None, csv_path: Optional[str] = None,
+                fingerprint: Optional[str] = None, cleanup: bool = False, stay_points: Optional[Dict[str, Any]] = None,
+                **params) -> pd.DataFrame:
+    """
+    Resumable batch detection: users are hash-partitioned into num_shards on-disk shards, each shard is
+    processed independently (serially or with n_jobs processes) and its results are written atomically.
+    On restart with the same work_dir, finished shards are skipped; the shard results are then merged.
+
+    Args:
+        data: Points DataFrame, or an iterable of DataFrame chunks (e.g. pd.read_csv(..., chunksize=...))
+            so the input never needs to fit in memory at once.
+        work_dir: Directory for shard inputs, shard results and the manifest.
+        num_shards (int): Number of shards.
+        n_jobs (int): Worker processes (1 = serial).
+        user_id_col (str): The name of the user identifier column.
+        output_path (str, optional): If given, results are streamed to this file shard by shard as the
+            shards finish (Parquet for .parquet/.pq, else CSV; moved into place once complete). Rows
+            are grouped by shard, each shard sorted by user ID.
+        csv_path (str, optional): Also stream the results to this CSV (e.g. next to a Parquet output).
+        fingerprint (str, optional): Fingerprint of the input and parameters (from compute_fingerprint),
+            stored in the manifest. A work_dir left by a run with another fingerprint is cleared rather than
+            resumed, so a rerun on changed input never reuses stale shards. It is also written next to
+            output_path, as by save_results. Without it, in-memory or chunked
+            input cannot be told apart and only the settings are checked.
+        cleanup (bool): Remove work_dir once all shards are merged (it is kept after a failure for resuming).
+        stay_points (dict, optional): Options for compress_stay_points (distance_threshold, time_threshold,
+            epsg_in, epsg_out). Each shard's points are compressed once the shard is complete, since a chunk
+            of the input may end in the middle of a stay.
+        **params: Detection parameters for grid_based_batch (DETECT_KEYS).
+    Returns:
+        pd.DataFrame: Merged results, one row per user, sorted by user ID.
+    Example:
+        >>> from ghost.batch import run_sharded
+        >>> chunks = pd.read_csv('points.csv', chunksize=1_000_000, parse_dates=['timestamp'])
+        >>> results = run_sharded(chunks, 'ghost_work', num_shards=64, n_jobs=8, output_path='results.parquet')
+    """
+    unknown = set(params) - set(DETECT_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown detection parameters: {sorted(unknown)}. Expected some of {DETECT_KEYS}.")
+    work_dir = pathlib.Path(work_dir)
+    # Round-trip through JSON so e.g. period bin edges compare equal to the stored manifest
+    manifest = json.loads(json.dumps({'num_shards': int(num_shards), 'user_id_col': user_id_col, 'params': params,
+                                      'stay_points': stay_points, 'fingerprint': fingerprint},
+                                     sort_keys=True, default=str))
+    _check_manifest(work_dir, manifest)
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    _partition(chunks, work_dir, num_shards, user_id_col)
+    (work_dir / 'results').mkdir(exist_ok=True)
+    pending = [s for s in range(num_shards) if not _result_path(work_dir, s).exists()]
+    jobs = {s: (str(_shard_dir(work_dir, s)), str(_result_path(work_dir, s)), user_id_col, params, stay_points)
+            for s in pending}
+    writer = ResultsWriter(output_path, fingerprint=fingerprint, csv_path=csv_path) if output_path else None
+    pool = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 and len(jobs) > 1 else None
+    futures = {s: pool.submit(_process_shard, *job) for s, job in jobs.items()} if pool else {}
+    shards = []
+    try:
+        # Shards are collected in order; each one is written out as soon as it is done
+        for s in range(num_shards):
+            if s in futures:
+                futures[s].result()
+            elif s in jobs:
+                _process_shard(*jobs[s])
+            shard = pd.read_pickle(_result_path(work_dir, s))
+            if writer is not None and not shard.empty:
+                writer.write(shard)
+            shards.append(shard)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if writer is not None:
+        writer.close()
+    if cleanup:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    non_empty = [r for r in shards if not r.empty]
+    if non_empty:
+        # Stable sort keeps each user's periods in order when period is set
+        results = pd.concat(non_empty, ignore_index=True).sort_values(user_id_col, kind='stable').reset_index(drop=True)
+    else:
+        results = shards[0]
+    return results
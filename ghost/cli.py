@@ -4,12 +4,19 @@ import typer
 from typing import Optional
 from ghost.config import load_config, merge_config
 from ghost.detector import HomeDetector
-from ghost.plot import plot_full_result, plot_interactive_map
-from ghost.validation.groundtruth import load_groundtruth_csv, compare_predictions_to_groundtruth
+from ghost.io.results import read_results
+from ghost.batch import DETECT_KEYS
+from ghost.serve import serve as run_service
+from ghost.algorithms.sweep import parameter_sweep
+from ghost.plot import plot_full_result, plot_interactive_map, DENSITY_THRESHOLD
+from ghost.validation.groundtruth import (load_groundtruth_csv, compare_predictions_to_groundtruth, with_topk_errors,
+                                         format_user_errors, validate_runs, RUN_COLUMN)
 from ghost.validation.metrics import compute_accuracy_metrics
+import matplotlib.pyplot as plt
 import pandas as pd
 import sys
 import os
+import time
 
 app = typer.Typer(help="GHOST: Grid-based Home detection via Stay-Time (GHOST) CLI")
 
@@ -21,19 +28,148 @@ defaults = {
     'grid_size': 20,
     'night_start': 22,
     'night_end': 6,
+    'top_k': 1,
     'plot_basemap': False,
     'interactive_map': True,
-    'groundtruth_csv': None
+    'groundtruth_csv': None,
+    'reuse_results': True,
+    'render_plots': False,
+    'plot_mode': 'auto',
+    'density_threshold': DENSITY_THRESHOLD,
+    'sweep_csv': 'sweep_results.csv',
+    'sweep_metrics_csv': 'sweep_metrics.csv',
+    'user_id_column': 'user_id',
+    'run_column': RUN_COLUMN,
+    'thresholds': '50,100,200',
+    'validation_metrics_csv': 'validation_metrics.csv',
+    'validation_errors_csv': 'validation_errors.csv'
 }
 
+def _parse_list(value, cast):
+    # Lists may come from a config file (YAML list) or the CLI ("10,20,40")
+    if isinstance(value, (list, tuple)):
+        return [cast(v) for v in value]
+    return [cast(v) for v in str(value).split(',') if v.strip()]
+
+def _echo_results(results, user_id_col):
+    if user_id_col in results.columns and results[user_id_col].nunique() > 1:
+        typer.echo(f"Batch mode: processed {results[user_id_col].nunique()} users.")
+        typer.echo(f"User IDs: {list(results[user_id_col])}")
+        typer.echo("Each row in the CSV contains all stats for one user (lat, lon, stay_time, num_nights, inferred_from, etc.)")
+    elif 'lat' in results.columns and 'lon' in results.columns:
+        typer.echo(f"Home location:\n{results[[user_id_col,'lat','lon']]}")
+
+def _candidate_cells(row):
+    # Runner-up cells reported with --top-k, as a DataFrame of lat/lon
+    ranks = sorted(int(k[3:-4]) for k in row.index if k.startswith('top') and k.endswith('_lat'))
+    cells = [(row[f'top{r}_lat'], row[f'top{r}_lon']) for r in ranks]
+    cells = pd.DataFrame(cells, columns=['lat', 'lon']).dropna()
+    return cells if not cells.empty else None
+
+def _plot_results(results, raw_data, config_all, user_id_col):
+    # Split the points by user once instead of filtering the full data for every user
+    if user_id_col in raw_data.columns:
+        points_by_user = {str(uid): points for uid, points in raw_data.groupby(user_id_col)}
+    else:
+        points_by_user = {}
+    for _, row in results.iterrows():
+        lat = row.get('lat')
+        lon = row.get('lon')
+        uid = row.get(user_id_col, 'user')
+        points = points_by_user.get(str(uid), raw_data)
+        candidates = _candidate_cells(row)
+        # Static plot
+        fig, ax = plot_full_result(
+            points, lat, lon,
+            basemap=config_all['plot_basemap'],
+            mode=config_all['plot_mode'],
+            density_threshold=config_all['density_threshold'],
+            grid_size=config_all.get('grid_size'),
+            candidates=candidates,
+            epsg_in=config_all.get('epsg_in', 4326),
+            epsg_out=config_all.get('epsg_out', 32617),
+            # Shifted-grid and hierarchical homes are not on the base grid: draw them from the reported cell
+            home_prj=(row['prj_lat'], row['prj_lon']) if 'prj_lat' in row.index and 'prj_lon' in row.index else None,
+            cell_size=row.get('grid_size')
+        )
+        fig.suptitle(f"Home Detection Result (User: {uid})")
+        out_plot = config_all['output_plot']
+        if results.shape[0] > 1:
+            out_plot = out_plot.replace('.png', f'_{uid}.png')
+        fig.savefig(out_plot, bbox_inches='tight')
+        plt.close(fig)
+        typer.echo(f"Saved static plot to {out_plot}")
+        # Interactive map
+        if config_all['interactive_map']:
+            m = plot_interactive_map(points, lat, lon)
+            if m is not None:
+                out_map = config_all['output_map']
+                if results.shape[0] > 1:
+                    out_map = out_map.replace('.html', f'_{uid}.html')
+                m.save(out_map)
+                typer.echo(f"Saved interactive map to {out_map}")
+            else:
+                typer.echo("folium is not installed; skipping interactive map.")
+
+def _validate_results(pred_df, groundtruth_csv, user_id_col='user_id'):
+    gt_df = load_groundtruth_csv(groundtruth_csv, user_id_col)
+    if user_id_col in pred_df.columns and pred_df[user_id_col].dtype != gt_df[user_id_col].dtype:
+        # In-memory results keep the reader's ID types; compare IDs as strings like a CSV round trip would
+        pred_df = pred_df.assign(**{user_id_col: pred_df[user_id_col].astype(str)})
+        gt_df = gt_df.assign(**{user_id_col: gt_df[user_id_col].astype(str)})
+    merged = compare_predictions_to_groundtruth(pred_df, gt_df, user_id_col)
+    errors = merged['error_m'].values
+    metrics = compute_accuracy_metrics(errors)
+    if merged[user_id_col].nunique() > 1:
+        typer.echo(f"Batch validation: {merged[user_id_col].nunique()} users compared.")
+        typer.echo(f"User IDs: {list(merged[user_id_col])}")
+        typer.echo("Per-user errors (meters):")
+        typer.echo(format_user_errors(merged, user_id_col))
+        typer.echo("Summary accuracy metrics for batch:")
+    else:
+        typer.echo("Validation results for single user:")
+    for k, v in metrics.items():
+        typer.echo(f"{k}: {v}")
+    typer.echo(f"Mean error: {metrics['mean_error']:.2f} m")
+    typer.echo(f"Median error: {metrics['median_error']:.2f} m")
+    for t in [50, 100, 200]:
+        key = f'percent_within_{t}m'
+        if key in metrics:
+            typer.echo(f"% within {t}m: {metrics[key]:.1f}%")
+    merged, topk_metrics = with_topk_errors(merged, pred_df, gt_df, user_id_col)
+    if topk_metrics:
+        typer.echo("Top-k accuracy (home within threshold of any of the top-k cells):")
+        for k, v in topk_metrics.items():
+            typer.echo(f"{k}: {v:.1f}%")
+        metrics = {**metrics, **topk_metrics}
+    return merged, metrics
+
 @app.command()
 def detect(
     config: Optional[str] = typer.Option(None, help="Path to config file (YAML/JSON)"),
     input_gpx: Optional[str] = typer.Option(None, help="Input GPX file or folder or CSV"),
-    output_csv: Optional[str] = typer.Option(None, help="Output CSV for results"),
+    output_csv: Optional[str] = typer.Option(None, help="Output results file (.csv, or .parquet for typed columns)"),
     grid_size: Optional[int] = typer.Option(None, help="Grid size in meters"),
     night_start: Optional[int] = typer.Option(None, help="Night start hour (22=10pm)"),
     night_end: Optional[int] = typer.Option(None, help="Night end hour (6=6am)"),
+    top_k: Optional[int] = typer.Option(None, help="Number of candidate cells to report per user"),
+    shifted_grids: Optional[bool] = typer.Option(None, help="Also evaluate half-cell shifted grids to avoid cell-boundary effects"),
+    stay_time_mode: Optional[str] = typer.Option(None, help="Stay-time metric: span (last - first) or dwell (sum of consecutive gaps)"),
+    max_gap: Optional[float] = typer.Option(None, help="Maximum gap in seconds counted in dwell mode"),
+    compress_stay_points: Optional[bool] = typer.Option(None, help="Collapse stationary runs of points into stay records before gridding"),
+    stay_distance: Optional[float] = typer.Option(None, help="Stay compression: max distance in meters from the stay's first point"),
+    stay_time_gap: Optional[float] = typer.Option(None, help="Stay compression: max gap in seconds between consecutive points"),
+    engine: Optional[str] = typer.Option(None, help="Detection engine: pandas, polars or duckdb (require the respective package)"),
+    num_shards: Optional[int] = typer.Option(None, help="Process users in this many resumable on-disk shards"),
+    shard_dir: Optional[str] = typer.Option(None, help="Work directory for shards (default: <output_csv>.shards)"),
+    n_jobs: Optional[int] = typer.Option(None, help="Worker processes for sharded runs"),
+    period: Optional[str] = typer.Option(None, help="One home per user and period: W, M, Q, ... or bin edges (2024-01-01,2024-07-01,2025-01-01)"),
+    export_csv: Optional[str] = typer.Option(None, help="Also write the results to this CSV (e.g. next to a .parquet output)"),
+    export_cells: Optional[str] = typer.Option(None, help="Also write the per-(user, cell) aggregates to this file (.parquet or .csv)"),
+    max_memory: Optional[str] = typer.Option(None, help="Memory budget (e.g. 4GB): large inputs are streamed or sharded in chunks to stay within it"),
+    spill_dir: Optional[str] = typer.Option(None, help="Spill directory of the duckdb engine beyond max_memory (default: system temp dir)"),
+    zones_file: Optional[str] = typer.Option(None, help="Boundary file (Shapefile, GeoPackage, GeoJSON): add the zone of each home to the results"),
+    zone_id_column: Optional[str] = typer.Option(None, help="Zone ID column of the boundary file (default: row position, as zone_id)"),
 ):
     """
     Run the GHOST algorithm for home detection and save results. Uses the high-level HomeDetector workflow.
@@ -44,73 +180,70 @@ def detect(
     # Set input_file in config for HomeDetector
     config_all['input_file'] = config_all.get('input_gpx')
     config_all['output_file'] = config_all.get('output_csv')
+    if config_all.get('period') is not None and ',' in str(config_all['period']):
+        config_all['period'] = _parse_list(config_all['period'], str)
     detector = HomeDetector(config_all)
-    detector.load_data().preprocess_data().detect_homes()
+    detector.load_data().preprocess_data().detect_homes().assign_zones()
     results = detector.get_results()
     output_path = config_all['output_csv']
-    results.to_csv(output_path, index=False)
+    detector.save_results(output_path)
     typer.echo(f"Saved results to {output_path}")
     user_id_col = config_all.get('user_id_column', 'user_id')
-    if user_id_col in results.columns and results[user_id_col].nunique() > 1:
-        typer.echo(f"Batch mode: processed {results[user_id_col].nunique()} users.")
-        typer.echo(f"User IDs: {list(results[user_id_col])}")
-        typer.echo("Each row in the CSV contains all stats for one user (lat, lon, stay_time, num_nights, inferred_from, etc.)")
-    elif 'lat' in results.columns and 'lon' in results.columns:
-        typer.echo(f"Home location:\n{results[[user_id_col,'lat','lon']]}")
+    _echo_results(results, user_id_col)
 
 @app.command()
 def plot(
     config: Optional[str] = typer.Option(None, help="Path to config file (YAML/JSON)"),
     input_gpx: Optional[str] = typer.Option(None, help="Input GPX file or folder or CSV"),
+    output_csv: Optional[str] = typer.Option(None, help="Results CSV or Parquet to reuse (from detect)"),
+    reuse_results: Optional[bool] = typer.Option(None, help="Reuse saved results when input and parameters are unchanged"),
     output_plot: Optional[str] = typer.Option(None, help="Output PNG for static plot"),
     output_map: Optional[str] = typer.Option(None, help="Output HTML for interactive map"),
     plot_basemap: Optional[bool] = typer.Option(None, help="Add OSM basemap (requires contextily)"),
     interactive_map: Optional[bool] = typer.Option(None, help="Create folium map"),
+    plot_mode: Optional[str] = typer.Option(None, help="Point rendering: auto, scatter or density"),
 ):
     """
     Plot GPS points and home location (static and/or interactive) using the GHOST algorithm.
+    Detection results saved by `detect` are reused when their fingerprint matches the input and parameters.
     """
     file_config = load_config(config) if config else {}
     cli_args = locals()
     config_all = merge_config(defaults, file_config, cli_args)
     config_all['input_file'] = config_all.get('input_gpx')
+    config_all['output_file'] = config_all.get('output_csv')
+    if config_all.get('period') is not None and ',' in str(config_all['period']):
+        config_all['period'] = _parse_list(config_all['period'], str)
     detector = HomeDetector(config_all)
-    detector.load_data().preprocess_data().detect_homes()
+    detector.load_data(for_plots=True)
+    if config_all['reuse_results'] and detector.load_results(config_all['output_csv']):
+        typer.echo(f"Reusing saved results from {config_all['output_csv']}")
+    else:
+        detector.preprocess_data().detect_homes().assign_zones()
+        detector.save_results(config_all['output_csv'])
+        typer.echo(f"Saved results to {config_all['output_csv']}")
     results = detector.get_results()
     user_id_col = config_all.get('user_id_column', 'user_id')
     # For batch: plot each user separately
-    for _, row in results.iterrows():
-        lat = row.get('lat')
-        lon = row.get('lon')
-        uid = row.get(user_id_col, 'user')
-        # Static plot
-        fig, ax = plot_full_result(detector.raw_data, lat, lon, basemap=config_all['plot_basemap'])
-        fig.suptitle(f"Home Detection Result (User: {uid})")
-        out_plot = config_all['output_plot']
-        if results.shape[0] > 1:
-            out_plot = out_plot.replace('.png', f'_{uid}.png')
-        fig.savefig(out_plot, bbox_inches='tight')
-        typer.echo(f"Saved static plot to {out_plot}")
-        # Interactive map
-        if config_all['interactive_map']:
-            m = plot_interactive_map(detector.raw_data, lat, lon)
-            if m is not None:
-                out_map = config_all['output_map']
-                if results.shape[0] > 1:
-                    out_map = out_map.replace('.html', f'_{uid}.html')
-                m.save(out_map)
-                typer.echo(f"Saved interactive map to {out_map}")
-            else:
-                typer.echo("folium is not installed; skipping interactive map.")
+    _plot_results(results, detector.raw_data, config_all, user_id_col)
 
 @app.command()
 def validate(
     config: Optional[str] = typer.Option(None, help="Path to config file (YAML/JSON)"),
-    output_csv: Optional[str] = typer.Option(None, help="Predicted results CSV (from detect)"),
+    output_csv: Optional[str] = typer.Option(None, help="Predicted results CSV or Parquet (from detect); comma-separate several runs"),
     groundtruth_csv: Optional[str] = typer.Option(None, help="Ground truth CSV"),
+    user_id_column: Optional[str] = typer.Option(None, help="User ID column in predictions and ground truth"),
+    run_column: Optional[str] = typer.Option(None, help="Run ID column of a long-format predictions table"),
+    thresholds: Optional[str] = typer.Option(None, help="Comma-separated accuracy thresholds in meters"),
+    validation_metrics_csv: Optional[str] = typer.Option(None, help="Output CSV with metrics per run"),
+    validation_errors_csv: Optional[str] = typer.Option(None, help="Output CSV with per-user errors of every run"),
 ):
     """
     Compare GHOST-predicted home locations to ground truth and print accuracy metrics.
+
+    A single results file is validated as one run; with several prediction files (or one table with a
+    run ID column), all runs are validated in one pass. The metrics per run are printed and saved, and
+    the per-user errors are saved to a file.
     """
     file_config = load_config(config) if config else {}
     cli_args = locals()
@@ -118,29 +251,181 @@ def validate(
     if not config_all['groundtruth_csv']:
         typer.echo("No groundtruth_csv specified in config or CLI.")
         raise typer.Exit(1)
-    pred_df = pd.read_csv(config_all['output_csv'])
-    gt_df = load_groundtruth_csv(config_all['groundtruth_csv'])
-    merged = compare_predictions_to_groundtruth(pred_df, gt_df)
-    errors = merged['error_m'].values
-    metrics = compute_accuracy_metrics(errors)
-    user_id_col = 'user_id' if 'user_id' in merged.columns else merged.columns[0]
-    if merged[user_id_col].nunique() > 1:
-        typer.echo(f"Batch validation: {merged[user_id_col].nunique()} users compared.")
-        typer.echo(f"User IDs: {list(merged[user_id_col])}")
-        typer.echo("Per-user errors (meters):")
-        for _, row in merged.iterrows():
-            typer.echo(f"  {row[user_id_col]}: {row['error_m']:.2f} m")
-        typer.echo("Summary accuracy metrics for batch:")
-    else:
-        typer.echo("Validation results for single user:")
-    for k, v in metrics.items():
-        typer.echo(f"{k}: {v}")
-    typer.echo(f"Mean error: {metrics['mean_error']:.2f} m")
-    typer.echo(f"Median error: {metrics['median_error']:.2f} m")
-    for t in [50, 100, 200]:
-        key = f'percent_within_{t}m'
-        if key in metrics:
-            typer.echo(f"% within {t}m: {metrics[key]:.1f}%")
+    paths = _parse_list(config_all['output_csv'], str)
+    run_col = config_all['run_column']
+    user_id_col = config_all['user_id_column']
+    # Whole meters keep the usual metric names (percent_within_50m)
+    thresholds = [int(t) if t.is_integer() else t for t in _parse_list(config_all['thresholds'], float)]
+    gt_df = load_groundtruth_csv(config_all['groundtruth_csv'], user_id_col)
+    predictions, single_run = paths, False
+    if len(paths) == 1:
+        results = read_results(paths[0])
+        single_run = run_col not in results.columns
+        # A results file without run IDs is one run named after the file
+        predictions = {os.path.splitext(os.path.basename(paths[0]))[0]: results} if single_run else results
+    errors, metrics = validate_runs(predictions, gt_df, user_id_col=user_id_col, run_col=run_col, thresholds=thresholds)
+    if single_run:
+        errors, topk_metrics = with_topk_errors(errors, results, gt_df, user_id_col, thresholds)
+        metrics = metrics.assign(**topk_metrics)
+    errors.to_csv(config_all['validation_errors_csv'], index=False)
+    metrics.to_csv(config_all['validation_metrics_csv'], index=False)
+    typer.echo(f"Validated {len(metrics)} run(s) against {config_all['groundtruth_csv']}.")
+    typer.echo(metrics.to_string(index=False))
+    typer.echo(f"Saved metrics per run to {config_all['validation_metrics_csv']}")
+    typer.echo(f"Saved per-user errors to {config_all['validation_errors_csv']}")
+
+@app.command()
+def run(
+    config: Optional[str] = typer.Option(None, help="Path to config file (YAML/JSON)"),
+    input_gpx: Optional[str] = typer.Option(None, help="Input GPX file or folder or CSV"),
+    output_csv: Optional[str] = typer.Option(None, help="Output results file (.csv, or .parquet for typed columns)"),
+    grid_size: Optional[int] = typer.Option(None, help="Grid size in meters"),
+    night_start: Optional[int] = typer.Option(None, help="Night start hour (22=10pm)"),
+    night_end: Optional[int] = typer.Option(None, help="Night end hour (6=6am)"),
+    top_k: Optional[int] = typer.Option(None, help="Number of candidate cells to report per user"),
+    shifted_grids: Optional[bool] = typer.Option(None, help="Also evaluate half-cell shifted grids to avoid cell-boundary effects"),
+    stay_time_mode: Optional[str] = typer.Option(None, help="Stay-time metric: span (last - first) or dwell (sum of consecutive gaps)"),
+    max_gap: Optional[float] = typer.Option(None, help="Maximum gap in seconds counted in dwell mode"),
+    compress_stay_points: Optional[bool] = typer.Option(None, help="Collapse stationary runs of points into stay records before gridding"),
+    stay_distance: Optional[float] = typer.Option(None, help="Stay compression: max distance in meters from the stay's first point"),
+    stay_time_gap: Optional[float] = typer.Option(None, help="Stay compression: max gap in seconds between consecutive points"),
+    engine: Optional[str] = typer.Option(None, help="Detection engine: pandas, polars or duckdb (require the respective package)"),
+    num_shards: Optional[int] = typer.Option(None, help="Process users in this many resumable on-disk shards"),
+    shard_dir: Optional[str] = typer.Option(None, help="Work directory for shards (default: <output_csv>.shards)"),
+    n_jobs: Optional[int] = typer.Option(None, help="Worker processes for sharded runs"),
+    period: Optional[str] = typer.Option(None, help="One home per user and period: W, M, Q, ... or bin edges (2024-01-01,2024-07-01,2025-01-01)"),
+    export_csv: Optional[str] = typer.Option(None, help="Also write the results to this CSV (e.g. next to a .parquet output)"),
+    export_cells: Optional[str] = typer.Option(None, help="Also write the per-(user, cell) aggregates to this file (.parquet or .csv)"),
+    max_memory: Optional[str] = typer.Option(None, help="Memory budget (e.g. 4GB): large inputs are streamed or sharded in chunks to stay within it"),
+    spill_dir: Optional[str] = typer.Option(None, help="Spill directory of the duckdb engine beyond max_memory (default: system temp dir)"),
+    zones_file: Optional[str] = typer.Option(None, help="Boundary file (Shapefile, GeoPackage, GeoJSON): add the zone of each home to the results"),
+    zone_id_column: Optional[str] = typer.Option(None, help="Zone ID column of the boundary file (default: row position, as zone_id)"),
+    render_plots: Optional[bool] = typer.Option(None, "--plot/--no-plot", help="Render static plots (and interactive maps if enabled)"),
+    output_plot: Optional[str] = typer.Option(None, help="Output PNG for static plot"),
+    output_map: Optional[str] = typer.Option(None, help="Output HTML for interactive map"),
+    plot_basemap: Optional[bool] = typer.Option(None, help="Add OSM basemap (requires contextily)"),
+    interactive_map: Optional[bool] = typer.Option(None, help="Create folium map"),
+    plot_mode: Optional[str] = typer.Option(None, help="Point rendering: auto, scatter or density"),
+    groundtruth_csv: Optional[str] = typer.Option(None, help="Ground truth CSV (validation runs if given)"),
+):
+    """
+    Run detection, plotting and validation in one pass: the input is loaded and preprocessed once
+    and every step works on the same in-memory data.
+    """
+    file_config = load_config(config) if config else {}
+    cli_args = locals()
+    config_all = merge_config(defaults, file_config, cli_args)
+    config_all['input_file'] = config_all.get('input_gpx')
+    config_all['output_file'] = config_all.get('output_csv')
+    if config_all.get('period') is not None and ',' in str(config_all['period']):
+        config_all['period'] = _parse_list(config_all['period'], str)
+    user_id_col = config_all.get('user_id_column', 'user_id')
+    timings = {}
+    detector = HomeDetector(config_all)
+    start = time.perf_counter()
+    detector.load_data(for_plots=config_all['render_plots'])
+    timings['load'] = time.perf_counter() - start
+    if detector.execution_plan and detector.execution_plan['mode'] != 'memory':
+        typer.echo(f"Execution plan: {detector.execution_plan['mode']} "
+                   f"(estimated {detector.execution_plan['footprint'] / 1e9:.1f} GB, "
+                   f"{detector.execution_plan['chunk_rows']} rows per chunk)")
+    start = time.perf_counter()
+    detector.preprocess_data()
+    timings['preprocess'] = time.perf_counter() - start
+    start = time.perf_counter()
+    detector.detect_homes()
+    timings['detect'] = time.perf_counter() - start
+    if config_all.get('zones_file'):
+        start = time.perf_counter()
+        detector.assign_zones()
+        timings['zones'] = time.perf_counter() - start
+    start = time.perf_counter()
+    detector.save_results(config_all['output_csv'])
+    timings['write'] = time.perf_counter() - start
+    results = detector.get_results()
+    typer.echo(f"Saved results to {config_all['output_csv']}")
+    _echo_results(results, user_id_col)
+    if config_all['render_plots'] and detector.raw_data is None:
+        typer.echo("Input was processed in chunks (max_memory); skipping plots.")
+    elif config_all['render_plots']:
+        start = time.perf_counter()
+        _plot_results(results, detector.raw_data, config_all, user_id_col)
+        timings['plot'] = time.perf_counter() - start
+    if config_all['groundtruth_csv']:
+        start = time.perf_counter()
+        _validate_results(results, config_all['groundtruth_csv'], user_id_col)
+        timings['validate'] = time.perf_counter() - start
+    timings['total'] = sum(timings.values())
+    typer.echo("Timings (s): " + ", ".join(f"{k}={v:.2f}" for k, v in timings.items()))
+
+@app.command()
+def sweep(
+    config: Optional[str] = typer.Option(None, help="Path to config file (YAML/JSON)"),
+    input_gpx: Optional[str] = typer.Option(None, help="Input GPX file or folder or CSV"),
+    grid_sizes: Optional[str] = typer.Option(None, help="Comma-separated grid sizes in meters (e.g. 10,20,40)"),
+    night_starts: Optional[str] = typer.Option(None, help="Comma-separated night start hours (e.g. 21,22)"),
+    night_ends: Optional[str] = typer.Option(None, help="Comma-separated night end hours (e.g. 5,6)"),
+    sweep_csv: Optional[str] = typer.Option(None, help="Output CSV with results for every parameter combination"),
+    sweep_metrics_csv: Optional[str] = typer.Option(None, help="Output CSV with accuracy metrics per combination"),
+    groundtruth_csv: Optional[str] = typer.Option(None, help="Ground truth CSV (metrics are computed if given)"),
+):
+    """
+    Run GHOST for every combination of grid size and night window, loading and projecting the input once.
+    """
+    file_config = load_config(config) if config else {}
+    cli_args = locals()
+    config_all = merge_config(defaults, file_config, cli_args)
+    config_all['input_file'] = config_all.get('input_gpx')
+    grid_values = _parse_list(config_all.get('grid_sizes') or config_all['grid_size'], float)
+    start_values = _parse_list(config_all.get('night_starts') or config_all['night_start'], int)
+    end_values = _parse_list(config_all.get('night_ends') or config_all['night_end'], int)
+    detector = HomeDetector(config_all)
+    detector.load_data().preprocess_data()
+    user_id_col = detector.config['user_id_column']
+    gt_df = load_groundtruth_csv(config_all['groundtruth_csv'], user_id_col=user_id_col) if config_all['groundtruth_csv'] else None
+    results, metrics = parameter_sweep(
+        detector.preprocessed_data,
+        grid_sizes=grid_values,
+        night_starts=start_values,
+        night_ends=end_values,
+        user_id_col=user_id_col,
+        epsg_in=detector.config['epsg_in'],
+        epsg_out=detector.config['epsg_out'],
+        groundtruth=gt_df
+    )
+    results.to_csv(config_all['sweep_csv'], index=False)
+    typer.echo(f"Evaluated {len(grid_values) * len(start_values) * len(end_values)} parameter combinations.")
+    typer.echo(f"Saved sweep results to {config_all['sweep_csv']}")
+    if metrics is not None:
+        metrics.to_csv(config_all['sweep_metrics_csv'], index=False)
+        typer.echo(f"Saved sweep metrics to {config_all['sweep_metrics_csv']}")
+        typer.echo(metrics.to_string(index=False))
+
+@app.command()
+def serve(
+    config: Optional[str] = typer.Option(None, help="Path to config file (YAML/JSON)"),
+    socket: Optional[str] = typer.Option(None, help="Serve on this Unix socket instead of stdin/stdout"),
+    workers: int = typer.Option(1, help="Worker processes answering requests concurrently"),
+    grid_size: Optional[int] = typer.Option(None, help="Grid size in meters"),
+    night_start: Optional[int] = typer.Option(None, help="Night start hour (22=10pm)"),
+    night_end: Optional[int] = typer.Option(None, help="Night end hour (6=6am)"),
+    top_k: Optional[int] = typer.Option(None, help="Number of candidate cells to report per user"),
+    shifted_grids: Optional[bool] = typer.Option(None, help="Also evaluate half-cell shifted grids to avoid cell-boundary effects"),
+    stay_time_mode: Optional[str] = typer.Option(None, help="Stay-time metric: span (last - first) or dwell (sum of consecutive gaps)"),
+    max_gap: Optional[float] = typer.Option(None, help="Maximum gap in seconds counted in dwell mode"),
+):
+    """
+    Keep a warm detection process answering JSON Lines requests (user points or a file path) on
+    stdin/stdout or a Unix socket, one JSON response per request. Requests may override parameters.
+    """
+    file_config = load_config(config) if config else {}
+    cli_args = locals()
+    config_all = merge_config(defaults, file_config, cli_args)
+    params = {k: config_all[k] for k in DETECT_KEYS if config_all.get(k) is not None}
+    if socket:
+        typer.echo(f"Serving on {socket} with {workers} worker(s)", err=True)
+    run_service(params, socket_path=socket, workers=workers,
+                user_id_col=config_all.get('user_id_column', 'user_id'))
 
 if __name__ == "__main__":
     app() 
\ No newline at end of file
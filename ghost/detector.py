@@ -1,12 +1,24 @@
+import os
+import pathlib
 import geopandas as gpd
 import pandas as pd
 from ghost.io.gpx import read_data
+from ghost.io.results import compute_fingerprint, save_results, load_cached_results
 from ghost.preprocessing.projection import project_coordinates
+from ghost.preprocessing.staypoints import compress_stay_points
 from ghost.preprocessing.time import extract_time_features
 from ghost.algorithms.grid import GridHomeDetector, grid_based_batch
+from ghost.algorithms.hierarchy import HierarchicalGrid
+from ghost.algorithms.stream import StreamingGridDetector
+from ghost.batch import run_sharded
 from ghost.config import load_config
+from ghost.planner import estimate_input, iter_chunks, plan_execution
+from ghost.zones import assign_zones, load_zones
 
 # GHOST.detector: High-level workflow for the GHOST algorithm
+# Inputs the polars and duckdb engines scan themselves (paths or globs)
+ENGINE_FILE_SUFFIXES = ('.csv', '.txt', '.parquet', '.pq')
+
 class HomeDetector:
     """
     High-level class to detect home locations from GPS data (single-user or batch) using the GHOST algorithm.
@@ -40,15 +52,25 @@ class HomeDetector:
         self.raw_data = None
         self.preprocessed_data = None
         self.results = None
+        self.execution_plan = None
+        # Output file the current results were already written to (streamed by a sharded run)
+        self._saved_path = None
 
     @classmethod
     def from_config_file(cls, config_path, **kwargs):
         config = load_config(config_path)
         return cls(config, **kwargs)
 
-    def load_data(self):
+    def load_data(self, for_plots: bool = False):
         """
-        Loads and validates input data as a GeoDataFrame for GHOST.
+        Loads and validates input data as a GeoDataFrame for GHOST. The input may be a CSV or GPX file
+        (optionally compressed: .csv.gz, .gpx.zst, ...), a folder of GPX files or a zip/tar archive; folder
+        files and archive members are parsed with config 'n_jobs' processes.
+        With engine='polars' or 'duckdb' and a CSV/Parquet input, detection scans the file itself, so
+        nothing is loaded unless for_plots is set.
+
+        Args:
+            for_plots (bool): Load the points even when the engine reads the input itself (plots need them).
 
         Returns:
             self: Enables method chaining.
@@ -60,17 +82,91 @@ class HomeDetector:
         """
         input_path = self.config.get('input_file')
         user_id_col = self.config.get('user_id_column', 'user_id')
-        self.raw_data = read_data(input_path, user_id_col=user_id_col)
+        if self._engine_reads_input() and not for_plots:
+            return self
+        if self.config.get('max_memory') and self.plan_execution()['mode'] != 'memory':
+            # Too large for the budget: detect_homes reads the input in chunks instead
+            return self
+        self.raw_data = read_data(input_path, user_id_col=user_id_col, n_jobs=self.config.get('n_jobs', 1))
         return self
 
+    def plan_execution(self):
+        """
+        Chooses in-memory, chunked-streaming or sharded execution for config 'max_memory' (e.g. '4GB'),
+        from the input's file sizes and a measured sample (see ghost.planner). With a non-memory plan,
+        load_data() and preprocess_data() do not load the input, and detect_homes() reads it in chunks
+        whose size adapts to the observed RSS.
+
+        Returns:
+            dict: The plan ('mode', 'chunk_rows', 'num_shards', 'footprint', ...), also kept in execution_plan.
+
+        Example:
+            >>> detector = HomeDetector(input_file='points.csv', max_memory='4GB')
+            >>> detector.plan_execution()['mode']
+            'stream'
+        """
+        if self.execution_plan is not None:
+            return self.execution_plan
+        if self.config.get('algorithm', 'grid') != 'grid' or self.config.get('engine', 'pandas') != 'pandas':
+            # Hierarchical grids need all points at once; other engines manage their own memory
+            # (duckdb gets max_memory as its memory limit)
+            self.execution_plan = {'mode': 'memory', 'chunk_rows': None, 'num_shards': None}
+            return self.execution_plan
+        user_id_col = self.config.get('user_id_column', 'user_id')
+        params = {k: self.config[k] for k in ('grid_size', 'night_start', 'night_end', 'epsg_in', 'epsg_out', 'top_k',
+                                              'shifted_grids', 'stay_time_mode', 'max_gap') if k in self.config}
+        estimate = estimate_input(self.config.get('input_file'), user_id_col=user_id_col, params=params)
+        # Stay-point compression needs all of a user's points at once, which only the user shards have
+        streamable = (self.config.get('stay_time_mode', 'span') == 'span' and self.config.get('period') is None
+                      and not self.config.get('export_cells') and not self.config.get('num_shards')
+                      and not self.config.get('compress_stay_points', False))
+        self.execution_plan = plan_execution(estimate, self.config['max_memory'], streamable=streamable,
+                                             n_jobs=self.config.get('n_jobs', 1))
+        return self.execution_plan
+
+    def _engine_reads_input(self) -> bool:
+        # polars/duckdb grid detection scans a CSV/Parquet input file directly (lazily, or out of core);
+        # stay-point compression still needs the points in pandas
+        input_path = self.config.get('input_file')
+        return (self.config.get('engine', 'pandas') != 'pandas' and self.config.get('algorithm', 'grid') == 'grid'
+                and not self.config.get('compress_stay_points', False) and isinstance(input_path, (str, os.PathLike))
+                and not os.path.isdir(input_path) and pathlib.Path(input_path).suffix.lower() in ENGINE_FILE_SUFFIXES)
+
+    def _planned_chunks(self):
+        # Input chunks for a streaming or sharded plan. Stay points are not compressed here: a chunk may end
+        # in the middle of a stay, so sharded runs compress each complete user shard instead
+        user_id_col = self.config.get('user_id_column', 'user_id')
+        for chunk in iter_chunks(self.config.get('input_file'), self.execution_plan['chunk_rows'],
+                                 user_id_col=user_id_col, max_memory=self.config.get('max_memory')):
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], errors='coerce')
+            yield chunk
+
+    def _stay_point_options(self) -> dict:
+        # compress_stay_points options from the config
+        return {
+            'distance_threshold': self.config.get('stay_distance', 10),
+            'time_threshold': self.config.get('stay_time_gap', 300),
+            'epsg_in': self.config.get('epsg_in', 4326),
+            'epsg_out': self.config.get('epsg_out', 32617),
+        }
+
     def preprocess_data(self):
         """
         Projects coordinates and extracts time features for GHOST.
+        With config 'compress_stay_points', stationary runs of points are first collapsed into stay records.
         """
+        if self._engine_reads_input():
+            # Detection reads the input file; points loaded for plots are not preprocessed
+            return self
+        if self.raw_data is None and self.execution_plan and self.execution_plan['mode'] != 'memory':
+            return self
         gdf = self.raw_data.copy()
-        # Project coordinates
         epsg_in = self.config.get('epsg_in', 4326)
         epsg_out = self.config.get('epsg_out', 32617)
+        if self.config.get('compress_stay_points', False):
+            gdf = compress_stay_points(gdf, user_id_col=self.config.get('user_id_column', 'user_id'),
+                                       **self._stay_point_options())
+        # Project coordinates
         prj_lat, prj_lon = project_coordinates(gdf['lat'], gdf['lon'], epsg_in=epsg_in, epsg_out=epsg_out)
         gdf['prj_lat'] = prj_lat
         gdf['prj_lon'] = prj_lon
@@ -79,12 +175,18 @@ class HomeDetector:
         self.preprocessed_data = gdf
         return self
 
-    def detect_homes(self, algorithm='grid'):
+    def detect_homes(self, algorithm=None):
         """
         Runs the selected GHOST home detection algorithm (single or batch).
 
         Args:
-            algorithm (str): Algorithm to use ('grid' supported).
+            algorithm (str): Algorithm to use: 'grid' (default) or 'hierarchical' (adaptive cell size from a
+                fine base grid, see HierarchicalGrid.detect_adaptive). Defaults to config 'algorithm'.
+                With config engine='polars' or 'duckdb', the grid algorithm runs as a polars query (projecting in
+                Python) or one in-process DuckDB query; both scan a CSV/Parquet input file directly, and load_data() and
+                preprocess_data() then leave it to them (DuckDB handles inputs larger than memory).
+                With config num_shards, users are processed in resumable on-disk shards (see ghost.batch.run_sharded)
+                kept in shard_dir, using n_jobs processes.
 
         Returns:
             self: Enables method chaining. Results are available via get_results().
@@ -102,9 +204,117 @@ class HomeDetector:
         night_end = self.config.get('night_end', 6)
         epsg_in = self.config.get('epsg_in', 4326)
         epsg_out = self.config.get('epsg_out', 32617)
+        top_k = self.config.get('top_k', 1)
+        shifted_grids = self.config.get('shifted_grids', False)
+        stay_time_mode = self.config.get('stay_time_mode', 'span')
+        max_gap = self.config.get('max_gap', 3600)
+        period = self.config.get('period')
+        cells_path = self.config.get('export_cells')
         gdf = self.preprocessed_data
-        if gdf[user_id_col].nunique() > 1:
-            # Batch mode
+        self._saved_path = None
+        if algo == 'hierarchical':
+            unsupported = [key for key in ('period', 'export_cells', 'shifted_grids', 'num_shards')
+                           if self.config.get(key)]
+            if self.config.get('engine', 'pandas') != 'pandas':
+                unsupported.append('engine')
+            if unsupported:
+                raise ValueError(f"{', '.join(unsupported)} not supported by the hierarchical algorithm.")
+            grid = HierarchicalGrid(
+                base_size=self.config.get('base_grid_size', 5),
+                levels=self.config.get('grid_levels', 5),
+                night_start=night_start,
+                night_end=night_end,
+                epsg_in=epsg_in,
+                epsg_out=epsg_out,
+                top_k=top_k,
+                stay_time_mode=stay_time_mode,
+                max_gap=max_gap
+            )
+            self.results = grid.fit(gdf, user_id_col=user_id_col).detect_adaptive(
+                min_stay_time=self.config.get('min_stay_time'),
+                min_nights=self.config.get('min_nights'),
+                min_points=self.config.get('min_points')
+            )
+            return self
+        if algo != 'grid':
+            raise ValueError(f"Unknown algorithm: {algo}. Expected 'grid' or 'hierarchical'.")
+        plan = self.execution_plan
+        if plan and plan['mode'] == 'stream' and gdf is None:
+            for _ in self.detect_stream(self._planned_chunks()):
+                pass
+            return self
+        engine = self.config.get('engine', 'pandas')
+        if plan and plan['mode'] == 'sharded' and gdf is None:
+            gdf = self._planned_chunks()
+        if (self.config.get('num_shards') or (plan and plan['mode'] == 'sharded')) and engine == 'pandas':
+            # Resumable sharded run; finished shards in shard_dir are reused after a failure (unless the input
+            # or parameters changed since), and shard_dir is removed once the run succeeds
+            if cells_path:
+                raise ValueError("export_cells is not supported for sharded runs.")
+            # Input chunks, or raw points that skipped preprocess_data, are compressed per user shard
+            stay_points = None
+            if self.config.get('compress_stay_points', False) and (gdf is None or gdf is not self.preprocessed_data):
+                stay_points = self._stay_point_options()
+            if gdf is None:
+                gdf = self.raw_data if self.raw_data is not None else self.load_data().raw_data
+            output_file = self.config.get('output_file')
+            # Without zones to add, each shard is written to output_file as it finishes, so save_results
+            # has nothing left to do
+            streamed = output_file if output_file and not self.config.get('zones_file') else None
+            self.results = run_sharded(
+                gdf,
+                self.config.get('shard_dir') or f"{output_file or 'ghost_results'}.shards",
+                num_shards=self.config.get('num_shards') or plan['num_shards'],
+                n_jobs=self.config.get('n_jobs', 1),
+                user_id_col=user_id_col,
+                output_path=streamed,
+                csv_path=self.config.get('export_csv') if streamed else None,
+                fingerprint=self.fingerprint(),
+                cleanup=True,
+                stay_points=stay_points,
+                grid_size=grid_size,
+                night_start=night_start,
+                night_end=night_end,
+                epsg_in=epsg_in,
+                epsg_out=epsg_out,
+                top_k=top_k,
+                shifted_grids=shifted_grids,
+                stay_time_mode=stay_time_mode,
+                max_gap=max_gap,
+                period=period
+            )
+            self._saved_path = streamed
+            return self
+        if engine != 'pandas':
+            # The engine scans the input file itself; otherwise it gets the loaded points
+            if self._engine_reads_input():
+                gdf = self.config.get('input_file')
+            elif gdf is None:
+                gdf = self.raw_data if self.raw_data is not None else self.config.get('input_file')
+            # DuckDB runs the whole query within max_memory, spilling to spill_dir beyond it
+            engine_memory = {}
+            if engine == 'duckdb':
+                engine_memory = {'memory_limit': self.config.get('max_memory'), 'temp_directory': self.config.get('spill_dir')}
+            self.results = grid_based_batch(
+                gdf,
+                grid_size=grid_size,
+                night_start=night_start,
+                night_end=night_end,
+                user_id_col=user_id_col,
+                epsg_in=epsg_in,
+                epsg_out=epsg_out,
+                top_k=top_k,
+                shifted_grids=shifted_grids,
+                stay_time_mode=stay_time_mode,
+                max_gap=max_gap,
+                engine=engine,
+                period=period,
+                cells_path=cells_path,
+                **engine_memory
+            )
+            return self
+        if gdf[user_id_col].nunique() > 1 or period is not None or cells_path:
+            # Batch mode (also for time-sliced detection and cell exports)
             self.results = grid_based_batch(
                 gdf,
                 grid_size=grid_size,
@@ -112,7 +322,13 @@ class HomeDetector:
                 night_end=night_end,
                 user_id_col=user_id_col,
                 epsg_in=epsg_in,
-                epsg_out=epsg_out
+                epsg_out=epsg_out,
+                top_k=top_k,
+                shifted_grids=shifted_grids,
+                stay_time_mode=stay_time_mode,
+                max_gap=max_gap,
+                period=period,
+                cells_path=cells_path
             )
         else:
             # Single user
@@ -121,7 +337,11 @@ class HomeDetector:
                 night_start=night_start,
                 night_end=night_end,
                 epsg_in=epsg_in,
-                epsg_out=epsg_out
+                epsg_out=epsg_out,
+                top_k=top_k,
+                shifted_grids=shifted_grids,
+                stay_time_mode=stay_time_mode,
+                max_gap=max_gap
             )
             home_lat, home_lon, stats = detector.fit(gdf)
             row = {
@@ -133,6 +353,69 @@ class HomeDetector:
             self.results = pd.DataFrame([row])
         return self
 
+    def detect_stream(self, chunks):
+        """
+        Streaming detection: consumes an iterable of chunks and yields updated home estimates for the
+        users in each chunk, keeping only per-(user, cell) aggregates and the (user, cell, date) keys seen
+        in memory (see ghost.algorithms.stream.StreamingGridDetector). raw_data is not needed.
+
+        Args:
+            chunks: Iterable of DataFrames (or dicts of arrays / structured arrays) with
+                ['timestamp', 'lat', 'lon'] and the user ID column, e.g. pd.read_csv(path, chunksize=...).
+
+        Yields:
+            pandas.DataFrame: One row per user in the chunk, same layout as batch results.
+            Once the iterable is exhausted, get_results() returns the estimates for all users.
+
+        Example:
+            >>> detector = HomeDetector(grid_size=20)
+            >>> for homes in detector.detect_stream(pd.read_csv('points.csv', chunksize=100_000)):
+            ...     publish(homes)
+        """
+        stream = StreamingGridDetector(
+            GridHomeDetector(
+                grid_size=self.config.get('grid_size', 20),
+                night_start=self.config.get('night_start', 22),
+                night_end=self.config.get('night_end', 6),
+                epsg_in=self.config.get('epsg_in', 4326),
+                epsg_out=self.config.get('epsg_out', 32617),
+                top_k=self.config.get('top_k', 1),
+                shifted_grids=self.config.get('shifted_grids', False),
+                stay_time_mode=self.config.get('stay_time_mode', 'span'),
+                max_gap=self.config.get('max_gap', 3600)
+            ),
+            user_id_col=self.config.get('user_id_column', 'user_id'),
+            max_cells_per_user=self.config.get('max_cells_per_user')
+        )
+        for chunk in chunks:
+            yield stream.update(chunk)
+        self.results = stream.results()
+
+    def assign_zones(self, zones_file=None):
+        """
+        Post-detection stage: adds the zone (e.g. census tract) containing each user's home cell to the
+        results, in one bulk spatial-index query. The boundary file is read and indexed once per process
+        (see ghost.zones.load_zones). Does nothing without a boundary file.
+
+        Args:
+            zones_file (str, optional): Boundary file (Shapefile, GeoPackage, GeoJSON, ...); default: config
+                'zones_file'. The zone IDs come from config 'zone_id_column' (default: row position, as 'zone_id').
+
+        Returns:
+            self: Enables method chaining.
+
+        Example:
+            >>> detector = HomeDetector(input_file='points.csv', zones_file='tracts.shp', zone_id_column='GEOID')
+            >>> detector.load_data().preprocess_data().detect_homes().assign_zones()
+        """
+        zones_file = zones_file or self.config.get('zones_file')
+        if not zones_file or self.results is None:
+            return self
+        zones = load_zones(zones_file, id_col=self.config.get('zone_id_column'), epsg=self.config.get('epsg_in', 4326))
+        self.results = assign_zones(self.results, zones)
+        self._saved_path = None
+        return self
+
     def get_results(self):
         """
         Returns the final DataFrame of home locations from GHOST.
@@ -142,6 +425,73 @@ class HomeDetector:
         """
         return self.results
 
+    def fingerprint(self):
+        """
+        Fingerprint of the configured input data and detection parameters.
+
+        Returns:
+            str: Hex digest stored alongside saved results.
+        """
+        return compute_fingerprint(self.config.get('input_file'), self.config)
+
+    def save_results(self, path=None):
+        """
+        Saves results to CSV or Parquet (.parquet, typed columns; requires pyarrow) together with their
+        fingerprint, so later runs can reuse them. A CSV copy is also written to config 'export_csv' if set.
+        Results a sharded run already streamed to this path (rows grouped by shard) are not written again.
+
+        Args:
+            path (str, optional): Output path (default: config 'output_file').
+
+        Returns:
+            self: Enables method chaining.
+        """
+        path = path or self.config.get('output_file')
+        if path is not None and path == self._saved_path:
+            return self
+        save_results(self.results, path, fingerprint=self.fingerprint(), csv_path=self.config.get('export_csv'))
+        return self
+
+    def load_results(self, path=None):
+        """
+        Loads previously saved results if their fingerprint matches the current input and parameters.
+
+        Args:
+            path (str, optional): Results CSV or Parquet path (default: config 'output_file').
+
+        Returns:
+            bool: True if results were loaded, False if they are missing or stale.
+        """
+        path = path or self.config.get('output_file')
+        if not path:
+            return False
+        cached = load_cached_results(path, self.fingerprint())
+        if cached is None:
+            return False
+        self.results = cached
+        return True
+
+    def load_or_detect(self, path=None):
+        """
+        Reuses saved results when they are up to date; otherwise runs detection and saves the results.
+
+        Args:
+            path (str, optional): Results CSV path (default: config 'output_file').
+
+        Returns:
+            self: Enables method chaining.
+
+        Example:
+            >>> detector = HomeDetector(input_file='data.gpx', output_file='results.csv')
+            >>> detector.load_data().load_or_detect()
+        """
+        if self.load_results(path):
+            return self
+        if self.raw_data is None:
+            self.load_data()
+        self.preprocess_data().detect_homes().assign_zones().save_results(path)
+        return self
+
     def _get_default_config(self):
         return {
             'grid_size': 20,
@@ -151,5 +501,30 @@ class HomeDetector:
             'epsg_out': 32617,
             'user_id_column': 'user_id',
             'input_file': None,
-            'algorithm': 'grid'
+            'output_file': None,
+            'algorithm': 'grid',
+            'top_k': 1,
+            'shifted_grids': False,
+            'stay_time_mode': 'span',
+            'max_gap': 3600,
+            'base_grid_size': 5,
+            'grid_levels': 5,
+            'min_stay_time': None,
+            'min_nights': None,
+            'min_points': None,
+            'compress_stay_points': False,
+            'stay_distance': 10,
+            'stay_time_gap': 300,
+            'engine': 'pandas',
+            'num_shards': None,
+            'shard_dir': None,
+            'n_jobs': 1,
+            'max_cells_per_user': None,
+            'period': None,
+            'export_csv': None,
+            'export_cells': None,
+            'max_memory': None,
+            'spill_dir': None,
+            'zones_file': None,
+            'zone_id_column': None
         } 
\ No newline at end of file
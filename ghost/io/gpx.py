@@ -1,10 +1,32 @@
 import pandas as pd
-from typing import Optional
+from typing import Iterator, Optional, Tuple
 import gpxpy
 import gpxpy.gpx
 from datetime import datetime
 import geopandas as gpd
 import pathlib
+import bz2
+import gzip
+import io
+import lzma
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Optional dependency for zstd-compressed inputs
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compressed single files (.csv.gz, .gpx.zst, ...) are decompressed while reading
+COMPRESSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+FORMATS = {'.gpx': 'gpx', '.csv': 'csv', '.txt': 'csv', '.tar': 'tar', '.zip': 'zip'}
+# Shorthand suffixes of compressed tar archives
+TAR_SUFFIXES = {'.tgz': 'gzip', '.tbz2': 'bz2', '.txz': 'xz', '.tzst': 'zstd'}
+# Archive members parsed ahead per worker process; bounds the member bytes held in memory
+MEMBERS_PER_JOB = 4
 
 
 # GHOST.io.gpx: GPX and data reading utilities for the GHOST algorithm
@@ -13,7 +35,7 @@ def read_gpx(filepath: str) -> pd.DataFrame:
     Parse a GPX file and return a DataFrame for use with the GHOST algorithm.
     Handles waypoints, tracks, and metadata as available.
     Args:
-        filepath: Path to the GPX file.
+        filepath: Path to the GPX file (optionally compressed: .gpx.gz, .gpx.zst, ...) or a file object.
     Returns:
         pd.DataFrame: DataFrame with parsed GPS points.
     Example:
@@ -21,13 +43,16 @@ def read_gpx(filepath: str) -> pd.DataFrame:
         >>> print(df.head())
     """
     points = []
-    with open(filepath, 'r', encoding='utf-8') as f:
-        gpx = gpxpy.parse(f)
+    if hasattr(filepath, 'read'):
+        gpx = gpxpy.parse(filepath)
+    else:
+        with open_input(filepath) as f:
+            gpx = gpxpy.parse(f)
 
     # Waypoints
     for wpt in gpx.waypoints:
         points.append({
-            'timestamp': pd.to_datetime(wpt.time) if wpt.time else None,
+            'timestamp': wpt.time,
             'lat': wpt.latitude,
             'lon': wpt.longitude,
             'ele': wpt.elevation if wpt.elevation is not None else None,
@@ -40,7 +65,7 @@ def read_gpx(filepath: str) -> pd.DataFrame:
         for segment in track.segments:
             for pt in segment.points:
                 points.append({
-                    'timestamp': pd.to_datetime(pt.time) if pt.time else None,
+                    'timestamp': pt.time,
                     'lat': pt.latitude,
                     'lon': pt.longitude,
                     'ele': pt.elevation if pt.elevation is not None else None,
@@ -52,7 +77,7 @@ def read_gpx(filepath: str) -> pd.DataFrame:
     for route in gpx.routes:
         for pt in route.points:
             points.append({
-                'timestamp': pd.to_datetime(pt.time) if pt.time else None,
+                'timestamp': pt.time,
                 'lat': pt.latitude,
                 'lon': pt.longitude,
                 'ele': pt.elevation if pt.elevation is not None else None,
@@ -61,6 +86,9 @@ def read_gpx(filepath: str) -> pd.DataFrame:
             })
 
     df = pd.DataFrame(points)
+    if not df.empty:
+        # One conversion for the whole column instead of one per point
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
     # Ensure columns exist even if empty
     for col in ['timestamp', 'lat', 'lon', 'ele', 'name', 'desc']:
         if col not in df.columns:
@@ -68,31 +96,192 @@ def read_gpx(filepath: str) -> pd.DataFrame:
     return df
 
 
-def read_gpx_folder_to_geodf(folder_path, user_id_col='user_id'):
+def input_format(path) -> Tuple[Optional[str], Optional[str]]:
     """
-    Reads a folder of GPX files for GHOST, treating each file as a separate user.
-    Returns a GeoDataFrame with a user_id column.
-
+    Format and compression of an input file or archive member, from its suffixes.
     Args:
-        folder_path (str or Path): Path to folder containing GPX files.
-        user_id_col (str): Name of the user ID column.
+        path: File or member name, e.g. 'u1.gpx.gz', 'points.csv.zst', 'drop.tar.gz', 'drop.zip'.
+    Returns:
+        tuple: (format, compression), format one of 'gpx', 'csv', 'tar', 'zip' (None if unknown),
+            compression one of 'gzip', 'bz2', 'xz', 'zstd' or None.
+    Example:
+        >>> input_format('u1.gpx.gz')
+        ('gpx', 'gzip')
+    """
+    suffixes = [suffix.lower() for suffix in pathlib.PurePath(str(path)).suffixes]
+    if suffixes and suffixes[-1] in TAR_SUFFIXES:
+        return 'tar', TAR_SUFFIXES[suffixes[-1]]
+    compression = COMPRESSIONS.get(suffixes[-1]) if suffixes else None
+    if compression:
+        suffixes = suffixes[:-1]
+    return (FORMATS.get(suffixes[-1]) if suffixes else None), compression
+
+
+def _user_id(name) -> str:
+    # File or member name without directories, compression and format suffixes ('users/u1.gpx.gz' -> 'u1')
+    name = pathlib.PurePosixPath(str(name).replace('\\', '/')).name
+    for _ in range(2):
+        suffix = pathlib.PurePosixPath(name).suffix.lower()
+        if suffix in COMPRESSIONS or suffix in FORMATS:
+            name = name[:-len(suffix)]
+    return name
+
+
+def _decompressor(compression: str, fileobj):
+    # Binary stream decompressing fileobj (which stays open)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is required to read .zst inputs.")
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False)
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=fileobj)
+    return {'bz2': bz2.BZ2File, 'xz': lzma.LZMAFile}[compression](fileobj)
 
+
+def open_input(path, binary: bool = False):
+    """
+    Open an input file for reading, decompressing .gz/.bz2/.xz/.zst files on the fly.
+    Args:
+        path: File path.
+        binary (bool): Return a binary stream instead of UTF-8 text.
     Returns:
-        geopandas.GeoDataFrame: All points with user_id and geometry columns.
+        File object (use as a context manager).
+    """
+    compression = input_format(path)[1]
+    if compression is None:
+        return open(path, 'rb') if binary else open(path, 'r', encoding='utf-8')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is required to read .zst inputs.")
+        stream = zstandard.open(path, 'rb')
+    else:
+        stream = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}[compression](path, 'rb')
+    return stream if binary else io.TextIOWrapper(stream, encoding='utf-8')
+
+
+def _decompress_bytes(data: bytes, compression: str) -> bytes:
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is required to read .zst inputs.")
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as stream:
+            return stream.read()
+    return {'gzip': gzip.decompress, 'bz2': bz2.decompress, 'xz': lzma.decompress}[compression](data)
+
 
+def _is_member(name: str) -> bool:
+    # GPX and CSV members only (no folders, readme files or macOS resource forks)
+    base = pathlib.PurePosixPath(name).name
+    return input_format(name)[0] in ('gpx', 'csv') and not base.startswith('._') and '__MACOSX/' not in name
+
+
+def iter_archive_members(path) -> Iterator[Tuple[str, bytes, int]]:
+    """
+    Iterate the GPX and CSV members of a zip or (optionally compressed) tar archive without extracting
+    it to disk. Tar archives are read as a stream, one member at a time.
+    Args:
+        path: Archive path (.zip, .tar, .tar.gz/.tgz, .tar.bz2, .tar.xz, .tar.zst).
+    Yields:
+        tuple: (member name, member bytes, archive bytes read so far).
     Example:
-        >>> from ghost.io.gpx import read_gpx_folder_to_geodf
-        >>> gdf = read_gpx_folder_to_geodf('my_gpx_folder')
-        >>> print(gdf.head())
+        >>> for name, data, _ in iter_archive_members('drop.zip'):
+        ...     print(name, len(data))
+    """
+    kind, compression = input_format(path)
+    if kind == 'zip':
+        with zipfile.ZipFile(path) as archive:
+            consumed = 0
+            for info in archive.infolist():
+                consumed += info.compress_size
+                if not info.is_dir() and _is_member(info.filename):
+                    yield info.filename, archive.read(info), consumed
+        return
+    if kind != 'tar':
+        raise ValueError(f"Not a zip or tar archive: {path}")
+    with open(path, 'rb') as raw:
+        stream = _decompressor(compression, raw) if compression else raw
+        with tarfile.open(fileobj=stream, mode='r|') as archive:
+            for member in archive:
+                if member.isfile() and _is_member(member.name):
+                    yield member.name, archive.extractfile(member).read(), raw.tell()
+
+
+def _read_member(name: str, source, user_id_col: str) -> pd.DataFrame:
+    """
+    Parse one input file or archive member (bytes). GPX points get the user ID from the name; CSV
+    members keep their own user ID column if they have one. Runs in worker processes.
+    """
+    kind, compression = input_format(name)
+    if isinstance(source, bytes):
+        data = _decompress_bytes(source, compression) if compression else source
+        df = read_gpx(io.BytesIO(data)) if kind == 'gpx' else pd.read_csv(io.BytesIO(data))
+    else:
+        df = read_gpx(source) if kind == 'gpx' else pd.read_csv(source)
+    if kind == 'gpx' or user_id_col not in df.columns:
+        df[user_id_col] = _user_id(name)
+    return df
+
+
+def _unique_users(items):
+    # GPX files and members named alike ('a/u1.gpx' and 'b/u1.gpx', or 'u1.gpx' and 'u1.gpx.gz') would
+    # otherwise be merged into one user
+    seen = {}
+    for name, source in items:
+        if input_format(name)[0] == 'gpx':
+            user = _user_id(name)
+            if user in seen:
+                raise ValueError(f"'{seen[user]}' and '{name}' both give user ID '{user}'; rename one of them.")
+            seen[user] = name
+        yield name, source
+
+
+def gpx_files(folder) -> list:
+    """
+    GPX files of a folder, plain or compressed (*.gpx, *.gpx.gz, *.gpx.zst, ...), sorted by name.
+    """
+    return sorted(f for f in pathlib.Path(folder).iterdir() if f.is_file() and input_format(f.name)[0] == 'gpx')
+
+
+def iter_user_frames(input_path, user_id_col: str = 'user_id', n_jobs: int = 1) -> Iterator[pd.DataFrame]:
     """
-    folder = pathlib.Path(folder_path)
-    all_points = []
-    user_files = list(folder.glob("*.gpx"))
-    for gpx_file in user_files:
-        df = read_gpx(str(gpx_file))
-        if not df.empty:
-            df[user_id_col] = gpx_file.stem
-            all_points.append(df)
+    Parse a GPX folder, a zip/tar archive or a single GPX file into one DataFrame per file or member
+    (empty ones are skipped), with the user ID taken from the file or member name like
+    read_gpx_folder_to_geodf does. Two GPX files or members with the same user ID (e.g. 'a/u1.gpx' and
+    'b/u1.gpx') raise a ValueError instead of being merged. With n_jobs > 1, files are parsed in worker processes while the
+    archive is read, a few members ahead per worker; frames are yielded in file order.
+    Args:
+        input_path: Folder, archive or GPX file (plain or compressed).
+        user_id_col (str): Name of the user ID column.
+        n_jobs (int): Worker processes (1 = parse in this process).
+    Yields:
+        pd.DataFrame: Parsed points of one file or member.
+    """
+    path = pathlib.Path(input_path)
+    if path.is_dir():
+        items = _unique_users((f.name, str(f)) for f in gpx_files(path))
+    elif input_format(path)[0] in ('zip', 'tar'):
+        items = _unique_users((name, data) for name, data, _ in iter_archive_members(path))
+    else:
+        items = iter([(path.name, str(path))])
+    if n_jobs <= 1:
+        frames = (_read_member(name, source, user_id_col) for name, source in items)
+        yield from (df for df in frames if not df.empty)
+        return
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        pending = deque()
+        for name, source in items:
+            pending.append(pool.submit(_read_member, name, source, user_id_col))
+            if len(pending) >= MEMBERS_PER_JOB * n_jobs:
+                df = pending.popleft().result()
+                if not df.empty:
+                    yield df
+        while pending:
+            df = pending.popleft().result()
+            if not df.empty:
+                yield df
+
+
+def _points_geodf(frames, user_id_col: str) -> gpd.GeoDataFrame:
+    all_points = list(frames)
     if not all_points:
         return gpd.GeoDataFrame(columns=['timestamp', 'lat', 'lon', 'ele', 'name', 'desc', user_id_col, 'geometry'], crs="EPSG:4326")
     df_all = pd.concat(all_points, ignore_index=True)
@@ -104,16 +293,41 @@ def read_gpx_folder_to_geodf(folder_path, user_id_col='user_id'):
     return gdf
 
 
-def read_data(input_path, user_id_col='user_id', lat_col='lat', lon_col='lon'):
+def read_gpx_folder_to_geodf(folder_path, user_id_col='user_id', n_jobs=1):
+    """
+    Reads a folder of GPX files for GHOST, treating each file as a separate user.
+    Returns a GeoDataFrame with a user_id column.
+
+    Args:
+        folder_path (str or Path): Path to folder containing GPX files (plain or compressed, e.g. .gpx.gz).
+        user_id_col (str): Name of the user ID column.
+        n_jobs (int): Worker processes parsing files in parallel.
+
+    Returns:
+        geopandas.GeoDataFrame: All points with user_id and geometry columns.
+
+    Example:
+        >>> from ghost.io.gpx import read_gpx_folder_to_geodf
+        >>> gdf = read_gpx_folder_to_geodf('my_gpx_folder')
+        >>> print(gdf.head())
+    """
+    return _points_geodf(iter_user_frames(folder_path, user_id_col=user_id_col, n_jobs=n_jobs), user_id_col)
+
+
+def read_data(input_path, user_id_col='user_id', lat_col='lat', lon_col='lon', n_jobs=1):
     """
-    Generic data reader for CSV, single GPX, or folder of GPX files for GHOST.
+    Generic data reader for CSV, single GPX, folder of GPX files, or zip/tar archive for GHOST.
+    Single files may be compressed (.csv.gz, .gpx.zst, ...; zstd requires zstandard) and are decompressed
+    while reading. Archive members are read without extracting the archive to disk; each GPX member is
+    one user, named after the member like the files of a folder.
     Returns a GeoDataFrame with a user_id column.
 
     Args:
-        input_path (str): Path to file or folder.
+        input_path (str): Path to file, folder or archive.
         user_id_col (str): Name of user ID column.
         lat_col (str): Latitude column name (for CSV).
         lon_col (str): Longitude column name (for CSV).
+        n_jobs (int): Worker processes parsing folder files or archive members in parallel.
 
     Returns:
         geopandas.GeoDataFrame: Data with user_id and geometry columns.
@@ -124,20 +338,25 @@ def read_data(input_path, user_id_col='user_id', lat_col='lat', lon_col='lon'):
         >>> print(gdf.head())
         >>> gdf2 = read_data('my_gpx_folder')
         >>> print(gdf2['user_id'].unique())
+        >>> gdf3 = read_data('drop.zip', n_jobs=8)
     """
     path = pathlib.Path(input_path)
+    kind = input_format(path)[0]
     if path.is_dir():
-        return read_gpx_folder_to_geodf(path, user_id_col=user_id_col)
-    elif path.suffix.lower() == '.gpx':
+        return read_gpx_folder_to_geodf(path, user_id_col=user_id_col, n_jobs=n_jobs)
+    elif kind in ('zip', 'tar'):
+        return _points_geodf(iter_user_frames(path, user_id_col=user_id_col, n_jobs=n_jobs), user_id_col)
+    elif kind == 'gpx':
         df = read_gpx(str(path))
-        df[user_id_col] = path.stem
+        df[user_id_col] = _user_id(path.name)
         gdf = gpd.GeoDataFrame(
             df,
             geometry=gpd.points_from_xy(df['lon'], df['lat']),
             crs="EPSG:4326"
         )
         return gdf
-    elif path.suffix.lower() in ['.csv', '.txt']:
+    elif kind == 'csv':
+        # pandas decompresses .gz/.bz2/.xz/.zst by suffix
         df = pd.read_csv(str(path))
         if user_id_col not in df.columns:
             df[user_id_col] = 1  # fallback for single-user CSV
@@ -0,0 +1,313 @@
+import hashlib
+import json
+import os
+import pathlib
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from ghost.io.gpx import gpx_files
+
+# Optional dependency for Parquet results
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# GHOST.io.results: Saving and reusing detection results for the GHOST algorithm
+
+# Typed result columns; other columns (user IDs, period, top-k fields) keep their own dtypes.
+RESULT_DTYPES = {
+    'lat': 'float64',
+    'lon': 'float64',
+    'num_nights': 'int64',
+    'num_points': 'int64',
+    'stay_time': 'float64',
+    'prj_lat': 'float64',
+    'prj_lon': 'float64',
+    'inferred_from': 'string',
+    'grid_shift': 'float64',
+    'confidence': 'float64',
+    'reason': 'string',
+}
+# Columns only some batches produce; always written so every batch fits the file schema
+OPTIONAL_COLUMNS = ['reason']
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+
+# Detection parameters that change the results; any change invalidates saved results.
+FINGERPRINT_KEYS = [
+    'grid_size',
+    'night_start',
+    'night_end',
+    'epsg_in',
+    'epsg_out',
+    'user_id_column',
+    'algorithm',
+    'top_k',
+    'shifted_grids',
+    'stay_time_mode',
+    'max_gap',
+    'base_grid_size',
+    'grid_levels',
+    'min_stay_time',
+    'min_nights',
+    'min_points',
+    'compress_stay_points',
+    'stay_distance',
+    'stay_time_gap',
+    'period',
+    # Streaming with pruned cells is approximate, so it must not reuse (or be reused as) exact results
+    'max_cells_per_user',
+    'zones_file',
+    'zone_id_column',
+]
+
+
+def _normalize_value(value):
+    # 20 and 20.0 describe the same grid; keep the fingerprint stable across config sources.
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def input_signature(input_path) -> list:
+    """
+    Describe the input data by file name, size and modification time (no content is read).
+    Args:
+        input_path: Path to a GPX/CSV file or a folder of GPX files.
+    Returns:
+        list: One [path, size, mtime_ns] entry per input file.
+    Example:
+        >>> sig = input_signature('data.gpx')
+    """
+    if input_path is None:
+        return []
+    path = pathlib.Path(input_path)
+    if path.is_dir():
+        # Only the files read_data reads, so results saved into the folder do not count.
+        files = gpx_files(path)
+    elif path.exists():
+        files = [path]
+    else:
+        return [[str(path), None, None]]
+    signature = []
+    for f in files:
+        st = f.stat()
+        signature.append([str(f.resolve()), st.st_size, st.st_mtime_ns])
+    return signature
+
+
+def compute_fingerprint(input_path, params: Dict[str, Any]) -> str:
+    """
+    Fingerprint the input data and the detection parameters used to produce a results file.
+    Args:
+        input_path: Path to the input file or folder.
+        params: Detection parameters (only FINGERPRINT_KEYS are used).
+    Returns:
+        str: Hex digest identifying this input/parameter combination.
+    Example:
+        >>> fp = compute_fingerprint('data.gpx', {'grid_size': 20, 'night_start': 22, 'night_end': 6})
+    """
+    payload = {
+        'input': input_signature(input_path),
+        'params': {k: _normalize_value(params.get(k)) for k in FINGERPRINT_KEYS},
+    }
+    if params.get('zones_file'):
+        # Edited boundaries change the zone column too
+        payload['zones'] = input_signature(params['zones_file'])
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def metadata_path(results_path) -> str:
+    """
+    Path of the metadata file stored next to a results file.
+    """
+    return f"{results_path}.meta.json"
+
+
+def is_parquet(path) -> bool:
+    """
+    Whether a results path is written as Parquet (by suffix: .parquet/.pq); anything else is CSV.
+    """
+    return pathlib.Path(str(path)).suffix.lower() in PARQUET_SUFFIXES
+
+
+def typed_results(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast the known result columns to RESULT_DTYPES (integer counts stay integer, labels are strings).
+    """
+    casts = {col: dtype for col, dtype in RESULT_DTYPES.items() if col in results.columns}
+    for col, dtype in list(casts.items()):
+        # Narrower numeric types of the same kind (e.g. int32 counts in cell tables) are kept
+        if dtype != 'string' and results[col].dtype.kind == pd.api.types.pandas_dtype(dtype).kind:
+            del casts[col]
+    for col in ('num_nights', 'num_points'):
+        if col in casts and results[col].isnull().any():
+            casts[col] = 'Int64'
+    return results.astype(casts)
+
+
+class ResultsWriter:
+    """
+    Incremental results writer: batches of result rows (e.g. one per shard) are appended as they
+    finish, to Parquet (one row group per batch) or CSV, into a temporary file that replaces path on
+    close. The schema is fixed by the first batch, so every batch is written with the same typed columns.
+    Metadata (fingerprint, row count) is written on close, as in save_results.
+
+    Example:
+        >>> with ResultsWriter('results.parquet', fingerprint=fp, csv_path='results.csv') as writer:
+        ...     for shard_results in shards:
+        ...         writer.write(shard_results)
+    """
+    def __init__(self, path, fingerprint: Optional[str] = None, csv_path=None, optional_columns=OPTIONAL_COLUMNS):
+        """
+        Args:
+            path: Output path; .parquet/.pq is written as Parquet (requires pyarrow), anything else as CSV.
+            fingerprint (str, optional): Fingerprint from compute_fingerprint, stored in the metadata file.
+            csv_path (optional): Also write the same rows to this CSV (always CSV, whatever its suffix).
+            optional_columns: Columns added (empty) to the first batch if missing, so later batches fit the
+                schema (default: OPTIONAL_COLUMNS of detection results).
+        """
+        self.paths = [str(path)] + ([str(csv_path)] if csv_path else [])
+        self.parquet = is_parquet(path)
+        if self.parquet and pq is None:
+            raise ImportError("pyarrow is required for Parquet results.")
+        self.fingerprint = fingerprint
+        self.optional_columns = list(optional_columns)
+        self.columns = None
+        self.schema = None
+        self.parquet_writer = None
+        self.num_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write(self, results: pd.DataFrame):
+        """
+        Append a batch of result rows.
+        """
+        results = typed_results(results.reset_index(drop=True))
+        if self.columns is None:
+            missing = {col: pd.Series(pd.NA, index=results.index, dtype=RESULT_DTYPES.get(col, 'object'))
+                       for col in self.optional_columns if col not in results.columns}
+            results = results.assign(**missing)
+            self.columns = list(results.columns)
+        else:
+            extra = set(results.columns) - set(self.columns)
+            if extra:
+                raise ValueError(f"Results batch has columns not in the file schema: {sorted(extra)}.")
+            results = results.reindex(columns=self.columns)
+        for i, path in enumerate(self.paths):
+            tmp = f"{path}.tmp"
+            if self.parquet and i == 0:
+                table = pa.Table.from_pandas(results, schema=self.schema, preserve_index=False)
+                if self.parquet_writer is None:
+                    self.schema = table.schema
+                    self.parquet_writer = pq.ParquetWriter(tmp, self.schema)
+                self.parquet_writer.write_table(table)
+            else:
+                results.to_csv(tmp, index=False, mode='w' if self.num_rows == 0 else 'a', header=self.num_rows == 0)
+        self.num_rows += len(results)
+
+    def close(self):
+        """
+        Finish the files, move them into place and write the metadata.
+        """
+        if self.columns is None:
+            # No batches: still produce an (empty) results file
+            self.write(pd.DataFrame({'lat': [], 'lon': []}))
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+        for path in self.paths:
+            os.replace(f"{path}.tmp", path)
+        _write_metadata(self.paths[0], self.fingerprint, self.num_rows)
+
+    def abort(self):
+        """
+        Discard the partial files; existing results at the output paths are left untouched.
+        """
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+        for path in self.paths:
+            if os.path.exists(f"{path}.tmp"):
+                os.remove(f"{path}.tmp")
+
+
+def _write_metadata(path, fingerprint: Optional[str], num_rows: int):
+    meta_path = metadata_path(path)
+    if fingerprint is None:
+        # Stale metadata must not vouch for results it did not describe.
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        return
+    with open(meta_path, 'w') as f:
+        json.dump({'fingerprint': fingerprint, 'num_rows': int(num_rows)}, f)
+
+
+def save_results(results: pd.DataFrame, path, fingerprint: Optional[str] = None, csv_path=None):
+    """
+    Save detection results to CSV or Parquet (by suffix), together with a metadata file holding their fingerprint.
+    Args:
+        results: Results DataFrame (one row per user).
+        path: Output path (.csv, or .parquet/.pq for typed Parquet; requires pyarrow).
+        fingerprint: Fingerprint from compute_fingerprint (optional).
+        csv_path: Also write a CSV copy to this path (optional).
+    Example:
+        >>> save_results(results, 'results.parquet', fingerprint=fp)
+    """
+    with ResultsWriter(path, fingerprint=fingerprint, csv_path=csv_path) as writer:
+        writer.write(results)
+
+
+def read_results(path) -> pd.DataFrame:
+    """
+    Read saved results with typed columns: Parquet keeps the written schema; CSV columns are cast to
+    RESULT_DTYPES after parsing.
+    Args:
+        path: Results path (.csv or .parquet/.pq).
+    Returns:
+        pd.DataFrame: Results.
+    Example:
+        >>> results = read_results('results.parquet')
+    """
+    if is_parquet(path):
+        if pq is None:
+            raise ImportError("pyarrow is required for Parquet results.")
+        return pq.read_table(str(path)).to_pandas()
+    return typed_results(pd.read_csv(path))
+
+
+def load_cached_results(path, fingerprint: str) -> Optional[pd.DataFrame]:
+    """
+    Load saved results if they were produced from the same input and parameters.
+    Args:
+        path: Results path (CSV or Parquet).
+        fingerprint: Expected fingerprint (from compute_fingerprint).
+    Returns:
+        pd.DataFrame or None: The saved results, or None if missing or stale.
+    Example:
+        >>> results = load_cached_results('results.csv', fp)
+    """
+    meta_path = metadata_path(path)
+    if not os.path.exists(path) or not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('fingerprint') != fingerprint:
+        return None
+    return read_results(path)
@@ -0,0 +1,231 @@
+# GHOST.planner: Memory-budgeted execution planning for HomeDetector
+
+import math
+import os
+import pathlib
+import re
+import tracemalloc
+from typing import Any, Dict, Iterator, Optional
+
+import pandas as pd
+
+from ghost.algorithms.grid import grid_based_batch
+from ghost.io.gpx import (_decompressor, _read_member, gpx_files, input_format, iter_archive_members,
+                         iter_user_frames, read_gpx)
+from ghost.preprocessing.time import extract_time_features
+
+# Peak RSS fallback where /proc is not available (not on Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+EXECUTION_MODES = ('memory', 'stream', 'sharded')
+# Fraction of max_memory the plan aims for; the rest covers the interpreter, libraries and estimate error
+SAFETY_FRACTION = 0.7
+# Rows sampled from the input to measure the per-row footprint
+SAMPLE_ROWS = 10_000
+MIN_CHUNK_ROWS = 10_000
+# Chunk size adaptation: shrink above HIGH_WATER of the budget, grow below LOW_WATER
+HIGH_WATER = 0.8
+LOW_WATER = 0.4
+_UNITS = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2, 'G': 1024 ** 3, 'GB': 1024 ** 3,
+          'T': 1024 ** 4, 'TB': 1024 ** 4}
+
+
+def parse_memory(value) -> int:
+    """
+    Parse a memory size into bytes.
+    Args:
+        value: Bytes as a number, or a string such as '512MB', '4GB', '1.5G'.
+    Returns:
+        int: Size in bytes.
+    Example:
+        >>> parse_memory('4GB')
+        4294967296
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r'\s*([\d.]+)\s*([A-Za-z]*)\s*', str(value))
+    if not match or match.group(2).upper() not in _UNITS:
+        raise ValueError(f"Invalid memory size: {value!r}. Expected e.g. '512MB' or '4GB'.")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def current_rss() -> int:
+    """
+    Resident set size of this process in bytes (from /proc when available, else the peak RSS).
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak if peak > 1 << 32 else peak * 1024
+
+
+def _input_files(path: pathlib.Path):
+    if path.is_dir():
+        return gpx_files(path)
+    return [path]
+
+
+def _read_sample(path: pathlib.Path, user_id_col: str, sample_rows: int):
+    """
+    First rows of the input and the number of input bytes they took, for extrapolating the row count.
+    Compressed inputs count compressed bytes, like their file sizes.
+    """
+    files = _input_files(path)
+    if not files:
+        return pd.DataFrame(), 0
+    kind, compression = input_format(files[0])
+    if kind in ('zip', 'tar'):
+        # Archive: the first member stands for the rest
+        for name, data, consumed in iter_archive_members(files[0]):
+            points = _read_member(name, data, user_id_col)
+            return points.head(sample_rows), consumed * min(sample_rows, len(points)) / max(len(points), 1)
+        return pd.DataFrame(), 0
+    if kind == 'gpx':
+        # GPX: parse the smallest file; its size per point stands for the whole input
+        smallest = min(files, key=lambda f: f.stat().st_size)
+        points = read_gpx(str(smallest))
+        sample = points.head(sample_rows).assign(**{user_id_col: smallest.stem})
+        return sample, smallest.stat().st_size * len(sample) / max(len(points), 1)
+    with open(files[0], 'rb') as raw:
+        stream = _decompressor(compression, raw) if compression else raw
+        lines = [stream.readline() for _ in range(sample_rows + 1)]
+        # Position in the (compressed) file after the sample, less the header's share
+        sample_bytes = raw.tell() * sum(len(line) for line in lines[1:]) / max(sum(len(line) for line in lines), 1)
+    sample = pd.read_csv(files[0], nrows=sample_rows)
+    if user_id_col not in sample.columns:
+        sample[user_id_col] = 1
+    return sample, sample_bytes
+
+
+def estimate_input(input_path, user_id_col: str = 'user_id', sample_rows: int = SAMPLE_ROWS,
+                   params: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """
+    Estimate the in-memory footprint of running detection on an input file or GPX folder.
+
+    The row count is extrapolated from the file sizes and the bytes per row of a sample. The bytes
+    per row in memory are measured by running preprocessing and batch detection on the sample
+    (tracemalloc peak plus the sample itself, counted twice for the raw and preprocessed copies).
+    Args:
+        input_path: CSV file, GPX file, folder of GPX files or zip/tar archive (files may be compressed).
+        user_id_col (str): The name of the user identifier column.
+        sample_rows (int): Rows to sample.
+        params (dict, optional): Detection parameters for grid_based_batch used on the sample.
+    Returns:
+        dict: 'rows' (estimated row count), 'input_bytes', 'bytes_per_row' and 'footprint' (bytes).
+    Example:
+        >>> estimate = estimate_input('points.csv')
+        >>> estimate['footprint'] / 1e9
+    """
+    path = pathlib.Path(input_path)
+    input_bytes = sum(f.stat().st_size for f in _input_files(path))
+    sample, sample_bytes = _read_sample(path, user_id_col, sample_rows)
+    if sample.empty or sample_bytes <= 0:
+        return {'rows': 0, 'input_bytes': input_bytes, 'bytes_per_row': 0.0, 'footprint': 0.0}
+    rows = input_bytes * len(sample) / sample_bytes
+    sample_memory = sample.memory_usage(deep=True).sum()
+    tracemalloc.start()
+    try:
+        grid_based_batch(extract_time_features(sample), user_id_col=user_id_col, **(params or {}))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    bytes_per_row = float(2 * sample_memory + peak) / len(sample)
+    return {'rows': float(rows), 'input_bytes': input_bytes, 'bytes_per_row': bytes_per_row,
+            'footprint': rows * bytes_per_row}
+
+
+def plan_execution(estimate: Dict[str, float], max_memory, streamable: bool = True, n_jobs: int = 1) -> Dict[str, Any]:
+    """
+    Choose how to run detection within a memory budget.
+
+    'memory' loads everything when the estimated footprint fits in SAFETY_FRACTION of max_memory.
+    Otherwise the input is read in chunks sized to half of that budget: 'stream' feeds them to the
+    incremental detector (span stay-time), 'sharded' partitions them into on-disk user shards small
+    enough that n_jobs of them fit at once (everything else).
+    Args:
+        estimate (dict): From estimate_input.
+        max_memory: Budget in bytes or as a string ('4GB').
+        streamable (bool): Whether the detection settings can run incrementally.
+        n_jobs (int): Worker processes for sharded runs.
+    Returns:
+        dict: 'mode' (one of EXECUTION_MODES), 'chunk_rows', 'num_shards', 'budget' and the estimate.
+    """
+    budget = parse_memory(max_memory)
+    target = budget * SAFETY_FRACTION
+    plan = {'mode': 'memory', 'chunk_rows': None, 'num_shards': None, 'budget': budget, **estimate}
+    if estimate['footprint'] <= target:
+        return plan
+    bytes_per_row = max(estimate['bytes_per_row'], 1.0)
+    plan['chunk_rows'] = max(MIN_CHUNK_ROWS, int(target / 2 / bytes_per_row))
+    if streamable:
+        plan['mode'] = 'stream'
+    else:
+        plan['mode'] = 'sharded'
+        plan['num_shards'] = max(2, math.ceil(2 * estimate['footprint'] * max(n_jobs, 1) / target))
+    return plan
+
+
+def iter_chunks(input_path, chunk_rows: int, user_id_col: str = 'user_id', max_memory=None) -> Iterator[pd.DataFrame]:
+    """
+    Read the input in chunks of about chunk_rows rows. With max_memory, the chunk size is adapted
+    after each chunk from the observed RSS: halved above HIGH_WATER of the budget (down to
+    MIN_CHUNK_ROWS), doubled (up to 4x the initial size) below LOW_WATER.
+    Args:
+        input_path: CSV file, GPX file, folder of GPX files or zip/tar archive (one user per file or member);
+            files may be compressed.
+        chunk_rows (int): Initial rows per chunk.
+        user_id_col (str): The name of the user identifier column.
+        max_memory (optional): Budget in bytes or as a string ('4GB').
+    Yields:
+        pd.DataFrame: Chunks with ['timestamp', 'lat', 'lon'] and the user ID column.
+    """
+    budget = parse_memory(max_memory) if max_memory is not None else None
+    initial = rows = max(int(chunk_rows), 1)
+    # Below this, per-chunk overhead dominates; the budget is then too small to honour anyway
+    floor = min(initial, MIN_CHUNK_ROWS)
+
+    def adapt(rows):
+        if budget is None:
+            return rows
+        rss = current_rss()
+        if rss > HIGH_WATER * budget:
+            return max(rows // 2, floor)
+        if rss < LOW_WATER * budget:
+            return min(rows * 2, 4 * initial)
+        return rows
+
+    path = pathlib.Path(input_path)
+    files = _input_files(path)
+    if files and input_format(files[0])[0] == 'csv':
+        # pandas decompresses .gz/.bz2/.xz/.zst by suffix
+        with pd.read_csv(files[0], iterator=True) as reader:
+            while True:
+                try:
+                    chunk = reader.get_chunk(rows)
+                except StopIteration:
+                    return
+                if user_id_col not in chunk.columns:
+                    chunk[user_id_col] = 1
+                yield chunk
+                rows = adapt(rows)
+        return
+    pending = []
+    pending_rows = 0
+    # GPX files, GPX folders and archives: one user per file or member
+    for df in iter_user_frames(path, user_id_col=user_id_col):
+        pending.append(df)
+        pending_rows += len(df)
+        if pending_rows >= rows:
+            yield pd.concat(pending, ignore_index=True)
+            pending, pending_rows = [], 0
+            rows = adapt(rows)
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
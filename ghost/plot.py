@@ -1,8 +1,15 @@
 # GHOST.plot: Visualization utilities for the GHOST algorithm
 
 import matplotlib.pyplot as plt
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import LogNorm
+import numpy as np
 import pandas as pd
-from typing import Optional, Any
+from typing import Optional, Any, Tuple
+from ghost.preprocessing.projection import get_transformer, project_coordinates
+
+# Above this many points, 'auto' mode draws a density map instead of one marker per point
+DENSITY_THRESHOLD = 50000
 
 # Optional imports for basemap and interactive
 try:
@@ -21,9 +28,10 @@ def plot_tracks(df):
     # Implementation to be added
     raise NotImplementedError("Track plotting not yet implemented.")
 
-def plot_gps_points(df: pd.DataFrame, ax: Optional[plt.Axes] = None, color: str = 'blue', alpha: float = 0.5, s: int = 10, basemap: bool = False, crs: str = 'epsg:4326', **kwargs):
+def plot_gps_points(df: pd.DataFrame, ax: Optional[plt.Axes] = None, color: str = 'blue', alpha: float = 0.5, s: int = 10, basemap: bool = False, crs: str = 'epsg:4326', mode: str = 'auto', density_threshold: int = DENSITY_THRESHOLD, grid_size: Optional[float] = None, epsg_in: int = 4326, epsg_out: int = 32617, **kwargs):
     """
     Plot GPS points using matplotlib for the GHOST algorithm. Optionally add a basemap (requires contextily and projected CRS).
+    Large traces can be drawn as a density map, whose cost depends on the number of occupied cells rather than points.
     Args:
         df: DataFrame with 'lat' and 'lon' columns.
         ax: Optional matplotlib Axes.
@@ -32,11 +40,16 @@ def plot_gps_points(df: pd.DataFrame, ax: Optional[plt.Axes] = None, color: str
         s: Marker size.
         basemap: If True, add OSM basemap (requires contextily and projected CRS).
         crs: CRS of input data ('epsg:4326' for lat/lon, 'epsg:3857' for web mercator).
+        mode: 'scatter' (one marker per point), 'density', or 'auto' (density above density_threshold points).
+        density_threshold: Point count above which 'auto' switches to density rendering.
+        grid_size: If given, density is counted on the GHOST detection grid (meters); otherwise a hexbin is drawn.
+        epsg_in, epsg_out: Projection used for the detection grid (only with grid_size).
         **kwargs: Passed to plt.scatter.
     Returns:
         ax: The matplotlib Axes.
     Example:
         >>> plot_gps_points(df)
+        >>> plot_gps_points(big_df, mode='density', grid_size=20)
     """
     if ax is None:
         fig, ax = plt.subplots(figsize=(8, 8))
@@ -45,13 +58,105 @@ def plot_gps_points(df: pd.DataFrame, ax: Optional[plt.Axes] = None, color: str
     if crs == 'epsg:3857':
         x = df['lon']
         y = df['lat']
-    ax.scatter(x, y, c=color, alpha=alpha, s=s, label='GPS points', **kwargs)
+    if mode == 'auto':
+        mode = 'density' if len(df) > density_threshold else 'scatter'
+    if mode == 'density':
+        if grid_size is not None and crs == 'epsg:4326':
+            plot_grid_density(df, ax=ax, grid_size=grid_size, epsg_in=epsg_in, epsg_out=epsg_out)
+        else:
+            mask = x.notnull() & y.notnull()
+            hb = ax.hexbin(x[mask], y[mask], gridsize=200, bins='log', mincnt=1, cmap='Blues')
+            hb.set_label('GPS point density')
+    elif mode == 'scatter':
+        ax.scatter(x, y, c=color, alpha=alpha, s=s, label='GPS points', **kwargs)
+    else:
+        raise ValueError(f"Unknown plot mode: {mode}. Expected 'auto', 'scatter' or 'density'.")
     ax.set_xlabel('Longitude')
     ax.set_ylabel('Latitude')
     if basemap and ctx is not None and crs == 'epsg:3857':
         ctx.add_basemap(ax, crs=crs)
     return ax
 
+def _cell_polygons(prj_lat, prj_lon, grid_size, epsg_in: int = 4326, epsg_out: int = 32617) -> np.ndarray:
+    """
+    Corners (lon, lat) of GHOST grid cells centered on the given projected coordinates.
+    grid_size is one size for all cells or one per cell. Returns an array of shape (n_cells, 4, 2).
+    """
+    half = np.broadcast_to(np.asarray(grid_size, dtype=float), np.shape(prj_lat))[:, None] / 2.0
+    cy = np.asarray(prj_lat, dtype=float)[:, None]
+    cx = np.asarray(prj_lon, dtype=float)[:, None]
+    corner_x = cx + np.array([-half, half, half, -half])
+    corner_y = cy + np.array([-half, -half, half, half])
+    transformer = get_transformer(epsg_out, epsg_in)
+    lon, lat = transformer.transform(corner_x.ravel(), corner_y.ravel())
+    return np.stack([np.asarray(lon), np.asarray(lat)], axis=-1).reshape(-1, 4, 2)
+
+def plot_grid_density(df: pd.DataFrame, ax: Optional[plt.Axes] = None, grid_size: float = 20, epsg_in: int = 4326, epsg_out: int = 32617, cmap: str = 'Blues'):
+    """
+    Draw point counts per GHOST grid cell (the same cells used for detection) as shaded polygons.
+    Args:
+        df: DataFrame with 'lat' and 'lon' columns.
+        ax: Optional matplotlib Axes.
+        grid_size: Grid size in meters.
+        epsg_in, epsg_out: Input and projected EPSG codes (as used for detection).
+        cmap: Matplotlib colormap name.
+    Returns:
+        ax: The matplotlib Axes.
+    Example:
+        >>> plot_grid_density(df, grid_size=20)
+    """
+    if ax is None:
+        fig, ax = plt.subplots(figsize=(8, 8))
+    prj_lat, prj_lon = project_coordinates(df['lat'], df['lon'], epsg_in=epsg_in, epsg_out=epsg_out)
+    cells = pd.DataFrame({
+        'LAT_Grid': np.round(prj_lat / grid_size) * grid_size,
+        'LON_Grid': np.round(prj_lon / grid_size) * grid_size,
+    }).dropna()
+    counts = cells.value_counts(sort=False).reset_index(name='num_points')
+    if counts.empty:
+        return ax
+    polys = _cell_polygons(counts['LAT_Grid'], counts['LON_Grid'], grid_size, epsg_in, epsg_out)
+    collection = PolyCollection(polys, array=counts['num_points'].to_numpy(), cmap=cmap,
+                                norm=LogNorm(vmin=1, vmax=max(int(counts['num_points'].max()), 2)),
+                                edgecolors='none', label='GPS point density')
+    ax.add_collection(collection)
+    ax.autoscale_view()
+    return ax
+
+def plot_cells(ax: plt.Axes, lats, lons, grid_size, epsg_in: int = 4326, epsg_out: int = 32617, color: str = 'red', label: Optional[str] = None, linewidth: float = 2, prj_lats=None, prj_lons=None):
+    """
+    Outline GHOST grid cells (e.g. the home cell or top candidate cells) given their center coordinates.
+    Args:
+        ax: Matplotlib Axes.
+        lats, lons: Cell center latitudes/longitudes (WGS84), as reported in the results.
+        grid_size: Cell size in meters, one for all cells or one per cell (e.g. the level of hierarchical results).
+        epsg_in, epsg_out: Input and projected EPSG codes (as used for detection).
+        color: Outline color.
+        label: Legend label.
+        linewidth: Outline width.
+        prj_lats, prj_lons: Projected cell centers (the results' prj_lat/prj_lon); used instead of projecting lats/lons.
+    Returns:
+        ax: The matplotlib Axes.
+    Example:
+        >>> plot_cells(ax, [38.9], [-104.8], grid_size=20)
+    """
+    if prj_lats is not None and prj_lons is not None:
+        prj_lat = pd.Series(np.atleast_1d(np.asarray(prj_lats, dtype=float)))
+        prj_lon = pd.Series(np.atleast_1d(np.asarray(prj_lons, dtype=float)))
+    else:
+        lats = pd.Series(np.atleast_1d(np.asarray(lats, dtype=float)))
+        lons = pd.Series(np.atleast_1d(np.asarray(lons, dtype=float)))
+        prj_lat, prj_lon = project_coordinates(lats, lons, epsg_in=epsg_in, epsg_out=epsg_out)
+    sizes = np.broadcast_to(np.asarray(grid_size, dtype=float), prj_lat.shape)
+    mask = (prj_lat.notnull() & prj_lon.notnull()).to_numpy() & np.isfinite(sizes)
+    if not mask.any():
+        return ax
+    # Results report the exact cell centers (also for shifted grids and hierarchical levels),
+    # so the cells are drawn around them instead of snapping to the base grid
+    polys = _cell_polygons(prj_lat[mask].to_numpy(), prj_lon[mask].to_numpy(), sizes[mask], epsg_in, epsg_out)
+    ax.add_collection(PolyCollection(polys, facecolors='none', edgecolors=color, linewidths=linewidth, label=label))
+    return ax
+
 def plot_home_location(ax: plt.Axes, home_lat: float, home_lon: float, color: str = 'red', marker: str = 'X', label: str = 'Home', **kwargs):
     """
     Overlay the inferred home location (from GHOST) on a matplotlib plot.
@@ -71,7 +176,7 @@ def plot_home_location(ax: plt.Axes, home_lat: float, home_lon: float, color: st
     ax.scatter([home_lon], [home_lat], c=color, marker=marker, s=100, label=label, **kwargs)
     return ax
 
-def plot_full_result(df: pd.DataFrame, home_lat: float, home_lon: float, gt_lat: Optional[float] = None, gt_lon: Optional[float] = None, basemap: bool = False, crs: str = 'epsg:4326', save_path: Optional[str] = None):
+def plot_full_result(df: pd.DataFrame, home_lat: float, home_lon: float, gt_lat: Optional[float] = None, gt_lon: Optional[float] = None, basemap: bool = False, crs: str = 'epsg:4326', save_path: Optional[str] = None, mode: str = 'auto', density_threshold: int = DENSITY_THRESHOLD, grid_size: Optional[float] = None, candidates: Optional[pd.DataFrame] = None, epsg_in: int = 4326, epsg_out: int = 32617, home_prj: Optional[Tuple[float, float]] = None, cell_size: Optional[float] = None):
     """
     Plot GPS points, inferred home (from GHOST), and optionally ground truth on a map.
     Args:
@@ -81,13 +186,28 @@ def plot_full_result(df: pd.DataFrame, home_lat: float, home_lon: float, gt_lat:
         basemap: If True, add OSM basemap (requires contextily and projected CRS).
         crs: CRS of input data ('epsg:4326' or 'epsg:3857').
         save_path: If provided, save the plot to this file.
+        mode: Point rendering mode ('auto', 'scatter' or 'density'), see plot_gps_points.
+        density_threshold: Point count above which 'auto' switches to density rendering.
+        grid_size: Detection grid size in meters; if given, density uses the detection grid and the home cell is outlined.
+        candidates: Optional DataFrame with 'lat' and 'lon' of other candidate cells to outline (requires grid_size).
+        epsg_in, epsg_out: Projection used for detection.
+        home_prj: Projected (prj_lat, prj_lon) center of the home cell, as reported in the results.
+        cell_size: Size of the home and candidate cells when it differs from grid_size (hierarchical results).
     Returns:
         fig, ax: Matplotlib Figure and Axes.
     Example:
         >>> plot_full_result(df, home_lat, home_lon)
     """
     fig, ax = plt.subplots(figsize=(8, 8))
-    plot_gps_points(df, ax=ax, basemap=basemap, crs=crs)
+    plot_gps_points(df, ax=ax, basemap=basemap, crs=crs, mode=mode, density_threshold=density_threshold,
+                    grid_size=grid_size, epsg_in=epsg_in, epsg_out=epsg_out)
+    if grid_size is not None and crs == 'epsg:4326':
+        size = cell_size if cell_size is not None and pd.notna(cell_size) else grid_size
+        if candidates is not None and len(candidates) > 0:
+            plot_cells(ax, candidates['lat'], candidates['lon'], size, epsg_in, epsg_out, color='orange', label='Candidate cells')
+        prj_lat, prj_lon = home_prj if home_prj is not None else (None, None)
+        plot_cells(ax, home_lat, home_lon, size, epsg_in, epsg_out, color='red', label='Home cell',
+                   prj_lats=prj_lat, prj_lons=prj_lon)
     plot_home_location(ax, home_lat, home_lon)
     if gt_lat is not None and gt_lon is not None:
         ax.scatter([gt_lon], [gt_lat], c='green', marker='*', s=120, label='Ground Truth')
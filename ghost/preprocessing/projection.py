@@ -1,11 +1,22 @@
+from functools import lru_cache
 from typing import Tuple
 import pandas as pd
-from pyproj import Transformer
 import numpy as np
+from pyproj import Transformer
+
+
+@lru_cache(maxsize=None)
+def get_transformer(epsg_from: int, epsg_to: int) -> Transformer:
+    """
+    Cached pyproj Transformer, so repeated calls (tight loops, worker processes) build each one once.
+    """
+    return Transformer.from_crs(f"epsg:{epsg_from}", f"epsg:{epsg_to}", always_xy=True)
+
 
 def project_coordinates(lat: pd.Series, lon: pd.Series, epsg_in: int = 4326, epsg_out: int = 32617) -> Tuple[pd.Series, pd.Series]:
     """
-    Project latitude and longitude to projected coordinates (meters) using pyproj.
+    Project latitude and longitude to projected coordinates (meters) using pyproj. The transformer is
+    cached per EPSG pair (get_transformer), so repeated calls do not rebuild it.
 
     Args:
         lat (pd.Series): Series of latitude values (WGS84).
@@ -31,7 +42,7 @@ def project_coordinates(lat: pd.Series, lon: pd.Series, epsg_in: int = 4326, eps
         1         NaN
         dtype: float64
     """
-    transformer = Transformer.from_crs(f"epsg:{epsg_in}", f"epsg:{epsg_out}", always_xy=True)
+    transformer = get_transformer(epsg_in, epsg_out)
     # Handle missing data gracefully
     mask = lat.notnull() & lon.notnull()
     prj_lat = pd.Series(np.nan, index=lat.index, dtype=float)
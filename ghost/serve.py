@@ -0,0 +1,280 @@
+# GHOST.serve: Long-lived worker answering detection requests over JSON Lines
+
+import json
+import os
+import socketserver
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, TextIO
+
+import pandas as pd
+
+from ghost.algorithms.grid import grid_based_batch
+from ghost.preprocessing.projection import get_transformer
+from ghost.batch import DETECT_KEYS
+from ghost.io.gpx import read_data
+
+# JSON types accepted for each detection parameter (booleans are not taken for numbers)
+PARAM_TYPES = {
+    'grid_size': (int, float),
+    'night_start': int,
+    'night_end': int,
+    'epsg_in': int,
+    'epsg_out': int,
+    'top_k': int,
+    'shifted_grids': bool,
+    'stay_time_mode': str,
+    'max_gap': (int, float),
+    'period': (str, list),
+}
+
+
+def warm_up(params: Optional[Dict[str, Any]] = None):
+    """
+    Build and cache the pyproj transformers (both directions) for the default projection, so the
+    first request does not pay for their initialization. Also runs once in every worker process.
+    """
+    params = params or {}
+    epsg_in = params.get('epsg_in', 4326)
+    epsg_out = params.get('epsg_out', 32617)
+    get_transformer(epsg_in, epsg_out)
+    get_transformer(epsg_out, epsg_in)
+
+
+def _check_params(params: Dict[str, Any]):
+    """
+    Reject unknown detection parameters and values of the wrong type or range with a readable message,
+    before they reach the detector (where e.g. grid_size='x' fails deep inside numpy).
+    """
+    unknown = set(params) - set(DETECT_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown detection parameters: {sorted(unknown)}. Expected some of {DETECT_KEYS}.")
+    for key, value in params.items():
+        if value is None and key == 'period':
+            continue
+        expected = PARAM_TYPES[key]
+        if isinstance(value, bool) != (expected is bool) or not isinstance(value, expected):
+            names = ' or '.join(t.__name__ for t in (expected if isinstance(expected, tuple) else (expected,)))
+            raise ValueError(f"Parameter '{key}' must be {names}, got {value!r}.")
+    for key in ('grid_size', 'max_gap'):
+        if key in params and not params[key] > 0:
+            raise ValueError(f"Parameter '{key}' must be positive, got {params[key]!r}.")
+    for key in ('night_start', 'night_end'):
+        if key in params and not 0 <= params[key] <= 23:
+            raise ValueError(f"Parameter '{key}' must be an hour from 0 to 23, got {params[key]!r}.")
+
+
+def handle_request(request: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None,
+                   user_id_col: str = 'user_id') -> Dict[str, Any]:
+    """
+    Answer one detection request.
+    Args:
+        request (dict): {'id': ..., 'user_id': ..., 'points': [...]} with points as a list of
+            {'timestamp', 'lat', 'lon'} records or a dict of columns, or {'id': ..., 'path': ...} with a
+            CSV/GPX file or GPX folder readable by this process. Optional 'params' override the
+            detection parameters (DETECT_KEYS) for this request; they are checked against PARAM_TYPES.
+        defaults (dict, optional): Detection parameters of the server.
+        user_id_col (str): The name of the user identifier column.
+    Returns:
+        dict: {'id': ..., 'results': [one record per user]} or {'id': ..., 'error': message}.
+    Example:
+        >>> handle_request({'id': 1, 'user_id': 'u1', 'points': [
+        ...     {'timestamp': '2024-07-01T23:00:00', 'lat': 38.9, 'lon': -104.8}]})
+    """
+    response = {'id': request.get('id')}
+    try:
+        params = {**(defaults or {}), **(request.get('params') or {})}
+        _check_params(params)
+        if request.get('path'):
+            df = pd.DataFrame(read_data(request['path'], user_id_col=user_id_col).drop(columns='geometry'))
+        elif request.get('points') is not None:
+            df = pd.DataFrame(request['points'])
+            if user_id_col not in df.columns:
+                df[user_id_col] = request.get('user_id', 1)
+        else:
+            raise ValueError("Request needs 'points' or 'path'.")
+        missing = {'timestamp', 'lat', 'lon'} - set(df.columns)
+        if missing:
+            raise ValueError(f"Points are missing columns: {sorted(missing)}.")
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+        df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
+        df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
+        results = grid_based_batch(df, user_id_col=user_id_col, **params)
+        response['results'] = json.loads(results.to_json(orient='records', date_format='iso'))
+    except Exception as e:
+        response['error'] = f"{type(e).__name__}: {e}"
+    return response
+
+
+def _parse(line: str, number: int) -> Dict[str, Any]:
+    """
+    Decode one request line; requests without an 'id' get their line number.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object.")
+    request.setdefault('id', number)
+    return request
+
+
+class DetectionService:
+    """
+    Warm detection worker: transformers are cached up front and requests run in this process
+    (workers=1) or in a pool of warmed worker processes (workers > 1), so concurrent requests run
+    in parallel.
+
+    Example:
+        >>> with DetectionService({'grid_size': 20}, workers=4) as service:
+        ...     service.serve_stream(sys.stdin, sys.stdout)
+    """
+    def __init__(self, params: Optional[Dict[str, Any]] = None, workers: int = 1, user_id_col: str = 'user_id'):
+        """
+        Args:
+            params (dict, optional): Default detection parameters (DETECT_KEYS).
+            workers (int): Worker processes (1 = answer requests in this process).
+            user_id_col (str): The name of the user identifier column.
+        """
+        self.params = dict(params or {})
+        _check_params(self.params)
+        self.user_id_col = user_id_col
+        warm_up(self.params)
+        self.pool = None
+        if workers > 1:
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=warm_up, initargs=(self.params,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def submit(self, request: Dict[str, Any]):
+        """
+        Start a request; returns an object whose result() is the response dict.
+        """
+        if self.pool is None:
+            return _Done(handle_request(request, self.params, self.user_id_col))
+        return self.pool.submit(handle_request, request, self.params, self.user_id_col)
+
+    def respond(self, line: str, number: int):
+        """
+        Submit one JSON Lines request. Returns (request id, future); malformed lines are answered
+        with an error right away.
+        """
+        try:
+            request = _parse(line, number)
+        except ValueError as e:
+            return number, _Done({'id': number, 'error': str(e)})
+        return request['id'], self.submit(request)
+
+    def serve_stream(self, infile: TextIO, outfile: TextIO):
+        """
+        Answer JSON Lines requests from infile until EOF, one JSON response line per request, flushed
+        as soon as it is ready. With a worker pool, requests are read ahead and responses are written
+        as they complete (match them by 'id').
+        """
+        done = threading.Condition()
+        counts = {'submitted': 0, 'written': 0}
+
+        def write(response):
+            with done:
+                outfile.write(json.dumps(response) + '\n')
+                outfile.flush()
+                counts['written'] += 1
+                done.notify_all()
+
+        for number, line in enumerate(infile, start=1):
+            if not line.strip():
+                continue
+            request_id, future = self.respond(line, number)
+            counts['submitted'] += 1
+            if isinstance(future, _Done):
+                write(future.result())
+            else:
+                future.add_done_callback(lambda f, request_id=request_id: write(_result(f, request_id)))
+        with done:
+            done.wait_for(lambda: counts['written'] == counts['submitted'])
+
+    def serve_socket(self, path: str):
+        """
+        Answer JSON Lines requests on a Unix domain socket at path (no network involved). Every
+        connection is handled in its own thread and gets its responses in request order; run
+        several connections to use several workers at once. Blocks until shutdown() on the server.
+        """
+        server = self.socket_server(path)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if os.path.exists(path):
+                os.remove(path)
+
+    def socket_server(self, path: str):
+        """
+        Create (but do not start) the Unix socket server used by serve_socket.
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for number, line in enumerate(self.rfile, start=1):
+                    if not line.strip():
+                        continue
+                    request_id, future = service.respond(line.decode('utf-8'), number)
+                    response = _result(future, request_id)
+                    self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+                    self.wfile.flush()
+
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        server.daemon_threads = True
+        return server
+
+
+def _result(future, request_id) -> Dict[str, Any]:
+    # Response of a finished request; a crashed worker is reported like any other failure
+    try:
+        return future.result()
+    except Exception as e:
+        return {'id': request_id, 'error': f"{type(e).__name__}: {e}"}
+
+
+class _Done:
+    # Already answered request, with the same result() interface as a pool future
+    def __init__(self, response):
+        self.response = response
+
+    def result(self):
+        return self.response
+
+
+def serve(params: Optional[Dict[str, Any]] = None, socket_path: Optional[str] = None, workers: int = 1,
+          user_id_col: str = 'user_id', infile: TextIO = None, outfile: TextIO = None):
+    """
+    Run the detection service on stdin/stdout (default) or on a Unix socket.
+    Args:
+        params (dict, optional): Default detection parameters (DETECT_KEYS).
+        socket_path (str, optional): Serve on this Unix socket instead of stdin/stdout.
+        workers (int): Worker processes.
+        user_id_col (str): The name of the user identifier column.
+        infile, outfile: Streams for stdin/stdout mode (default: sys.stdin, sys.stdout).
+    Example:
+        $ echo '{"user_id": "u1", "points": [{"timestamp": "2024-07-01T23:00:00", "lat": 38.9, "lon": -104.8}]}' \\
+            | python -m ghost.cli serve
+    """
+    with DetectionService(params, workers=workers, user_id_col=user_id_col) as service:
+        if socket_path:
+            service.serve_socket(socket_path)
+        else:
+            service.serve_stream(infile or sys.stdin, outfile or sys.stdout)
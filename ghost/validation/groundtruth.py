@@ -1,8 +1,13 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+import pathlib
+from typing import Dict, Any, List
+from ghost.io.results import read_results
 from ghost.validation.metrics import haversine_distance, compute_accuracy_metrics
 
+# Column identifying the prediction run in long-format prediction tables
+RUN_COLUMN = 'run_id'
+
 def load_groundtruth(filepath: str) -> pd.DataFrame:
     """
     Load ground-truth home locations from a CSV or similar file.
@@ -11,11 +16,12 @@ def load_groundtruth(filepath: str) -> pd.DataFrame:
     # Implementation to be added
     raise NotImplementedError("Ground-truth loading not yet implemented.")
 
-def load_groundtruth_csv(filepath: str) -> pd.DataFrame:
+def load_groundtruth_csv(filepath: str, user_id_col: str = 'user_id') -> pd.DataFrame:
     """
     Load ground-truth home locations from a CSV file.
     Args:
         filepath: Path to CSV file (columns: user_id, lat, lon, ...)
+        user_id_col: User ID column name
     Returns:
         DataFrame with columns ['user_id', 'lat', 'lon', ...]
     Example:
@@ -23,18 +29,19 @@ def load_groundtruth_csv(filepath: str) -> pd.DataFrame:
         >>> print(df.head())
     """
     df = pd.read_csv(filepath)
-    required = {'user_id', 'lat', 'lon'}
+    required = {user_id_col, 'lat', 'lon'}
     if not required.issubset(df.columns):
         raise ValueError(f"CSV must contain columns: {required}")
     return df
 
 
-def compare_predictions_to_groundtruth(pred_df: pd.DataFrame, gt_df: pd.DataFrame) -> pd.DataFrame:
+def compare_predictions_to_groundtruth(pred_df: pd.DataFrame, gt_df: pd.DataFrame, user_id_col: str = 'user_id') -> pd.DataFrame:
     """
     Compare predicted home locations to ground truth and compute error metrics.
     Args:
         pred_df: DataFrame with columns ['user_id', 'lat', 'lon']
         gt_df: DataFrame with columns ['user_id', 'lat', 'lon']
+        user_id_col: User ID column name (in both frames)
     Returns:
         DataFrame with columns ['user_id', 'pred_lat', 'pred_lon', 'gt_lat', 'gt_lon', 'error_m']
     Example:
@@ -43,13 +50,164 @@ def compare_predictions_to_groundtruth(pred_df: pd.DataFrame, gt_df: pd.DataFram
         >>> df = compare_predictions_to_groundtruth(pred, gt)
         >>> print(df)
     """
-    merged = pd.merge(pred_df, gt_df, on='user_id', suffixes=('_pred', '_gt'))
+    merged = pd.merge(pred_df, gt_df, on=user_id_col, suffixes=('_pred', '_gt'))
     merged['error_m'] = haversine_distance(
         merged['lat_pred'], merged['lon_pred'], merged['lat_gt'], merged['lon_gt']
     )
-    return merged[['user_id', 'lat_pred', 'lon_pred', 'lat_gt', 'lon_gt', 'error_m']]
+    return merged[[user_id_col, 'lat_pred', 'lon_pred', 'lat_gt', 'lon_gt', 'error_m']]
+
+def compute_topk_accuracy(pred_df: pd.DataFrame, gt_df: pd.DataFrame, thresholds: List[float] = [50, 100, 200],
+                          user_id_col: str = 'user_id', return_errors: bool = False):
+    """
+    Compute top-k accuracy from saved results: the percent of users whose ground-truth home lies within
+    a threshold of any of their top-r candidate cells, for every r up to the k reported by detection (top_k).
+    Args:
+        pred_df: Results with ['user_id', 'lat', 'lon'] and 'top{r}_lat'/'top{r}_lon' columns for r = 2..k
+        gt_df: DataFrame with columns ['user_id', 'lat', 'lon']
+        thresholds: List of thresholds (meters)
+        user_id_col: User ID column name
+        return_errors: Also return the per-user errors
+    Returns:
+        Dictionary with 'top{r}_percent_within_{t}m' for each rank r and threshold t; with return_errors,
+        (errors, metrics) where errors has one row per user with 'top{r}_error_m', the distance (meters)
+        from the ground truth to the closest of the top-r cells (inf if none was detected)
+    Example:
+        >>> results = pd.read_csv('results.csv')  # detected with top_k=3
+        >>> metrics = compute_topk_accuracy(results, load_groundtruth_csv('groundtruth.csv'))
+    """
+    ranks = sorted(int(c[3:-4]) for c in pred_df.columns if c.startswith('top') and c.endswith('_lat'))
+    merged = pd.merge(pred_df, gt_df[[user_id_col, 'lat', 'lon']].rename(columns={'lat': 'gt_lat', 'lon': 'gt_lon'}), on=user_id_col)
+    gt_lat = merged['gt_lat'].to_numpy(dtype=float)
+    gt_lon = merged['gt_lon'].to_numpy(dtype=float)
+    best_error = haversine_distance(merged['lat'].to_numpy(dtype=float), merged['lon'].to_numpy(dtype=float), gt_lat, gt_lon)
+    # Users without a home (or a missing candidate) never count as a hit
+    best_error = np.where(np.isnan(best_error), np.inf, best_error)
+    metrics = {}
+    errors = merged[[user_id_col]].copy()
+    for r in [1] + ranks:
+        if r > 1:
+            error = haversine_distance(merged[f'top{r}_lat'].to_numpy(dtype=float), merged[f'top{r}_lon'].to_numpy(dtype=float), gt_lat, gt_lon)
+            best_error = np.fmin(best_error, error)
+        errors[f'top{r}_error_m'] = best_error
+        for t in thresholds:
+            metrics[f'top{r}_percent_within_{t}m'] = float(np.mean(best_error <= t)) * 100 if len(merged) else np.nan
+    if return_errors:
+        return errors, metrics
+    return metrics
+
+def with_topk_errors(merged: pd.DataFrame, results: pd.DataFrame, gt_df: pd.DataFrame, user_id_col: str,
+                     thresholds: List[float] = [50, 100, 200]):
+    # Per-user top-k errors next to the top-1 errors, and the top-k accuracy (results with top_k > 1 only)
+    if 'top2_lat' not in results.columns:
+        return merged, {}
+    topk_errors, topk_metrics = compute_topk_accuracy(results, gt_df, thresholds, user_id_col=user_id_col, return_errors=True)
+    topk_errors = topk_errors.drop(columns='top1_error_m').drop_duplicates(user_id_col)
+    return merged.merge(topk_errors, on=user_id_col, how='left'), topk_metrics
+
+def prediction_runs(predictions, user_id_col: str = 'user_id', run_col: str = RUN_COLUMN) -> pd.DataFrame:
+    """
+    Collect predictions of several runs into one long table with a run ID column.
+    Args:
+        predictions: A long-format DataFrame (or results file) that already has run_col, a dict
+            {run_id: DataFrame or results path}, or a list of results paths (run ID = file name without
+            suffix, or the full path if names repeat).
+        user_id_col: User ID column name
+        run_col: Run ID column name
+    Returns:
+        DataFrame with columns [run_col, user_id_col, 'lat', 'lon'], runs in the given order
+    Example:
+        >>> runs = prediction_runs(['results_g10.csv', 'results_g20.parquet'])
+    """
+    if isinstance(predictions, (str, pathlib.Path)):
+        predictions = read_results(predictions)
+    if isinstance(predictions, pd.DataFrame):
+        if run_col not in predictions.columns:
+            raise ValueError(f"Predictions table has no '{run_col}' column; pass a dict or a list of files per run.")
+        return predictions[[run_col, user_id_col, 'lat', 'lon']].reset_index(drop=True)
+    if not isinstance(predictions, dict):
+        paths = [pathlib.Path(p) for p in predictions]
+        stems = [p.stem for p in paths]
+        unique = len(set(stems)) == len(stems)
+        predictions = {(stem if unique else str(path)): path for stem, path in zip(stems, paths)}
+    if not predictions:
+        raise ValueError("No prediction runs given.")
+    frames = []
+    for pred in predictions.values():
+        pred = pred if isinstance(pred, pd.DataFrame) else read_results(pred)
+        frames.append(pred[[user_id_col, 'lat', 'lon']])
+    runs = pd.concat(frames, ignore_index=True)
+    # Categorical run IDs: one code per row instead of a repeated label
+    codes = np.repeat(np.arange(len(frames)), [len(f) for f in frames])
+    runs.insert(0, run_col, pd.Categorical.from_codes(codes, categories=pd.Index(list(predictions), dtype=object)))
+    return runs
+
+def validate_runs(predictions, groundtruth, user_id_col: str = 'user_id', run_col: str = RUN_COLUMN,
+                  thresholds: List[float] = [50, 100, 200]):
+    """
+    Validate many prediction runs (e.g. parameter variants) against one ground truth in a single pass.
 
-def batch_validation_report(results, groundtruth_csv, user_id_col='user_id'):
+    The ground truth is indexed once; every prediction row is matched to its ground-truth home by
+    position and all errors are computed in one vectorized haversine call. Users without a ground-truth
+    home are ignored; users without a predicted home (NaN location) count as misses for every threshold
+    and are left out of the mean and median error.
+    Args:
+        predictions: Anything prediction_runs accepts (long table, dict of runs, list of results files)
+        groundtruth: Ground truth DataFrame or CSV path with columns [user_id_col, 'lat', 'lon']
+        user_id_col: User ID column name (in predictions and ground truth)
+        run_col: Run ID column name
+        thresholds: List of thresholds (meters)
+    Returns:
+        errors (pd.DataFrame): Per-(run, user) errors [run_col, user_id_col, 'lat_pred', 'lon_pred',
+            'lat_gt', 'lon_gt', 'error_m'].
+        metrics (pd.DataFrame): One row per run: [run_col, 'num_users', 'num_predicted', 'mean_error',
+            'median_error', 'percent_within_{t}m' for each threshold].
+    Example:
+        >>> errors, metrics = validate_runs(['results_g10.csv', 'results_g20.csv'], 'groundtruth.csv')
+        >>> errors.to_csv('validation_errors.csv', index=False)
+    """
+    runs = prediction_runs(predictions, user_id_col, run_col)
+    gt_df = groundtruth if isinstance(groundtruth, pd.DataFrame) else load_groundtruth_csv(groundtruth, user_id_col)
+    pred_ids = runs[user_id_col]
+    gt_ids = gt_df[user_id_col]
+    if pred_ids.dtype != gt_ids.dtype:
+        # IDs read from different sources may differ in type; compare them as strings like a CSV round trip would
+        pred_ids = pred_ids.astype(str)
+        gt_ids = gt_ids.astype(str)
+    gt_index = pd.Index(gt_ids)
+    if not gt_index.is_unique:
+        raise ValueError("Ground truth has duplicate user IDs.")
+    position = gt_index.get_indexer(pred_ids)
+    matched = position >= 0
+    position = position[matched]
+    errors = runs[matched].rename(columns={'lat': 'lat_pred', 'lon': 'lon_pred'}).reset_index(drop=True)
+    errors['lat_pred'] = errors['lat_pred'].astype(float)
+    errors['lon_pred'] = errors['lon_pred'].astype(float)
+    errors['lat_gt'] = gt_df['lat'].to_numpy(dtype=float)[position]
+    errors['lon_gt'] = gt_df['lon'].to_numpy(dtype=float)[position]
+    errors['error_m'] = haversine_distance(errors['lat_pred'].to_numpy(), errors['lon_pred'].to_numpy(),
+                                           errors['lat_gt'].to_numpy(), errors['lon_gt'].to_numpy())
+    return errors, _run_metrics(errors, pd.unique(runs[run_col]), run_col, thresholds)
+
+def _run_metrics(errors: pd.DataFrame, run_ids, run_col: str, thresholds: List[float]) -> pd.DataFrame:
+    # Run x threshold matrix: hits of every row against every threshold at once, then one groupby over runs
+    error = errors['error_m'].to_numpy()
+    hits = pd.DataFrame(error[:, None] <= np.asarray(thresholds, dtype=float)[None, :],
+                        columns=[f'percent_within_{t}m' for t in thresholds])
+    codes, found = pd.factorize(errors[run_col])
+    grouped = errors['error_m'].groupby(codes)
+    metrics = pd.DataFrame({
+        'num_users': grouped.size(),
+        'num_predicted': grouped.count(),
+        'mean_error': grouped.mean(),
+        'median_error': grouped.median(),
+    }).join(hits.groupby(codes).mean() * 100)
+    metrics.index = pd.Index(found, dtype=object)[metrics.index]
+    # Runs without any ground-truth user still get a row
+    metrics = metrics.reindex(pd.Index(run_ids, name=run_col, dtype=object))
+    metrics[['num_users', 'num_predicted']] = metrics[['num_users', 'num_predicted']].fillna(0).astype(int)
+    return metrics.reset_index()
+
+def batch_validation_report(results, groundtruth_csv, user_id_col='user_id', errors_csv=None):
     """
     Compare batch results to ground truth, print per-user errors and batch summary.
 
@@ -57,23 +215,35 @@ def batch_validation_report(results, groundtruth_csv, user_id_col='user_id'):
         results (pd.DataFrame): Batch results DataFrame (one row per user).
         groundtruth_csv (str): Path to ground truth CSV.
         user_id_col (str): User ID column name.
+        errors_csv (str, optional): Write the per-user errors to this CSV instead of printing them.
     Returns:
-        merged (pd.DataFrame): DataFrame with per-user errors.
-        metrics (dict): Batch summary metrics.
+        merged (pd.DataFrame): DataFrame with per-user errors (and 'top{r}_error_m' for top-k results).
+        metrics (dict): Batch summary metrics (and top-k accuracy for top-k results).
     """
-    gt_df = load_groundtruth_csv(groundtruth_csv)
-    merged = compare_predictions_to_groundtruth(results, gt_df)
-    if user_id_col in merged.columns and merged[user_id_col].nunique() > 1:
+    gt_df = load_groundtruth_csv(groundtruth_csv, user_id_col)
+    merged = compare_predictions_to_groundtruth(results, gt_df, user_id_col)
+    merged, topk_metrics = with_topk_errors(merged, results, gt_df, user_id_col)
+    if merged[user_id_col].nunique() > 1:
         print(f"Batch validation: {merged[user_id_col].nunique()} users compared.")
-        print(f"User IDs: {list(merged[user_id_col])}")
-        print("Per-user errors (meters):")
-        for _, row in merged.iterrows():
-            print(f"  {row[user_id_col]}: {row['error_m']:.2f} m")
+        if errors_csv:
+            merged.to_csv(errors_csv, index=False)
+            print(f"Saved per-user errors to {errors_csv}")
+        else:
+            print(f"User IDs: {list(merged[user_id_col])}")
+            print("Per-user errors (meters):")
+            print(format_user_errors(merged, user_id_col))
         print("Summary accuracy metrics for batch:")
     else:
         print("Validation results for single user:")
-    from .metrics import compute_accuracy_metrics
     errors = merged['error_m'].values
     metrics = compute_accuracy_metrics(errors)
+    metrics.update(topk_metrics)
     print(metrics)
-    return merged, metrics 
\ No newline at end of file
+    return merged, metrics
+
+def format_user_errors(merged: pd.DataFrame, user_id_col: str = 'user_id') -> str:
+    """
+    Per-user error lines ("  <user>: <error> m") for console output, formatted column-wise.
+    """
+    lines = '  ' + merged[user_id_col].astype(str) + ': ' + merged['error_m'].map('{:.2f}'.format) + ' m'
+    return '\n'.join(lines)
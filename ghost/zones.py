@@ -0,0 +1,154 @@
+# GHOST.zones: Assigning detected homes to administrative zones (census tracts, districts, ...)
+
+import os
+from functools import lru_cache
+from typing import Optional, Union
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+# Zone column added to the results when the boundary file has no ID column configured
+ZONE_COLUMN = 'zone_id'
+# Distinct home cells looked up per spatial-index query; bounds the memory of the candidate pairs
+QUERY_CHUNK = 1_000_000
+
+
+class ZoneIndex:
+    """
+    Zone polygons with a spatial index (shapely STRtree), for assigning many points to zones at once.
+
+    Example:
+        >>> zones = ZoneIndex(gpd.read_file('tracts.shp'), id_col='GEOID')
+        >>> zones.zone_ids(results['lat'], results['lon'])
+    """
+    def __init__(self, zones: gpd.GeoDataFrame, id_col: Optional[str] = None, epsg: int = 4326):
+        """
+        Args:
+            zones (gpd.GeoDataFrame): Zone polygons. Reprojected to epsg if they carry another CRS
+                (a boundary file without CRS is taken to be in epsg already).
+            id_col (str, optional): Column with the zone IDs (default: the row position in the file).
+            epsg (int): EPSG code of the points to assign (the results' lat/lon, i.e. epsg_in).
+        """
+        if id_col is not None and id_col not in zones.columns:
+            raise ValueError(f"Zone ID column '{id_col}' not found; available: {list(zones.columns)}.")
+        if zones.crs is not None and zones.crs.to_epsg() != epsg:
+            zones = zones.to_crs(epsg=epsg)
+        self.id_col = id_col
+        self.ids = pd.Index(zones[id_col]) if id_col is not None else pd.RangeIndex(len(zones))
+        self.geometries = np.asarray(zones.geometry.values, dtype=object)
+        self.tree = shapely.STRtree(self.geometries)
+        # Prepared polygons make the exact point-in-polygon tests after the bounding-box query cheap
+        shapely.prepare(self.geometries)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, lat, lon) -> np.ndarray:
+        """
+        Position of the zone containing each point (-1 outside all zones or for a missing location).
+        Points on a shared boundary, or in overlapping zones, get the first matching zone in file order.
+        Args:
+            lat, lon: Arrays of point coordinates (degrees in the index's EPSG).
+        Returns:
+            np.ndarray: int64 zone positions.
+        """
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        positions = np.full(len(lat), -1, dtype=np.int64)
+        valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        if len(valid) == 0 or len(self) == 0:
+            return positions
+        # Homes are cell centers and many users share a cell; query each distinct center once
+        # (the pairs are hashed as complex numbers, much faster than a row-wise unique)
+        inverse, centers = pd.factorize(lon[valid] + 1j * lat[valid])
+        found = np.full(len(centers), -1, dtype=np.int64)
+        for start in range(0, len(centers), QUERY_CHUNK):
+            chunk = centers[start:start + QUERY_CHUNK]
+            # Bounding-box candidates from the index, then one vectorized exact test on the raw coordinates
+            point_idx, zone_idx = self.tree.query(shapely.points(chunk.real, chunk.imag))
+            hit = shapely.intersects_xy(self.geometries[zone_idx], chunk.real[point_idx], chunk.imag[point_idx])
+            point_idx, zone_idx = point_idx[hit], zone_idx[hit]
+            order = np.lexsort((zone_idx, point_idx))
+            point_idx, zone_idx = point_idx[order], zone_idx[order]
+            first = np.r_[True, point_idx[1:] != point_idx[:-1]] if len(point_idx) else np.zeros(0, dtype=bool)
+            found[start + point_idx[first]] = zone_idx[first]
+        positions[valid] = found[inverse]
+        return positions
+
+    def zone_ids(self, lat, lon) -> pd.Series:
+        """
+        Zone ID of each point (missing outside all zones).
+        Args:
+            lat, lon: Arrays of point coordinates (degrees in the index's EPSG).
+        Returns:
+            pd.Series: Zone IDs, in point order. Integer IDs come back as Int64 and text IDs as string,
+            so points outside all zones are <NA> without turning the other IDs into floats.
+        """
+        positions = self.lookup(lat, lon)
+        ids = self.ids.take(positions.clip(min=0)) if len(self) else pd.Index([None] * len(positions))
+        return pd.Series(ids, dtype=_nullable_dtype(ids.dtype)).where(positions >= 0)
+
+
+def _nullable_dtype(dtype):
+    # Dtype that can hold missing IDs without changing the others (NaN would make int64 IDs float64)
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'Int64'
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        return 'string'
+    return dtype
+
+
+@lru_cache(maxsize=8)
+def _cached_zones(path: str, id_col: Optional[str], layer: Optional[str], epsg: int, size: int,
+                  mtime_ns: int) -> ZoneIndex:
+    # size and mtime_ns are part of the key, so an edited boundary file is read again
+    return ZoneIndex(gpd.read_file(path, layer=layer), id_col=id_col, epsg=epsg)
+
+
+def load_zones(path, id_col: Optional[str] = None, layer: Optional[str] = None, epsg: int = 4326) -> ZoneIndex:
+    """
+    Read a boundary file (Shapefile, GeoPackage, GeoJSON, ...) and build its spatial index. Indexes are
+    cached per process by path, options, file size and modification time, so repeated runs (parameter
+    sweeps, the serve command) read and index the file once.
+    Args:
+        path: Boundary file readable by geopandas.
+        id_col (str, optional): Column with the zone IDs (default: the row position in the file).
+        layer (str, optional): Layer of a multi-layer file (e.g. GeoPackage).
+        epsg (int): EPSG code of the points to assign (the results' lat/lon).
+    Returns:
+        ZoneIndex: The indexed zones.
+    Example:
+        >>> zones = load_zones('tracts.gpkg', id_col='GEOID')
+    """
+    path = os.path.abspath(str(path))
+    st = os.stat(path)
+    return _cached_zones(path, id_col, layer, int(epsg), st.st_size, st.st_mtime_ns)
+
+
+def assign_zones(results: pd.DataFrame, zones: Union[ZoneIndex, str], id_col: Optional[str] = None,
+                 zone_col: Optional[str] = None, lat_col: str = 'lat', lon_col: str = 'lon',
+                 epsg: int = 4326) -> pd.DataFrame:
+    """
+    Assign every detected home to the zone containing its cell center, in one bulk spatial-index query.
+    Args:
+        results (pd.DataFrame): Detection results with home coordinates.
+        zones: ZoneIndex, or the path of a boundary file (loaded with load_zones).
+        id_col (str, optional): Zone ID column of the boundary file (when zones is a path).
+        zone_col (str, optional): Name of the added column (default: the zone ID column, else 'zone_id').
+        lat_col, lon_col (str): Home coordinate columns (e.g. 'work_lat'/'work_lon' for anchor results).
+        epsg (int): EPSG code of the home coordinates.
+    Returns:
+        pd.DataFrame: Results with the zone column (missing for users without a home or outside all zones).
+    Example:
+        >>> from ghost.zones import assign_zones
+        >>> results = assign_zones(results, 'tracts.shp', id_col='GEOID')
+    """
+    if not isinstance(zones, ZoneIndex):
+        zones = load_zones(zones, id_col=id_col, epsg=epsg)
+    zone_col = zone_col or zones.id_col or ZONE_COLUMN
+    ids = zones.zone_ids(results[lat_col].to_numpy(dtype=float), results[lon_col].to_numpy(dtype=float))
+    return results.assign(**{zone_col: ids.array})
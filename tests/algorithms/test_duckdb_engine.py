@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ghost.algorithms.grid import grid_based_batch
+from ghost.preprocessing.projection import project_coordinates
+
+duckdb = pytest.importorskip('duckdb')
+
+
+def _projected_points():
+    rng = np.random.default_rng(0)
+    n = 3000
+    df = pd.DataFrame({
+        'user_id': rng.choice(['A', 'B', 'C'], n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 14 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    })
+    # Pre-projected input, so the spatial extension is not needed
+    df['prj_lat'], df['prj_lon'] = project_coordinates(df['lat'], df['lon'])
+    return df
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'top_k': 3}, {'stay_time_mode': 'dwell'}])
+def test_duckdb_engine_matches_pandas(kwargs):
+    df = _projected_points()
+    expected = grid_based_batch(df, **kwargs)
+    results = grid_based_batch(df, engine='duckdb', **kwargs)
+    assert list(results.columns) == list(expected.columns)
+    assert list(results['user_id']) == list(expected['user_id'])
+    assert list(results['inferred_from']) == list(expected['inferred_from'])
+    for col in ['lat', 'lon', 'stay_time', 'num_nights', 'num_points']:
+        assert np.allclose(results[col].astype(float), expected[col].astype(float))
+
+
+def test_duckdb_engine_reads_csv(tmp_path):
+    df = _projected_points()
+    path = tmp_path / 'points.csv'
+    df.to_csv(path, index=False)
+    results = grid_based_batch(str(path), engine='duckdb')
+    expected = grid_based_batch(df)
+    assert np.allclose(results['stay_time'], expected['stay_time'])
+
+
+def test_home_detector_duckdb_memory_budget(tmp_path):
+    from ghost.detector import HomeDetector
+    df = _projected_points()
+    path = tmp_path / 'points.parquet'
+    df.to_parquet(path, index=False)
+    detector = HomeDetector(input_file=str(path), engine='duckdb', max_memory='256MB', spill_dir=str(tmp_path / 'spill'))
+    detector.load_data().preprocess_data()
+    assert detector.raw_data is None
+    results = detector.detect_homes().get_results()
+    expected = grid_based_batch(df)
+    assert np.allclose(results['stay_time'], expected['stay_time'])
+
+
+def test_duckdb_engine_projects_without_spatial_extension(tmp_path):
+    df = _projected_points().drop(columns=['prj_lat', 'prj_lon'])
+    # DataFrames are projected in Python before they reach DuckDB
+    results = grid_based_batch(df, engine='duckdb')
+    assert np.allclose(results['stay_time'], grid_based_batch(df)['stay_time'])
+    try:
+        duckdb.connect().execute('LOAD spatial')
+        pytest.skip('the spatial extension is installed')
+    except duckdb.Error:
+        pass
+    path = tmp_path / 'points.csv'
+    df.to_csv(path, index=False)
+    with pytest.raises(ImportError, match='prj_lat'):
+        grid_based_batch(str(path), engine='duckdb')
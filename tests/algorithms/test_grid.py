@@ -87,4 +87,275 @@ def test_grid_based_batch():
         assert not pd.isnull(row['lat'])
         assert not pd.isnull(row['lon'])
         assert row['num_nights'] >= 1
-        assert row['num_points'] >= 1 
\ No newline at end of file
+        assert row['num_points'] >= 1
+
+
+def test_grid_home_detector_top_k():
+    # Two nights in cell A (2h each) and shorter stays in cell B
+    df = pd.DataFrame({
+        'lat': [38.9, 38.9, 38.91, 38.91],
+        'lon': [-104.8, -104.8, -104.8, -104.8],
+        'timestamp': pd.to_datetime([
+            '2024-07-01T23:00:00', '2024-07-02T01:00:00',
+            '2024-07-02T23:00:00', '2024-07-03T00:00:00'
+        ])
+    })
+    detector = GridHomeDetector(grid_size=20, top_k=3)
+    home_lat, home_lon, stats = detector.fit(df)
+    assert stats['stay_time'] == 7200.0
+    assert stats['top2_stay_time'] == 3600.0
+    assert np.isclose(stats['confidence'], 0.5)
+    assert np.isnan(stats['top3_lat'])
+    assert abs(stats['top2_lat'] - 38.91) < 0.001
+
+
+def test_grid_based_batch_top_k_matches_single():
+    df = pd.DataFrame({
+        'lat': [38.9, 38.9, 38.91, 38.91, 39.0, 39.0],
+        'lon': [-104.8, -104.8, -104.8, -104.8, -105.0, -105.0],
+        'timestamp': pd.to_datetime([
+            '2024-07-01T23:00:00', '2024-07-02T01:00:00', '2024-07-02T23:00:00', '2024-07-03T00:00:00',
+            '2024-07-06T10:00:00', '2024-07-06T12:00:00'
+        ]),
+        'user_id': ['A', 'A', 'A', 'A', 'B', 'B']
+    })
+    results = grid_based_batch(df, top_k=2).set_index('user_id')
+    lat, lon, stats = GridHomeDetector(top_k=2).fit(df[df['user_id'] == 'A'])
+    assert np.isclose(results.loc['A', 'lat'], lat)
+    assert np.isclose(results.loc['A', 'top2_lat'], stats['top2_lat'])
+    assert np.isclose(results.loc['A', 'confidence'], stats['confidence'])
+    assert results.loc['B', 'inferred_from'] == 'weekend'
+    assert results.loc['B', 'confidence'] == 1.0
+
+
+def test_grid_home_detector_shifted_grids_boundary_home():
+    from pyproj import Transformer
+    # Home straddles the boundary x = 10 m of two 20 m cells; a second place sits inside one cell
+    home_x = [9.0, 11.0, 9.0, 11.0, 9.0, 11.0]
+    home_t = ['2024-07-01T22:00:00', '2024-07-01T23:00:00', '2024-07-02T00:00:00',
+              '2024-07-02T01:00:00', '2024-07-02T02:00:00', '2024-07-02T03:00:00']
+    other_x = [500.0, 500.0]
+    other_t = ['2024-07-02T22:00:00', '2024-07-03T02:30:00']
+    to_wgs = Transformer.from_crs("epsg:32617", "epsg:4326", always_xy=True)
+    x = np.array(home_x + other_x) + 500000
+    y = np.full(len(x), 4300000.0)
+    lon, lat = to_wgs.transform(x, y)
+    df = pd.DataFrame({'lat': lat, 'lon': lon, 'timestamp': pd.to_datetime(home_t + other_t)})
+    _, _, plain = GridHomeDetector(grid_size=20).fit(df)
+    _, _, shifted = GridHomeDetector(grid_size=20, shifted_grids=True).fit(df)
+    assert plain['prj_lon'] == 500500.0
+    assert abs(shifted['prj_lon'] - 500010.0) < 1e-6
+    assert shifted['stay_time'] == 5 * 3600.0
+    assert shifted['grid_shift'] in (2, 3)
+    batch = grid_based_batch(df.assign(user_id='A'), grid_size=20, shifted_grids=True)
+    assert np.isclose(batch.loc[0, 'prj_lon'], shifted['prj_lon'])
+
+
+def test_grid_home_detector_dwell_stay_time():
+    # Cell A: one visit in January and one in June; cell B: a continuous 3-hour night
+    df = pd.DataFrame({
+        'lat': [38.9, 38.9, 38.91, 38.91, 38.91, 38.91],
+        'lon': [-104.8, -104.8, -104.8, -104.8, -104.8, -104.8],
+        'timestamp': pd.to_datetime([
+            '2024-01-10T23:00:00', '2024-06-10T23:00:00',
+            '2024-03-01T23:00:00', '2024-03-02T00:00:00', '2024-03-02T01:00:00', '2024-03-02T02:00:00'
+        ])
+    })
+    _, _, span = GridHomeDetector(grid_size=20).fit(df)
+    _, _, dwell = GridHomeDetector(grid_size=20, stay_time_mode='dwell', max_gap=3600).fit(df)
+    assert span['num_points'] == 2
+    assert dwell['num_points'] == 4
+    assert dwell['stay_time'] == 3 * 3600.0
+
+
+def test_grid_based_batch_dwell_matches_single():
+    df = pd.DataFrame({
+        'lat': [38.9, 38.91, 38.9, 38.9, 39.0, 39.0, 39.0],
+        'lon': [-104.8, -104.8, -104.8, -104.8, -105.0, -105.0, -105.0],
+        'timestamp': pd.to_datetime([
+            '2024-07-01T23:00:00', '2024-07-01T23:30:00', '2024-07-02T00:00:00', '2024-07-02T03:00:00',
+            '2024-07-01T23:00:00', '2024-07-01T23:10:00', '2024-07-01T23:20:00'
+        ]),
+        'user_id': ['A', 'A', 'A', 'A', 'B', 'B', 'B']
+    })
+    results = grid_based_batch(df, stay_time_mode='dwell', max_gap=1800).set_index('user_id')
+    # A: 23:00 -> 23:30 leaves the cell; 00:00 -> 03:00 is capped at 1800 s
+    assert results.loc['A', 'stay_time'] == 1800.0
+    assert results.loc['B', 'stay_time'] == 1200.0
+    for uid in ['A', 'B']:
+        _, _, stats = GridHomeDetector(stay_time_mode='dwell', max_gap=1800).fit(df[df['user_id'] == uid])
+        assert stats['stay_time'] == results.loc[uid, 'stay_time']
+
+
+def test_fit_arrays_matches_fit_batch():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        'user_id': rng.choice(['A', 'B', 'C', 'D'], n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 14 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    })
+    codes, user_ids = pd.factorize(df['user_id'], sort=True)
+    for kwargs in [{}, {'top_k': 3}, {'shifted_grids': True}, {'stay_time_mode': 'dwell'},
+                   {'top_k': 3, 'shifted_grids': True, 'stay_time_mode': 'dwell'}]:
+        detector = GridHomeDetector(**kwargs)
+        expected = detector.fit_batch(df)
+        homes = detector.fit_arrays(df['timestamp'].to_numpy(), df['lon'].to_numpy(), df['lat'].to_numpy(), codes)
+        assert list(user_ids[homes['user']]) == list(expected['user_id'])
+        assert list(homes['inferred_from']) == list(expected['inferred_from'])
+        for field in ['lat', 'lon', 'stay_time', 'num_nights', 'num_points', 'prj_lat', 'prj_lon']:
+            assert np.allclose(homes[field], expected[field].astype(float))
+        if 'top_k' in kwargs:
+            assert np.allclose(homes['confidence'], expected['confidence'])
+            assert np.allclose(homes['top3_stay_time'], expected['top3_stay_time'], equal_nan=True)
+
+
+def test_fit_arrays_projected_int64_timestamps():
+    ts = pd.to_datetime(['2024-07-01T23:00:00', '2024-07-02T01:00:00', '2024-07-06T10:00:00'])
+    x = np.array([500001.0, 500004.0, 900000.0])
+    y = np.array([4300001.0, 4300003.0, 4300000.0])
+    users = np.array([0, 0, 1])
+    homes = GridHomeDetector(grid_size=20).fit_arrays(ts.as_unit('ns').asi8, x, y, users, projected=True)
+    assert homes['prj_lon'][0] == 500000.0
+    assert homes['stay_time'][0] == 7200.0
+    assert homes['inferred_from'].tolist() == ['night', 'weekend']
+
+
+def test_fit_arrays_missing_user_codes():
+    ts = pd.to_datetime(['2024-07-01T23:00:00', '2024-07-06T10:00:00']).as_unit('ns').asi8
+    x = np.array([500001.0, 500004.0])
+    y = np.array([4300001.0, 4300003.0])
+    detector = GridHomeDetector(grid_size=20)
+    # Only missing users (factorize code -1): an empty result instead of an IndexError
+    assert len(detector.fit_arrays(ts, x, y, np.array([-1, -1]), projected=True)) == 0
+    homes = detector.fit_arrays(ts, x, y, np.array([-1, 0]), projected=True)
+    assert homes['inferred_from'].tolist() == ['weekend']
+
+
+def test_grid_based_batch_unknown_engine():
+    import pytest
+    df = pd.DataFrame({'lat': [38.9], 'lon': [-104.8], 'timestamp': pd.to_datetime(['2024-07-01T23:00:00']), 'user_id': ['A']})
+    with pytest.raises(ValueError):
+        grid_based_batch(df, engine='spark')
+    with pytest.raises(ValueError):
+        grid_based_batch(df, memory_limit='1GB')
+
+
+def test_grid_based_batch_period_matches_filtered_runs():
+    rng = np.random.default_rng(1)
+    n = 3000
+    df = pd.DataFrame({
+        'user_id': rng.choice(['A', 'B'], n),
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    })
+    monthly = grid_based_batch(df, period='M')
+    assert list(monthly.columns[:2]) == ['user_id', 'period']
+    assert len(monthly) == 6
+    for _, row in monthly.iterrows():
+        month = df[(df['user_id'] == row['user_id']) & (df['timestamp'].dt.to_period('M') == row['period'])]
+        expected = grid_based_batch(month).iloc[0]
+        assert expected['prj_lat'] == row['prj_lat'] and expected['prj_lon'] == row['prj_lon']
+        assert expected['stay_time'] == row['stay_time'] and expected['num_points'] == row['num_points']
+    binned = grid_based_batch(df, period=['2024-01-01', '2024-02-15', '2024-03-01'])
+    assert len(binned) == 4
+    assert binned['period'].iloc[0] == pd.Interval(pd.Timestamp('2024-01-01'), pd.Timestamp('2024-02-15'), closed='left')
+
+
+def test_fit_anchors_matches_separate_windows():
+    from ghost.algorithms.grid import anchor_windows
+    rng = np.random.default_rng(2)
+    n = 5000
+    df = pd.DataFrame({
+        'user_id': rng.choice(['A', 'B'], n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 30 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    })
+    windows = {**anchor_windows(), 'evening': (18, 21)}
+    anchors = GridHomeDetector().fit_anchors(df, windows=windows)
+    homes = GridHomeDetector().fit_batch(df)
+    assert np.allclose(anchors['home_prj_lat'], homes['prj_lat'])
+    assert np.allclose(anchors['home_stay_time'], homes['stay_time'])
+    hour = df['timestamp'].dt.hour
+    work = df[(df['timestamp'].dt.dayofweek < 5) & (hour >= 9) & (hour < 17)]
+    expected = GridHomeDetector(night_start=9, night_end=17).fit_batch(work)
+    assert np.allclose(anchors['work_prj_lon'], expected['prj_lon'])
+    assert (anchors['work_num_points'].to_numpy() == expected['num_points'].to_numpy()).all()
+    assert {'evening_lat', 'weekend_lat'} <= set(anchors.columns)
+
+
+def test_grid_based_batch_exports_cell_table(tmp_path):
+    from ghost.io.results import read_results
+    rng = np.random.default_rng(3)
+    n = 2000
+    df = pd.DataFrame({
+        'user_id': rng.choice(['A', 'B', 'C'], n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 20 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    })
+    detector = GridHomeDetector(grid_size=20, keep_cells=True)
+    results = detector.fit_batch(df)
+    cells = detector.cell_table
+    assert cells['user_id'].cat.codes.min() == 0
+    assert cells['cell_y'].dtype == np.int32
+    best = cells.sort_values(['stay_time', 'num_nights', 'num_points'], ascending=False, kind='stable')
+    best = best.groupby('user_id', observed=True).head(1).sort_values('user_id')
+    assert np.allclose(best['cell_y'].to_numpy() * 20.0, results['prj_lat'])
+    assert np.allclose(best['stay_time'], results['stay_time'])
+    path = tmp_path / 'cells.csv'
+    grid_based_batch(df, grid_size=20, cells_path=str(path))
+    assert len(read_results(str(path))) == len(cells)
+    # Invalid input gives error rows and an empty cell table instead of failing the export
+    results = grid_based_batch(df.drop(columns='lon'), grid_size=20, cells_path=str(path))
+    assert results['lat'].isna().all()
+    cells_read = read_results(str(path))
+    assert cells_read.empty and 'cell_y' in cells_read.columns
+
+
+def test_top_k_shifted_grids_skips_overlapping_cells():
+    from pyproj import Transformer
+    # One long stay at home and a shorter one 500 m away; shifted copies of the home cell must not be runners-up
+    to_wgs = Transformer.from_crs("epsg:32617", "epsg:4326", always_xy=True)
+    x = np.array([5.0, 6.0, 7.0, 500.0, 500.0]) + 500000
+    lon, lat = to_wgs.transform(x, np.full(len(x), 4300000.0))
+    ts = pd.to_datetime(['2024-07-01T22:00', '2024-07-02T01:00', '2024-07-02T04:00',
+                         '2024-07-02T22:00', '2024-07-02T23:00'])
+    df = pd.DataFrame({'lat': lat, 'lon': lon, 'timestamp': ts, 'user_id': 'A'})
+    detector = GridHomeDetector(grid_size=20, top_k=2, shifted_grids=True)
+    _, _, stats = detector.fit(df)
+    assert stats['top2_stay_time'] == 3600.0
+    assert stats['confidence'] > 0.8
+    batch = grid_based_batch(df, grid_size=20, top_k=2, shifted_grids=True).iloc[0]
+    assert batch['top2_stay_time'] == 3600.0
+    homes = detector.fit_arrays(df['timestamp'].to_numpy(), df['lon'].to_numpy(), df['lat'].to_numpy())
+    assert homes['top2_stay_time'][0] == 3600.0
+    assert np.isclose(homes['top2_lon'][0], batch['top2_lon'])
+
+
+def test_aggregate_cells_matches_groupby():
+    from ghost.algorithms.grid import _aggregate_cells
+    from ghost.preprocessing.staypoints import compress_stay_points
+    rng = np.random.default_rng(3)
+    n = 3000
+    df = pd.DataFrame({
+        'user_id': rng.choice(['A', 'B', 'C'], n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(np.sort(rng.integers(0, 10 * 86400, n)), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.0005, n),
+        'lon': -104.8 + rng.normal(0, 0.0005, n),
+    })
+    keys = ['user_id', 'LAT_Grid', 'LON_Grid']
+    for data in [df, compress_stay_points(df, distance_threshold=30)]:
+        points = GridHomeDetector(grid_size=20)._prepare(data.copy())
+        cells = _aggregate_cells(points, keys)
+        last = 'end_timestamp' if 'end_timestamp' in points.columns else 'timestamp'
+        count = ('point_count', 'sum') if 'point_count' in points.columns else ('timestamp', 'size')
+        expected = points.groupby(keys, sort=True).agg(
+            first=('timestamp', 'min'), last=(last, 'max'), num_nights=('date', 'nunique'), num_points=count).reset_index()
+        assert (cells[keys] == expected[keys]).all().all()
+        assert np.allclose(cells['stay_time'], (expected['last'] - expected['first']).dt.total_seconds())
+        assert (cells['num_nights'] == expected['num_nights']).all()
+        assert (cells['num_points'] == expected['num_points']).all()
@@ -0,0 +1,76 @@
+import pandas as pd
+import numpy as np
+import pytest
+from ghost.algorithms.hierarchy import HierarchicalGrid
+from ghost.algorithms.grid import GridHomeDetector, _aggregate_cells
+from ghost.detector import HomeDetector
+
+def _points():
+    rng = np.random.default_rng(0)
+    n = 400
+    ts = pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 20 * 86400, n), unit='s')
+    return pd.DataFrame({
+        'lat': 38.9 + rng.normal(0, 3e-4, n),
+        'lon': -104.8 + rng.normal(0, 3e-4, n),
+        'timestamp': ts,
+        'user_id': rng.choice(['A', 'B'], n)
+    })
+
+def test_rollup_matches_direct_binning():
+    df = _points()
+    grid = HierarchicalGrid(base_size=5, levels=4).fit(df)
+    assert grid.sizes == [5, 10, 20, 40]
+    for size in grid.sizes:
+        detector = GridHomeDetector(grid_size=size)
+        points = detector._featurize(df)
+        points['LAT_Grid'] = (np.floor(points['prj_lat'] / size) + 0.5) * size
+        points['LON_Grid'] = (np.floor(points['prj_lon'] / size) + 0.5) * size
+        direct = _aggregate_cells(points[detector._night_mask(points['hour'])], ['user_id', 'LAT_Grid', 'LON_Grid'])
+        rolled = grid.cells(size, 'night')
+        merged = direct.merge(rolled, on=['user_id', 'LAT_Grid', 'LON_Grid'], how='outer')
+        assert len(merged) == len(direct) == len(rolled)
+        assert np.allclose(merged['stay_time_x'], merged['stay_time_y'])
+        assert (merged['num_nights_x'] == merged['num_nights_y']).all()
+        assert (merged['num_points_x'] == merged['num_points_y']).all()
+
+def test_detect_adaptive_falls_back_to_coarser_cells():
+    df = _points()
+    grid = HierarchicalGrid(base_size=5, levels=4).fit(df)
+    results = grid.detect_adaptive(min_nights=15)
+    assert set(results['user_id']) == {'A', 'B'}
+    assert (results['grid_size'] > 5).all()
+    assert (results['num_nights'] >= 15).all() or (results['grid_size'] == 40).all()
+    assert len(grid.detect_multiscale()) == 2 * 4
+
+def test_home_detector_hierarchical():
+    df = _points()
+    detector = HomeDetector(algorithm='hierarchical', min_nights=10)
+    detector.raw_data = df
+    detector.preprocess_data().detect_homes()
+    results = detector.get_results()
+    assert 'grid_size' in results.columns
+    assert results['lat'].notnull().all()
+    for option in ({'period': 'M'}, {'shifted_grids': True}, {'num_shards': 4}, {'engine': 'polars'}):
+        detector = HomeDetector(algorithm='hierarchical', **option)
+        detector.raw_data = df
+        with pytest.raises(ValueError, match=list(option)[0]):
+            detector.preprocess_data().detect_homes()
+
+
+def test_dwell_levels_match_direct_binning():
+    df = _points()
+    grid = HierarchicalGrid(base_size=5, levels=3, stay_time_mode='dwell', max_gap=1800).fit(df)
+    for size in grid.sizes:
+        detector = GridHomeDetector(grid_size=size)
+        points = detector._featurize(df)
+        points['LAT_Grid'] = (np.floor(points['prj_lat'] / size) + 0.5) * size
+        points['LON_Grid'] = (np.floor(points['prj_lon'] / size) + 0.5) * size
+        keys = ['user_id', 'LAT_Grid', 'LON_Grid']
+        night = points[detector._night_mask(points['hour'])]
+        direct = _aggregate_cells(night, keys, stay_time_mode='dwell', max_gap=1800)
+        merged = direct.merge(grid.cells(size, 'night'), on=keys, how='outer')
+        assert len(merged) == len(direct)
+        assert np.allclose(merged['stay_time_x'], merged['stay_time_y'])
+        # Dwell differs from the span roll-up
+        span = _aggregate_cells(night, keys)
+        assert not np.allclose(span['stay_time'], direct['stay_time'])
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ghost.algorithms import kernels
+from ghost.algorithms.grid import GridHomeDetector
+
+
+def _random_cells(seed=0, n=3000):
+    rng = np.random.default_rng(seed)
+    stream = rng.integers(0, 20, n)
+    iy = rng.integers(0, 4, n)
+    ix = rng.integers(0, 4, n)
+    ts = rng.integers(0, 10 * kernels.NS_PER_DAY, n)
+    day = ts // kernels.NS_PER_DAY
+    return stream, iy, ix, ts, day
+
+
+def test_loop_kernels_match_numpy():
+    # The loop kernels run as plain Python here (py_func), so their logic is checked without numba
+    stream, iy, ix, ts, day = _random_cells()
+    order = np.lexsort((ts, ix, iy, stream))
+    sorted_arrays = [a[order] for a in (stream, iy, ix, ts, day)]
+    expected = kernels._reduce_sorted_numpy(*sorted_arrays)
+    got = kernels._reduce_sorted_numba.py_func(*sorted_arrays)
+    for e, g in zip(expected, got):
+        assert np.array_equal(e, g)
+    _, _, c_stream, _, _, first, last, num_points, num_nights = kernels.aggregate_sorted(
+        stream, iy, ix, ts, day, backend='numpy')
+    # Coarse stay-times so ties (and the tie-breakers) actually occur
+    stay_time = ((last - first) // kernels.NS_PER_DAY).astype(float)
+    user = c_stream // 2
+    expected = kernels.top_cells(user, stay_time, num_nights, num_points, k=3, backend='numpy')
+    got = kernels._top_cells_numba.py_func(user, stay_time, num_nights, num_points, 3,
+                                           np.zeros(len(user)), np.zeros(len(user)), 0.0)
+    for e, g in zip(expected, got):
+        assert np.array_equal(e, g)
+    # Same selection when overlapping runners-up are skipped
+    c_iy, c_ix = kernels.aggregate_sorted(stream, iy, ix, ts, day, backend='numpy')[3:5]
+    lat, lon = c_iy * 10.0 + (c_stream % 2) * 5.0, c_ix * 10.0
+    expected = kernels.top_cells(user, stay_time, num_nights, num_points, k=3, backend='numpy',
+                                 lat=lat, lon=lon, cell_size=10.0)
+    got = kernels._top_cells_numba.py_func(user, stay_time, num_nights, num_points, 3, lat, lon, 10.0)
+    for e, g in zip(expected, got):
+        assert np.array_equal(e, g)
+
+
+def test_numba_backend_matches_numpy():
+    pytest.importorskip('numba')
+    rng = np.random.default_rng(1)
+    n = 5000
+    df = pd.DataFrame({
+        'user_id': rng.integers(0, 50, n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 21 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    })
+    for kwargs in [{}, {'top_k': 3, 'shifted_grids': True}]:
+        detector = GridHomeDetector(**kwargs)
+        args = (df['timestamp'].to_numpy(), df['lon'].to_numpy(), df['lat'].to_numpy(), df['user_id'].to_numpy())
+        expected = detector.fit_arrays(*args, backend='numpy')
+        got = detector.fit_arrays(*args, backend='numba')
+        for field in expected.dtype.names:
+            if expected.dtype[field] == float:
+                assert np.array_equal(expected[field], got[field], equal_nan=True)
+            else:
+                assert np.array_equal(expected[field], got[field])
+
+
+def test_resolve_backend():
+    assert kernels.resolve_backend('numpy') == 'numpy'
+    assert kernels.resolve_backend() == ('numba' if kernels.numba is not None else 'numpy')
+    with pytest.raises(ValueError):
+        kernels.resolve_backend('cuda')
+
+
+def test_stay_runs_match_sequential_walk():
+    rng = np.random.default_rng(2)
+    for scale in (1.0, 4.0, 20.0):
+        # Jitter around fixed places plus a drifting track, with some forced breaks
+        n = 2000
+        x = rng.normal(0, scale, n) + np.repeat(rng.normal(0, 100, 20), n // 20) + np.linspace(0, 50 * scale, n)
+        y = rng.normal(0, scale, n)
+        breaks = rng.random(n) < 0.01
+        breaks[0] = True
+        expected = np.cumsum(kernels._stay_starts_numba.py_func(breaks, x, y, 100.0)) - 1
+        assert np.array_equal(kernels.stay_runs(breaks, x, y, 10, backend='numpy'), expected)
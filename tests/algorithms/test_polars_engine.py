@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ghost.algorithms.grid import grid_based_batch
+
+pl = pytest.importorskip('polars')
+
+
+def _points():
+    rng = np.random.default_rng(0)
+    n = 3000
+    return pd.DataFrame({
+        'user_id': rng.choice(['A', 'B', 'C'], n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 14 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    })
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'top_k': 3}, {'stay_time_mode': 'dwell'}])
+def test_polars_engine_matches_pandas(kwargs):
+    df = _points()
+    expected = grid_based_batch(df, **kwargs)
+    results = grid_based_batch(df, engine='polars', **kwargs)
+    assert list(results.columns) == list(expected.columns)
+    assert list(results['user_id']) == list(expected['user_id'])
+    assert list(results['inferred_from']) == list(expected['inferred_from'])
+    for col in ['lat', 'lon', 'stay_time', 'num_nights', 'num_points']:
+        assert np.allclose(results[col].astype(float), expected[col].astype(float))
+
+
+def test_polars_engine_reads_files(tmp_path):
+    df = _points()
+    path = tmp_path / 'points.csv'
+    df.to_csv(path, index=False)
+    results = grid_based_batch(str(path), engine='polars')
+    expected = grid_based_batch(df)
+    assert np.allclose(results['stay_time'], expected['stay_time'])
+
+
+def test_home_detector_scans_input_file(tmp_path):
+    from ghost.detector import HomeDetector
+    df = _points()
+    path = tmp_path / 'points.csv'
+    df.to_csv(path, index=False)
+    detector = HomeDetector(input_file=str(path), engine='polars')
+    detector.load_data().preprocess_data()
+    # The lazy scan reads the file; nothing is loaded or preprocessed in pandas
+    assert detector.raw_data is None and detector.preprocessed_data is None
+    results = detector.detect_homes().get_results()
+    expected = grid_based_batch(df)
+    assert list(results['user_id']) == list(expected['user_id'])
+    assert np.allclose(results['stay_time'], expected['stay_time'])
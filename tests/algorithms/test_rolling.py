@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ghost.algorithms.grid import GridHomeDetector, grid_based_batch
+from ghost.algorithms.rolling import rolling_home_timeline
+
+
+def _nights(lat, lon, start, num_nights, user='A'):
+    rows = []
+    for day in pd.date_range(start, periods=num_nights, freq='D'):
+        for hour in (23, 25, 27):
+            rows.append({'user_id': user, 'timestamp': day + pd.Timedelta(hours=hour), 'lat': lat, 'lon': lon})
+    return rows
+
+
+def test_rolling_timeline_tracks_relocation():
+    df = pd.DataFrame(_nights(38.9, -104.8, '2024-03-01', 30) + _nights(38.95, -104.7, '2024-03-31', 30))
+    timeline = rolling_home_timeline(df, window_days=10, step_days=1)
+    assert len(timeline) == 2
+    first, second = timeline.iloc[0], timeline.iloc[1]
+    assert np.isclose(first['lat'], 38.9, atol=1e-3)
+    assert np.isclose(second['lat'], 38.95, atol=1e-3)
+    # The new home takes over once it has more stay-time inside the window than the old one
+    assert pd.Timestamp('2024-03-31') < second['window_end'] < pd.Timestamp('2024-04-15')
+    assert second['inferred_from'] == 'night'
+
+
+def test_rolling_full_window_matches_batch():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        'user_id': rng.choice(['A', 'B', 'C'], n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 20 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    })
+    timeline = rolling_home_timeline(df, window_days=365, step_days=7)
+    last = timeline.groupby('user_id').tail(1).set_index('user_id')
+    expected = grid_based_batch(df).set_index('user_id')
+    # Rows are emitted on changes only, so compare the final home cell
+    assert np.allclose(last['prj_lat'], expected.loc[last.index, 'prj_lat'])
+    assert np.allclose(last['prj_lon'], expected.loc[last.index, 'prj_lon'])
+    with pytest.raises(ValueError):
+        rolling_home_timeline(df, detector=GridHomeDetector(stay_time_mode='dwell'))
+
+
+def test_rolling_window_matches_batch_per_day():
+    rng = np.random.default_rng(1)
+    n = 3000
+    df = pd.DataFrame({
+        # Users active on different days, so each step touches only some of them
+        'user_id': rng.choice(['A', 'B', 'C', 'D'], n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 30 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.002, n),
+        'lon': -104.8 + rng.normal(0, 0.002, n),
+    })
+    df = df[(df['user_id'] != 'D') | (df['timestamp'] < pd.Timestamp('2024-07-10'))]
+    timeline = rolling_home_timeline(df, window_days=5, step_days=1)
+    for end in pd.date_range('2024-07-05', '2024-07-30', freq='5D'):
+        state = timeline[timeline['window_end'] <= end].groupby('user_id').tail(1).set_index('user_id')
+        window = df[(df['timestamp'] >= end - pd.Timedelta(days=4)) & (df['timestamp'] < end + pd.Timedelta(days=1))]
+        expected = grid_based_batch(window).set_index('user_id')
+        for user in state.index:
+            if user in expected.index:
+                assert np.isclose(state.loc[user, 'prj_lat'], expected.loc[user, 'prj_lat'])
+                assert np.isclose(state.loc[user, 'stay_time'], expected.loc[user, 'stay_time'])
+            else:
+                assert np.isnan(state.loc[user, 'prj_lat'])
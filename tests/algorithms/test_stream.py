@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ghost.algorithms.grid import GridHomeDetector, grid_based_batch
+from ghost.algorithms.stream import StreamingGridDetector
+from ghost.detector import HomeDetector
+
+
+def _points(n=3000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'user_id': rng.choice(['A', 'B', 'C', 'D'], n),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 14 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    })
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'top_k': 2}, {'shifted_grids': True}])
+def test_stream_matches_batch(kwargs):
+    df = _points()
+    stream = StreamingGridDetector(GridHomeDetector(**kwargs))
+    for start in range(0, len(df), 500):
+        updated = stream.update(df.iloc[start:start + 500])
+        assert set(updated['user_id']) == set(df.iloc[start:start + 500]['user_id'])
+    results = stream.results()
+    expected = grid_based_batch(df, **kwargs)
+    assert list(results.columns) == list(expected.columns)
+    assert list(results['user_id']) == list(expected['user_id'])
+    for col in ['lat', 'lon', 'stay_time', 'num_nights', 'num_points']:
+        assert np.allclose(results[col], expected[col])
+
+
+def test_stream_bounded_state():
+    df = _points()
+    stream = StreamingGridDetector(GridHomeDetector(), max_cells_per_user=2)
+    for start in range(0, len(df), 500):
+        stream.update(df.iloc[start:start + 500])
+    cells = stream.cells['night'].groupby(level='user_id').size()
+    assert (cells <= 2).all()
+    with pytest.raises(ValueError):
+        StreamingGridDetector(GridHomeDetector(stay_time_mode='dwell'))
+
+
+def test_stream_evict_drops_state():
+    df = _points()
+    stream = StreamingGridDetector(GridHomeDetector())
+    stream.update(df)
+    final = stream.evict(['A'])
+    assert list(final['user_id']) == ['A']
+    expected = grid_based_batch(df)
+    assert np.allclose(final['stay_time'], expected.loc[expected['user_id'] == 'A', 'stay_time'])
+    assert 'A' not in stream.cells['night'].index.get_level_values('user_id')
+    assert 'A' not in stream.dates['night'].get_level_values('user_id')
+    assert list(stream.results()['user_id']) == ['B', 'C', 'D']
+
+
+def test_home_detector_detect_stream():
+    df = _points()
+    detector = HomeDetector(grid_size=20)
+    updates = list(detector.detect_stream(df.iloc[i:i + 1000] for i in range(0, len(df), 1000)))
+    assert len(updates) == 3
+    expected = grid_based_batch(df, grid_size=20)
+    assert np.allclose(detector.get_results()['stay_time'], expected['stay_time'])
@@ -0,0 +1,43 @@
+import pandas as pd
+import numpy as np
+from ghost.algorithms.grid import grid_based_batch
+from ghost.algorithms.sweep import parameter_sweep
+
+def _points():
+    return pd.DataFrame({
+        'lat': [38.9, 38.9, 38.91, 38.91, 39.0, 39.0],
+        'lon': [-104.8, -104.8, -104.8, -104.8, -105.0, -105.0],
+        'timestamp': pd.to_datetime([
+            '2024-07-01T21:00:00', '2024-07-01T22:30:00', '2024-07-02T01:00:00', '2024-07-02T02:00:00',
+            '2024-07-06T10:00:00', '2024-07-06T12:00:00'
+        ]),
+        'user_id': ['A', 'A', 'A', 'A', 'B', 'B']
+    })
+
+def test_parameter_sweep_matches_individual_runs():
+    df = _points()
+    results, metrics = parameter_sweep(df, grid_sizes=[20, 50], night_starts=[21, 22], night_ends=[5, 6])
+    assert metrics is None
+    assert len(results) == 2 * 2 * 2 * 2
+    for (g, ns, ne), sweep_rows in results.groupby(['grid_size', 'night_start', 'night_end']):
+        expected = grid_based_batch(df, grid_size=g, night_start=ns, night_end=ne).set_index('user_id')
+        got = sweep_rows.set_index('user_id')
+        for col in ['prj_lat', 'prj_lon', 'stay_time', 'num_nights', 'num_points', 'inferred_from']:
+            assert list(got[col]) == list(expected[col])
+
+def test_parameter_sweep_metrics():
+    gt = pd.DataFrame({'user_id': ['A', 'B'], 'lat': [38.9, 39.0], 'lon': [-104.8, -105.0]})
+    results, metrics = parameter_sweep(_points(), grid_sizes=[20], night_starts=[21, 23], night_ends=[6], groundtruth=gt)
+    assert list(metrics['night_start']) == [21, 23]
+    assert (metrics['num_users'] == 2).all()
+    # 21:00–06:00 picks the 21:00–22:30 cell next to ground truth; 23:00–06:00 only sees the other cell
+    assert metrics.loc[0, 'percent_within_50m'] == 100.0
+    assert metrics.loc[1, 'percent_within_50m'] == 50.0
+
+def test_parameter_sweep_metrics_custom_user_column():
+    gt = pd.DataFrame({'device': ['A', 'B'], 'lat': [38.9, 39.0], 'lon': [-104.8, -105.0]})
+    points = _points().rename(columns={'user_id': 'device'})
+    _, metrics = parameter_sweep(points, grid_sizes=[20], night_starts=[21], night_ends=[6], user_id_col='device',
+                                 groundtruth=gt)
+    assert metrics.loc[0, 'num_users'] == 2
+    assert metrics.loc[0, 'percent_within_50m'] == 100.0
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+import ghost.batch as batch
+import ghost.detector as detector_module
+from ghost.algorithms.grid import grid_based_batch
+from ghost.detector import HomeDetector
+from ghost.io.results import load_cached_results
+
+
+def _points(num_users=12, n=2000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'user_id': rng.integers(0, num_users, n).astype(str),
+        'timestamp': pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 7 * 86400, n), unit='s'),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    })
+
+
+def test_shard_ids_stable():
+    ids = ['a', 'b', 'c', 'a']
+    shards = batch.shard_ids(ids, 4)
+    assert shards[0] == shards[3]
+    assert np.array_equal(shards, batch.shard_ids(ids, 4))
+    assert ((shards >= 0) & (shards < 4)).all()
+
+
+def test_run_sharded_matches_batch(tmp_path):
+    df = _points()
+    output = tmp_path / 'results.csv'
+    chunks = [df.iloc[:700], df.iloc[700:1500], df.iloc[1500:]]
+    results = batch.run_sharded(chunks, tmp_path / 'work', num_shards=4, output_path=str(output), grid_size=20)
+    expected = grid_based_batch(df, grid_size=20)
+    assert list(results['user_id']) == list(expected['user_id'])
+    assert np.allclose(results['stay_time'], expected['stay_time'])
+    assert len(pd.read_csv(output)) == len(expected)
+
+
+def test_run_sharded_resumes_after_failure(tmp_path, monkeypatch):
+    df = _points()
+    work_dir = tmp_path / 'work'
+    calls = []
+
+    def failing_batch(points, **kwargs):
+        calls.append(len(points))
+        if len(calls) == 3:
+            raise RuntimeError('worker crashed')
+        return grid_based_batch(points, **kwargs)
+
+    monkeypatch.setattr(batch, 'grid_based_batch', failing_batch)
+    with pytest.raises(RuntimeError):
+        batch.run_sharded(df, work_dir, num_shards=4)
+    assert len(calls) == 3
+    # Restart: the two finished shards are skipped, the failed and remaining ones are processed
+    results = batch.run_sharded(df, work_dir, num_shards=4)
+    assert len(calls) == 5
+    assert list(results['user_id']) == list(grid_based_batch(df)['user_id'])
+    with pytest.raises(ValueError):
+        batch.run_sharded(df, work_dir, num_shards=8)
+
+
+def test_run_sharded_fingerprint_clears_stale_shards(tmp_path):
+    df = _points()
+    other = _points(num_users=5)
+    work_dir = tmp_path / 'work'
+    batch.run_sharded(df, work_dir, num_shards=4, fingerprint='a')
+    # Same work_dir, new input: the old shards must not be reused
+    results = batch.run_sharded(other, work_dir, num_shards=4, fingerprint='b', cleanup=True)
+    assert list(results['user_id']) == list(grid_based_batch(other)['user_id'])
+    assert not work_dir.exists()
+
+
+def test_home_detector_streams_shards_to_output(tmp_path, monkeypatch):
+    path = tmp_path / 'points.csv'
+    _points().to_csv(path, index=False)
+    output = tmp_path / 'results.csv'
+    detector = HomeDetector(input_file=str(path), output_file=str(output), num_shards=4)
+    detector.load_data().preprocess_data().detect_homes()
+    # The shards were written to the output with the fingerprint; the shard directory is gone
+    assert len(load_cached_results(output, detector.fingerprint())) == len(detector.get_results())
+    assert not (tmp_path / 'results.csv.shards').exists()
+    monkeypatch.setattr(detector_module, 'save_results', lambda *args, **kwargs: pytest.fail('saved twice'))
+    detector.assign_zones().save_results()
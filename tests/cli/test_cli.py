@@ -26,4 +26,108 @@ def test_cli_detect_runs(tmp_path):
     ], capture_output=True, text=True, cwd=tmp_path)
     assert result.returncode == 0
     assert 'Saved results' in result.stdout
-    assert os.path.exists(tmp_path / 'results.csv') 
\ No newline at end of file
+    assert os.path.exists(tmp_path / 'results.csv') 
+
+def test_cli_plot_reuses_results(tmp_path):
+    config_path = tmp_path / 'config.yaml'
+    gpx_path = tmp_path / 'dummy.gpx'
+    with open(config_path, 'w') as f:
+        f.write('input_gpx: dummy.gpx\noutput_csv: results.csv\noutput_plot: results.png\ninteractive_map: false\n')
+    gpx_content = '''<?xml version='1.0'?><gpx version="1.1" creator="test"><wpt lat="38.9" lon="-104.8"><time>2024-07-01T23:00:00Z</time></wpt></gpx>'''
+    with open(gpx_path, 'w') as f:
+        f.write(gpx_content)
+    subprocess.run([sys.executable, '-m', 'ghost.cli', 'detect', '--config', str(config_path)],
+                   capture_output=True, text=True, cwd=tmp_path)
+    result = subprocess.run([
+        sys.executable, '-m', 'ghost.cli', 'plot', '--config', str(config_path)
+    ], capture_output=True, text=True, cwd=tmp_path)
+    assert result.returncode == 0
+    assert 'Reusing saved results' in result.stdout
+    assert os.path.exists(tmp_path / 'results.png')
+
+def test_cli_run_single_pass(tmp_path):
+    gpx_path = tmp_path / 'dummy.gpx'
+    gpx_content = '''<?xml version='1.0'?><gpx version="1.1" creator="test"><wpt lat="38.9" lon="-104.8"><time>2024-07-01T23:00:00Z</time></wpt></gpx>'''
+    with open(gpx_path, 'w') as f:
+        f.write(gpx_content)
+    with open(tmp_path / 'gt.csv', 'w') as f:
+        f.write('user_id,lat,lon\ndummy,38.9001,-104.8001\n')
+    result = subprocess.run([
+        sys.executable, '-m', 'ghost.cli', 'run', '--input-gpx', 'dummy.gpx', '--output-csv', 'results.csv',
+        '--plot', '--no-interactive-map', '--output-plot', 'results.png', '--groundtruth-csv', 'gt.csv'
+    ], capture_output=True, text=True, cwd=tmp_path)
+    assert result.returncode == 0
+    assert os.path.exists(tmp_path / 'results.csv')
+    assert os.path.exists(tmp_path / 'results.png')
+    assert 'Mean error' in result.stdout
+    assert 'Timings (s):' in result.stdout
+
+def test_cli_sweep(tmp_path):
+    import pandas as pd
+    pd.DataFrame({
+        'user_id': ['A', 'A', 'A'],
+        'lat': [38.9, 38.9, 38.9001],
+        'lon': [-104.8, -104.8, -104.8001],
+        'timestamp': ['2024-07-01T23:30:00', '2024-07-02T01:00:00', '2024-07-02T05:30:00']
+    }).to_csv(tmp_path / 'data.csv', index=False)
+    pd.DataFrame({'user_id': ['A'], 'lat': [38.9], 'lon': [-104.8]}).to_csv(tmp_path / 'gt.csv', index=False)
+    result = subprocess.run([
+        sys.executable, '-m', 'ghost.cli', 'sweep', '--input-gpx', 'data.csv',
+        '--grid-sizes', '10,20', '--night-starts', '22', '--night-ends', '5,6', '--groundtruth-csv', 'gt.csv'
+    ], capture_output=True, text=True, cwd=tmp_path)
+    assert result.returncode == 0
+    metrics = pd.read_csv(tmp_path / 'sweep_metrics.csv')
+    assert len(metrics) == 4
+    assert set(metrics['grid_size']) == {10, 20}
+
+def test_cli_validate_many_runs(tmp_path):
+    import pandas as pd
+    pd.DataFrame({'user_id': ['A', 'B'], 'lat': [38.9, 39.0], 'lon': [-104.8, -104.8]}).to_csv(tmp_path / 'gt.csv', index=False)
+    pd.DataFrame({'user_id': ['A', 'B'], 'lat': [38.9, 39.0], 'lon': [-104.8, -104.8]}).to_csv(tmp_path / 'g10.csv', index=False)
+    pd.DataFrame({'user_id': ['A', 'B'], 'lat': [38.9, 39.1], 'lon': [-104.8, -104.8]}).to_csv(tmp_path / 'g20.csv', index=False)
+    result = subprocess.run([
+        sys.executable, '-m', 'ghost.cli', 'validate', '--output-csv', 'g10.csv,g20.csv', '--groundtruth-csv', 'gt.csv'
+    ], capture_output=True, text=True, cwd=tmp_path)
+    assert result.returncode == 0
+    metrics = pd.read_csv(tmp_path / 'validation_metrics.csv')
+    assert list(metrics['run_id']) == ['g10', 'g20']
+    assert list(metrics['percent_within_50m']) == [100.0, 50.0]
+    errors = pd.read_csv(tmp_path / 'validation_errors.csv')
+    assert len(errors) == 4
+
+def test_cli_validate_single_file(tmp_path):
+    import pandas as pd
+    pd.DataFrame({'user_id': ['A', 'B'], 'lat': [38.9, 39.0], 'lon': [-104.8, -104.8]}).to_csv(tmp_path / 'gt.csv', index=False)
+    pd.DataFrame({'user_id': ['A', 'B'], 'lat': [38.9, 39.1], 'lon': [-104.8, -104.8],
+                  'top2_lat': [38.9, 39.0], 'top2_lon': [-104.8, -104.8]}).to_csv(tmp_path / 'results.csv', index=False)
+    result = subprocess.run([
+        sys.executable, '-m', 'ghost.cli', 'validate', '--output-csv', 'results.csv', '--groundtruth-csv', 'gt.csv',
+        '--thresholds', '50,20000', '--validation-errors-csv', 'errors.csv'
+    ], capture_output=True, text=True, cwd=tmp_path)
+    assert result.returncode == 0
+    assert 'B:' not in result.stdout
+    metrics = pd.read_csv(tmp_path / 'validation_metrics.csv')
+    assert list(metrics['run_id']) == ['results']
+    assert list(metrics['percent_within_50m']) == [50.0]
+    assert list(metrics['percent_within_20000m']) == [100.0]
+    assert list(metrics['top2_percent_within_50m']) == [100.0]
+    errors = pd.read_csv(tmp_path / 'errors.csv')
+    assert list(errors['user_id']) == ['A', 'B']
+    assert 'top2_error_m' in errors.columns
+
+def test_cli_serve_stdin(tmp_path):
+    import json
+    requests = [
+        {'id': 'a', 'user_id': 'u1', 'points': [
+            {'timestamp': '2024-07-01T23:00:00', 'lat': 38.9, 'lon': -104.8},
+            {'timestamp': '2024-07-02T02:00:00', 'lat': 38.9, 'lon': -104.8}]},
+        {'id': 'b', 'points': {'timestamp': ['2024-07-01T12:00:00'], 'lat': [38.9], 'lon': [-104.8]}},
+    ]
+    stdin = '\n'.join(json.dumps(r) for r in requests) + '\nnot json\n'
+    result = subprocess.run([sys.executable, '-m', 'ghost.cli', 'serve', '--grid-size', '20'],
+                            input=stdin, capture_output=True, text=True, cwd=tmp_path)
+    assert result.returncode == 0
+    responses = {r['id']: r for r in map(json.loads, result.stdout.splitlines())}
+    assert responses['a']['results'][0]['stay_time'] == 10800.0
+    assert responses['b']['results'][0]['inferred_from'] is None
+    assert 'error' in responses[3]
@@ -47,4 +47,63 @@ def test_read_data_csv():
         gdf = read_data(f.name)
         assert isinstance(gdf, gpd.GeoDataFrame)
         assert set(gdf['user_id']) == {'u1', 'u2'}
-    os.remove(f.name) 
\ No newline at end of file
+    os.remove(f.name) 
+
+def _gpx_text(lat, n=5):
+    points = ''.join(f'<trkpt lat="{lat}" lon="-104.8"><time>2024-07-0{i + 1}T23:00:00Z</time></trkpt>' for i in range(n))
+    return f'<?xml version="1.0"?><gpx version="1.1" creator="test"><trk><trkseg>{points}</trkseg></trk></gpx>'
+
+
+def _frame(gdf):
+    return pd.DataFrame(gdf.drop(columns='geometry')).sort_values('user_id', kind='stable').reset_index(drop=True)
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_read_data_compressed_and_archives(tmp_path, n_jobs):
+    import gzip
+    import tarfile
+    import zipfile
+    plain = tmp_path / 'plain'
+    packed = tmp_path / 'packed'
+    plain.mkdir()
+    packed.mkdir()
+    for i in range(3):
+        (plain / f'u{i}.gpx').write_text(_gpx_text(38.9 + i))
+        with gzip.open(packed / f'u{i}.gpx.gz', 'wt') as f:
+            f.write(_gpx_text(38.9 + i))
+    with zipfile.ZipFile(tmp_path / 'drop.zip', 'w', zipfile.ZIP_DEFLATED) as archive:
+        for i in range(3):
+            archive.write(plain / f'u{i}.gpx', f'users/u{i}.gpx')
+        archive.writestr('README.txt', 'not points')
+    with tarfile.open(tmp_path / 'drop.tar.gz', 'w:gz') as archive:
+        archive.add(plain, arcname='users')
+    expected = _frame(read_data(plain))
+    assert set(expected['user_id']) == {'u0', 'u1', 'u2'}
+    for path in [packed, tmp_path / 'drop.zip', tmp_path / 'drop.tar.gz']:
+        pd.testing.assert_frame_equal(_frame(read_data(path, n_jobs=n_jobs)), expected)
+    single = read_data(packed / 'u1.gpx.gz')
+    assert list(single['user_id'].unique()) == ['u1']
+    assert len(single) == 5
+
+
+def test_read_data_rejects_duplicate_archive_users(tmp_path):
+    import zipfile
+    with zipfile.ZipFile(tmp_path / 'drop.zip', 'w') as archive:
+        archive.writestr('a/u1.gpx', _gpx_text(38.9))
+        archive.writestr('b/u1.gpx', _gpx_text(39.9))
+    with pytest.raises(ValueError, match="'a/u1.gpx' and 'b/u1.gpx'"):
+        read_data(tmp_path / 'drop.zip')
+
+
+def test_read_data_compressed_csv(tmp_path):
+    df = pd.DataFrame({'user_id': ['u1', 'u2'], 'lat': [1.0, 2.0], 'lon': [3.0, 4.0],
+                       'timestamp': ['2024-07-01', '2024-07-02']})
+    df.to_csv(tmp_path / 'points.csv.gz', index=False)
+    gdf = read_data(tmp_path / 'points.csv.gz')
+    assert list(gdf['user_id']) == ['u1', 'u2']
+
+
+def test_read_gpx_zstd(tmp_path):
+    zstandard = pytest.importorskip('zstandard')
+    (tmp_path / 'u1.gpx.zst').write_bytes(zstandard.ZstdCompressor().compress(_gpx_text(38.9).encode('utf-8')))
+    assert len(read_gpx(str(tmp_path / 'u1.gpx.zst'))) == 5
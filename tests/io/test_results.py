@@ -0,0 +1,61 @@
+import pandas as pd
+from ghost.io.results import compute_fingerprint, save_results, load_cached_results, metadata_path
+
+def _write_csv(path):
+    pd.DataFrame({'lat': [38.9], 'lon': [-104.8], 'timestamp': ['2024-07-01T23:00:00']}).to_csv(path, index=False)
+
+def test_fingerprint_depends_on_params(tmp_path):
+    data_path = tmp_path / 'data.csv'
+    _write_csv(data_path)
+    fp1 = compute_fingerprint(str(data_path), {'grid_size': 20, 'night_start': 22})
+    fp2 = compute_fingerprint(str(data_path), {'grid_size': 20.0, 'night_start': 22})
+    fp3 = compute_fingerprint(str(data_path), {'grid_size': 50, 'night_start': 22})
+    assert fp1 == fp2
+    assert fp1 != fp3
+    assert fp1 != compute_fingerprint(str(data_path), {'grid_size': 20, 'night_start': 22, 'max_cells_per_user': 5})
+
+def test_save_and_load_cached_results(tmp_path):
+    data_path = tmp_path / 'data.csv'
+    _write_csv(data_path)
+    results = pd.DataFrame({'user_id': ['A'], 'lat': [38.9], 'lon': [-104.8]})
+    out = tmp_path / 'results.csv'
+    fp = compute_fingerprint(str(data_path), {'grid_size': 20})
+    save_results(results, str(out), fingerprint=fp)
+    assert (tmp_path / 'results.csv.meta.json').exists()
+    cached = load_cached_results(str(out), fp)
+    assert cached is not None
+    assert list(cached['user_id']) == ['A']
+    # Different parameters do not match the saved results
+    assert load_cached_results(str(out), compute_fingerprint(str(data_path), {'grid_size': 50})) is None
+    # Saving without a fingerprint drops the stale metadata
+    save_results(results, str(out))
+    assert not (tmp_path / metadata_path('results.csv')).exists()
+    assert load_cached_results(str(out), fp) is None
+
+def test_results_writer_streams_batches(tmp_path):
+    from ghost.io.results import ResultsWriter, read_results
+    out = tmp_path / 'results.csv'
+    with ResultsWriter(str(out), fingerprint='abc') as writer:
+        writer.write(pd.DataFrame({'user_id': ['A'], 'lat': [38.9], 'lon': [-104.8], 'num_nights': [3],
+                                   'inferred_from': ['night']}))
+        assert not out.exists()
+        writer.write(pd.DataFrame({'user_id': ['B'], 'lat': [None], 'lon': [None], 'num_nights': [0],
+                                   'inferred_from': [None], 'reason': ['no nighttime or weekend points']}))
+    results = read_results(str(out))
+    assert list(results['user_id']) == ['A', 'B']
+    assert results['num_nights'].dtype == 'int64'
+    assert results['reason'].isnull().tolist() == [True, False]
+    assert load_cached_results(str(out), 'abc') is not None
+
+def test_save_results_parquet_keeps_dtypes(tmp_path):
+    import pytest
+    pytest.importorskip('pyarrow')
+    from ghost.io.results import read_results
+    results = pd.DataFrame({'user_id': ['A', 'B'], 'lat': [38.9, None], 'lon': [-104.8, None],
+                            'num_points': [12, 0], 'inferred_from': ['night', None]})
+    out = tmp_path / 'results.parquet'
+    save_results(results, str(out), fingerprint='abc', csv_path=str(tmp_path / 'results.csv'))
+    loaded = read_results(str(out))
+    assert loaded['num_points'].dtype == 'int64'
+    assert loaded['inferred_from'].isnull().tolist() == [False, True]
+    assert len(pd.read_csv(tmp_path / 'results.csv')) == 2
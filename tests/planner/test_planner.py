@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ghost.detector import HomeDetector
+from ghost.planner import estimate_input, iter_chunks, parse_memory, plan_execution
+
+
+def _write_points(path, n=30000):
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        'user_id': rng.choice([f'u{i}' for i in range(20)], n),
+        'timestamp': (pd.Timestamp('2024-07-01') + pd.to_timedelta(rng.integers(0, 30 * 86400, n), unit='s')).astype(str),
+        'lat': 38.9 + rng.normal(0, 0.001, n),
+        'lon': -104.8 + rng.normal(0, 0.001, n),
+    }).to_csv(path, index=False)
+
+
+def test_parse_memory():
+    assert parse_memory('4GB') == 4 * 1024 ** 3
+    assert parse_memory('512 mb') == 512 * 1024 ** 2
+    assert parse_memory(1000) == 1000
+    with pytest.raises(ValueError):
+        parse_memory('lots')
+
+
+def test_plan_modes(tmp_path):
+    path = tmp_path / 'points.csv'
+    _write_points(path)
+    estimate = estimate_input(path, sample_rows=5000)
+    assert 20000 < estimate['rows'] < 40000
+    assert plan_execution(estimate, '64GB')['mode'] == 'memory'
+    small = plan_execution(estimate, estimate['footprint'] / 4)
+    assert small['mode'] == 'stream' and small['chunk_rows'] > 0
+    sharded = plan_execution(estimate, estimate['footprint'] / 4, streamable=False)
+    assert sharded['mode'] == 'sharded' and sharded['num_shards'] >= 2
+    chunks = list(iter_chunks(path, 12000))
+    assert [len(c) for c in chunks] == [12000, 12000, 6000]
+    # Compressed inputs are read in the same chunks
+    pd.read_csv(path).to_csv(tmp_path / 'points.csv.gz', index=False)
+    assert [len(c) for c in iter_chunks(tmp_path / 'points.csv.gz', 12000)] == [12000, 12000, 6000]
+    assert 20000 < estimate_input(tmp_path / 'points.csv.gz', sample_rows=5000)['rows'] < 40000
+
+
+@pytest.mark.parametrize('stay_time_mode', ['span', 'dwell'])
+def test_budgeted_detection_matches_in_memory(tmp_path, stay_time_mode):
+    path = tmp_path / 'points.csv'
+    _write_points(path)
+    expected = HomeDetector(input_file=str(path), stay_time_mode=stay_time_mode)
+    expected = expected.load_data().preprocess_data().detect_homes().get_results()
+    detector = HomeDetector(input_file=str(path), stay_time_mode=stay_time_mode, max_memory=2_000_000,
+                            shard_dir=str(tmp_path / 'shards'))
+    detector.load_data().preprocess_data().detect_homes()
+    assert detector.execution_plan['mode'] == ('stream' if stay_time_mode == 'span' else 'sharded')
+    assert detector.raw_data is None
+    results = detector.get_results()
+    assert list(results['user_id']) == list(expected['user_id'])
+    assert np.allclose(results['stay_time'], expected['stay_time'])
+    assert np.allclose(results['prj_lat'], expected['prj_lat'])
+
+
+def test_budgeted_stay_point_compression_is_sharded(tmp_path):
+    path = tmp_path / 'points.csv'
+    _write_points(path)
+    options = {'compress_stay_points': True, 'stay_distance': 500, 'stay_time_gap': 3600}
+    expected = HomeDetector(input_file=str(path), **options).load_data().preprocess_data().detect_homes().get_results()
+    detector = HomeDetector(input_file=str(path), max_memory=2_000_000, shard_dir=str(tmp_path / 'shards'), **options)
+    detector.load_data().preprocess_data().detect_homes()
+    # Stays must not be split at chunk boundaries, so each user shard is compressed as a whole
+    assert detector.execution_plan['mode'] == 'sharded'
+    results = detector.get_results()
+    assert list(results['user_id']) == list(expected['user_id'])
+    assert np.array_equal(results['num_points'], expected['num_points'])
+    assert np.allclose(results['stay_time'], expected['stay_time'])
+    assert np.allclose(results['prj_lat'], expected['prj_lat'])
@@ -2,7 +2,7 @@ import pandas as pd
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend for testing
-from ghost.plot import plot_gps_points, plot_home_location, plot_full_result, plot_interactive_map
+from ghost.plot import plot_gps_points, plot_home_location, plot_full_result, plot_interactive_map, plot_grid_density
 
 def test_plot_gps_points_runs():
     df = pd.DataFrame({'lat': [38.9, 38.9001], 'lon': [-104.8, -104.8001]})
@@ -24,4 +24,40 @@ def test_plot_interactive_map_runs():
     df = pd.DataFrame({'lat': [38.9, 38.9001], 'lon': [-104.8, -104.8001]})
     m = plot_interactive_map(df, 38.9, -104.8)
     # If folium is not installed, m is None; otherwise, it's a folium.Map
-    assert m is None or hasattr(m, 'save') 
\ No newline at end of file
+    assert m is None or hasattr(m, 'save') 
+
+def test_plot_gps_points_auto_density():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'lat': 38.9 + rng.normal(0, 1e-3, 500), 'lon': -104.8 + rng.normal(0, 1e-3, 500)})
+    ax = plot_gps_points(df, mode='auto', density_threshold=100)
+    # Density mode draws one collection instead of one scatter marker per point
+    assert len(ax.collections) == 1
+    assert ax.collections[0].get_offsets().shape[0] < len(df)
+
+def test_plot_grid_density_uses_detection_cells():
+    df = pd.DataFrame({'lat': [38.9, 38.9, 38.9, 38.91], 'lon': [-104.8, -104.8, -104.8, -104.81]})
+    ax = plot_grid_density(df, grid_size=20)
+    counts = sorted(ax.collections[0].get_array())
+    assert counts == [1, 3]
+
+def test_plot_full_result_highlights_cells():
+    df = pd.DataFrame({'lat': [38.9, 38.9001, 38.91], 'lon': [-104.8, -104.8001, -104.81]})
+    candidates = pd.DataFrame({'lat': [38.91], 'lon': [-104.81]})
+    fig, ax = plot_full_result(df, 38.9, -104.8, mode='density', grid_size=20, candidates=candidates)
+    labels = [c.get_label() for c in ax.collections]
+    assert 'Home cell' in labels
+    assert 'Candidate cells' in labels
+
+def test_plot_cells_uses_reported_center_and_size():
+    import matplotlib.pyplot as plt
+    from ghost.plot import plot_cells
+    from ghost.preprocessing.projection import project_coordinates
+    fig, ax = plt.subplots()
+    # A half-cell shifted center of a 40 m (hierarchical level) cell, not on the 20 m base grid
+    prj_lat, prj_lon = 4300010.0, 500030.0
+    plot_cells(ax, None, None, 40, prj_lats=[prj_lat], prj_lons=[prj_lon])
+    corners = ax.collections[0].get_paths()[0].vertices[:4]
+    c_lat, c_lon = project_coordinates(pd.Series(corners[:, 1]), pd.Series(corners[:, 0]))
+    assert np.allclose(sorted(set(np.round(c_lat, 3))), [prj_lat - 20, prj_lat + 20])
+    assert np.allclose(sorted(set(np.round(c_lon, 3))), [prj_lon - 20, prj_lon + 20])
+    plt.close(fig)
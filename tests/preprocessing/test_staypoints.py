@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from ghost.algorithms.grid import grid_based_batch
+from ghost.preprocessing.staypoints import compress_stay_points
+
+
+def _stationary_nights():
+    # Two users, one fix per minute over three nights, each at a fixed spot
+    rows = []
+    for user, (lat, lon) in {'a': (38.9, -104.8), 'b': (38.95, -104.85)}.items():
+        for night in ['2024-07-01', '2024-07-02', '2024-07-03']:
+            for ts in pd.date_range(f'{night}T22:00:00', periods=8 * 60, freq='min'):
+                rows.append({'user_id': user, 'timestamp': ts, 'lat': lat, 'lon': lon})
+    return pd.DataFrame(rows)
+
+
+def test_compress_stay_points_collapses_runs():
+    df = _stationary_nights()
+    stays = compress_stay_points(df, distance_threshold=10, time_threshold=300)
+    # Runs break at every clock hour: 8 hourly records per night, per user
+    assert len(stays) == 2 * 3 * 8
+    assert stays['point_count'].sum() == len(df)
+    assert (stays['end_timestamp'] >= stays['timestamp']).all()
+
+
+def test_compress_stay_points_breaks_on_distance_and_gap():
+    df = pd.DataFrame({
+        'user_id': ['a'] * 4,
+        'timestamp': pd.to_datetime(['2024-07-01T23:00:00', '2024-07-01T23:01:00',
+                                     '2024-07-01T23:02:00', '2024-07-01T23:30:00']),
+        'lat': [38.9, 38.9, 38.901, 38.901],
+        'lon': [-104.8, -104.8, -104.8, -104.8],
+    })
+    stays = compress_stay_points(df, distance_threshold=10, time_threshold=300)
+    # Point 3 is ~110 m away; point 4 follows a 28-minute gap
+    assert stays['point_count'].tolist() == [2, 1, 1]
+
+
+def test_compressed_detection_matches_raw():
+    df = _stationary_nights()
+    raw = grid_based_batch(df)
+    compressed = grid_based_batch(compress_stay_points(df))
+    for col in ['num_nights', 'num_points', 'stay_time']:
+        assert raw[col].tolist() == compressed[col].tolist()
+    assert np.allclose(raw['lat'], compressed['lat'])
+    assert np.allclose(raw['lon'], compressed['lon'])
+    raw_dwell = grid_based_batch(df, stay_time_mode='dwell')
+    compressed_dwell = grid_based_batch(compress_stay_points(df), stay_time_mode='dwell')
+    assert np.allclose(raw_dwell['stay_time'], compressed_dwell['stay_time'])
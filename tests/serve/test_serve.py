@@ -0,0 +1,79 @@
+import io
+import json
+import socket
+import threading
+
+import pytest
+from pyproj import Transformer
+from ghost.serve import DetectionService, handle_request, warm_up
+
+
+def _request(request_id, user_id, lat=38.9):
+    return {'id': request_id, 'user_id': user_id, 'points': [
+        {'timestamp': '2024-07-01T23:00:00', 'lat': lat, 'lon': -104.8},
+        {'timestamp': '2024-07-02T01:00:00', 'lat': lat, 'lon': -104.8},
+    ]}
+
+
+def test_handle_request_points_path_and_errors(tmp_path):
+    response = handle_request(_request(1, 'u1'), {'grid_size': 20})
+    assert response['id'] == 1
+    assert response['results'][0]['user_id'] == 'u1'
+    assert response['results'][0]['stay_time'] == 7200.0
+    path = tmp_path / 'points.csv'
+    path.write_text('user_id,timestamp,lat,lon\nA,2024-07-01T23:00:00,38.9,-104.8\nB,2024-07-01T23:00:00,39.0,-104.8\n')
+    assert [r['user_id'] for r in handle_request({'id': 2, 'path': str(path)})['results']] == ['A', 'B']
+    assert 'error' in handle_request({'id': 3, 'points': [{'lat': 1}]})
+    assert 'error' in handle_request({'id': 4, **_request(4, 'u1'), 'params': {'bogus': 1}})
+    for params in ({'grid_size': 'x'}, {'top_k': 1.5}, {'shifted_grids': 1}, {'night_start': 24}):
+        error = handle_request({**_request(5, 'u1'), 'params': params})['error']
+        assert repr(list(params.values())[0]) in error and list(params)[0] in error
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_serve_stream(workers):
+    lines = [json.dumps(_request(i, f'u{i}', lat=38.9 + i * 0.01)) for i in range(4)] + ['[1, 2]']
+    out = io.StringIO()
+    with DetectionService({'grid_size': 20}, workers=workers) as service:
+        service.serve_stream(io.StringIO('\n'.join(lines) + '\n'), out)
+    responses = {r['id']: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert sorted(responses, key=str) == [0, 1, 2, 3, 5]
+    assert responses[2]['results'][0]['user_id'] == 'u2'
+    assert 'error' in responses[5]
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Unix sockets not available')
+def test_serve_socket(tmp_path):
+    path = str(tmp_path / 'ghost.sock')
+    with DetectionService({'grid_size': 20}) as service:
+        server = service.socket_server(path)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(path)
+                stream = client.makefile('rw')
+                for i in range(2):
+                    stream.write(json.dumps(_request(i, f'u{i}')) + '\n')
+                    stream.flush()
+                    response = json.loads(stream.readline())
+                    assert response['id'] == i
+                    assert response['results'][0]['user_id'] == f'u{i}'
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_warm_request_does_not_rebuild_transformer(monkeypatch):
+    warm_up({'epsg_out': 32613})
+    built = []
+    from_crs = Transformer.from_crs
+
+    def counting_from_crs(*args, **kwargs):
+        built.append(args)
+        return from_crs(*args, **kwargs)
+
+    monkeypatch.setattr(Transformer, 'from_crs', staticmethod(counting_from_crs))
+    response = handle_request(_request(1, 'u1'), {'epsg_out': 32613})
+    assert 'results' in response
+    assert built == []
@@ -19,4 +19,58 @@ def test_compare_predictions_to_groundtruth():
     df = compare_predictions_to_groundtruth(pred, gt)
     assert 'error_m' in df.columns
     assert df.shape[0] == 1
-    assert 0 < df.loc[0, 'error_m'] < 20 
\ No newline at end of file
+    assert 0 < df.loc[0, 'error_m'] < 20
+
+
+def test_compute_topk_accuracy():
+    from ghost.validation.groundtruth import compute_topk_accuracy
+    pred = pd.DataFrame({
+        'user_id': [1, 2],
+        'lat': [38.9, 39.5], 'lon': [-104.8, -104.9],
+        'top2_lat': [38.95, 39.0], 'top2_lon': [-104.8, -104.9],
+    })
+    gt = pd.DataFrame({'user_id': [1, 2], 'lat': [38.9001, 39.0001], 'lon': [-104.8001, -104.9]})
+    metrics = compute_topk_accuracy(pred, gt, thresholds=[50])
+    assert np.isclose(metrics['top1_percent_within_50m'], 50.0)
+    assert np.isclose(metrics['top2_percent_within_50m'], 100.0)
+
+
+def test_validate_runs(tmp_path):
+    from ghost.validation.groundtruth import validate_runs
+    gt = pd.DataFrame({'user_id': [1, 2, 3], 'lat': [38.9, 39.0, 39.1], 'lon': [-104.8, -104.8, -104.8]})
+    close = pd.DataFrame({'user_id': [1, 2, 3, 4], 'lat': [38.9001, 39.0, np.nan, 40.0], 'lon': [-104.8] * 4})
+    far = pd.DataFrame({'user_id': [1, 2], 'lat': [38.91, 39.01], 'lon': [-104.8, -104.8]})
+    far.to_csv(tmp_path / 'far.csv', index=False)
+    errors, metrics = validate_runs({'close': close, 'far': str(tmp_path / 'far.csv')}, gt, thresholds=[50, 2000])
+    assert list(metrics['run_id']) == ['close', 'far']
+    assert list(metrics['num_users']) == [3, 2]
+    assert list(metrics['num_predicted']) == [2, 2]
+    # The user without a predicted home counts as a miss
+    assert np.isclose(metrics.loc[0, 'percent_within_50m'], 200 / 3)
+    assert np.isclose(metrics.loc[1, 'percent_within_50m'], 0.0)
+    assert np.isclose(metrics.loc[1, 'percent_within_2000m'], 100.0)
+    # Same errors as the pairwise comparison of each run
+    single = compare_predictions_to_groundtruth(far, gt)
+    assert np.allclose(errors.loc[errors['run_id'] == 'far', 'error_m'], single['error_m'])
+    # A long-format table gives the same metrics
+    long = pd.concat([close.assign(run_id='close'), far.assign(run_id='far')])
+    _, long_metrics = validate_runs(long, gt, thresholds=[50, 2000])
+    pd.testing.assert_frame_equal(long_metrics, metrics)
+
+
+def test_batch_validation_report_keeps_topk_errors(tmp_path):
+    from ghost.validation.groundtruth import batch_validation_report
+    pred = pd.DataFrame({
+        'user_id': [1, 2],
+        'lat': [38.9, 39.5], 'lon': [-104.8, -104.9],
+        'top2_lat': [38.95, 39.0], 'top2_lon': [-104.8, -104.9],
+    })
+    gt_path = tmp_path / 'gt.csv'
+    pd.DataFrame({'user_id': [1, 2], 'lat': [38.9001, 39.0001], 'lon': [-104.8001, -104.9]}).to_csv(gt_path, index=False)
+    merged, metrics = batch_validation_report(pred, str(gt_path), errors_csv=str(tmp_path / 'errors.csv'))
+    assert len(merged) == 2 and {'error_m', 'top2_error_m'} <= set(merged.columns)
+    assert (merged['top2_error_m'] <= merged['error_m']).all()
+    assert merged['top2_error_m'].max() < 50
+    assert np.isclose(metrics['top2_percent_within_50m'], 100.0)
+    saved = pd.read_csv(tmp_path / 'errors.csv')
+    assert 'top2_error_m' in saved.columns
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from ghost.detector import HomeDetector
+from ghost.zones import ZoneIndex, assign_zones, load_zones
+
+
+def _zones():
+    # Two adjacent squares sharing the boundary lon = -104.8
+    return gpd.GeoDataFrame({'GEOID': ['west', 'east']},
+                            geometry=[shapely.box(-104.9, 38.8, -104.8, 39.0), shapely.box(-104.8, 38.8, -104.7, 39.0)],
+                            crs=4326)
+
+
+def test_assign_zones():
+    results = pd.DataFrame({
+        'user_id': ['a', 'b', 'c', 'd', 'e'],
+        'lat': [38.9, 38.9, 38.9, np.nan, 40.0],
+        'lon': [-104.85, -104.75, -104.8, -104.85, -104.85],
+    })
+    out = assign_zones(results, ZoneIndex(_zones(), id_col='GEOID'))
+    # A home on the shared boundary gets the first zone in file order
+    assert list(out['GEOID'][:3]) == ['west', 'east', 'west']
+    assert out['GEOID'][3:].isna().all()
+    positions = ZoneIndex(_zones()).lookup(results['lat'], results['lon'])
+    assert list(positions) == [0, 1, 0, -1, -1]
+
+
+def test_assign_zones_keeps_integer_ids():
+    zones = _zones().assign(GEOID=[8041000100, 8041000200])
+    results = pd.DataFrame({'lat': [38.9, 40.0], 'lon': [-104.75, -104.85]})
+    out = assign_zones(results, ZoneIndex(zones, id_col='GEOID'))
+    assert out['GEOID'].dtype == 'Int64'
+    assert out['GEOID'][0] == 8041000200
+    assert out['GEOID'].isna().tolist() == [False, True]
+    assert assign_zones(results, ZoneIndex(_zones(), id_col='GEOID'))['GEOID'].dtype == 'string'
+
+
+def test_load_zones_reprojects_and_caches(tmp_path):
+    path = tmp_path / 'zones.geojson'
+    _zones().to_crs(3857).to_file(path, driver='GeoJSON')
+    zones = load_zones(path, id_col='GEOID')
+    assert load_zones(path, id_col='GEOID') is zones
+    out = assign_zones(pd.DataFrame({'lat': [38.9], 'lon': [-104.75]}), str(path), id_col='GEOID')
+    assert out['GEOID'][0] == 'east'
+
+
+def test_detector_assign_zones(tmp_path):
+    path = tmp_path / 'zones.geojson'
+    _zones().to_file(path, driver='GeoJSON')
+    times = pd.date_range('2024-07-01 23:00', periods=6, freq='1D')
+    df = pd.DataFrame({
+        'user_id': ['a'] * 6 + ['b'] * 6,
+        'timestamp': list(times) * 2,
+        'lat': [38.9] * 12,
+        'lon': [-104.85] * 6 + [-104.75] * 6,
+    })
+    detector = HomeDetector(zones_file=str(path), zone_id_column='GEOID')
+    detector.raw_data = df
+    results = detector.preprocess_data().detect_homes().assign_zones().get_results()
+    assert list(results['GEOID']) == ['west', 'east']